@@ -0,0 +1,64 @@
+"""Benchmarks for allocating and freeing texture atlas cells.
+
+Run from the repository root with:
+    python -m benchmarks.atlas
+"""
+from random import Random
+from timeit import default_timer
+from tgm.drivers.atlas import CellAllocator, PagedCellAllocator
+
+
+def texture_sizes(count, seed=0):
+    """Sizes of count textures, mostly small sprites with some larger
+    images, as in a typical game."""
+    random = Random(seed)
+    sizes = []
+    for _ in range(count):
+        side = random.choice((8, 16, 16, 32, 32, 32, 64, 128))
+        sizes.append((random.randint(side // 2 + 1, side),
+                      random.randint(side // 2 + 1, side)))
+    return sizes
+
+
+def run(atlas, count):
+    sizes = texture_sizes(count)
+    random = Random(1)
+
+    start = default_timer()
+    cells = [atlas.aquire_cell(width, height) for width, height in sizes]
+    allocate = default_timer() - start
+
+    # Free half at random then refill, as when textures come and go
+    random.shuffle(cells)
+    start = default_timer()
+    for cell in cells[:count // 2]:
+        atlas.release_cell(cell)
+    for width, height in sizes[:count // 2]:
+        atlas.aquire_cell(width, height)
+    churn = default_timer() - start
+
+    start = default_timer()
+    for cell in cells[count // 2:]:
+        atlas.release_cell(cell)
+    free = default_timer() - start
+
+    return allocate, churn, free
+
+
+def main():
+    for count in (1000, 10000):
+        for name, atlas in (("growing", CellAllocator(4096)),
+                            ("paged", PagedCellAllocator(4096))):
+            allocate, churn, free = run(atlas, count)
+            if name == "growing":
+                space = "size {}".format(atlas.size)
+            else:
+                space = "{} pages".format(len(atlas.pages))
+            print("{:>6} cells {:>8}: allocate {:9.2f}ms  churn {:9.2f}ms  "
+                  "free {:9.2f}ms  {}".format(
+                      count, name, allocate * 1000, churn * 1000,
+                      free * 1000, space))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Benchmarks for the broadphase collision engine.
+
+Run from the repository root with:
+    python -m benchmarks.collision
+"""
+from random import Random
+from timeit import default_timer
+import numpy as np
+from tgm.game import World, Layer
+from tgm.game.collision import Collider, Broadphase
+
+
+def build_world(count, seed=0):
+    """Create a world with count colliders spread over a square area sized
+    to give each collider a handful of neighbours."""
+    random = Random(seed)
+    world = World()
+    broadphase = world.attach(Broadphase())
+    side = (count ** 0.5) * 16
+
+    for _ in range(count // 100):
+        layer = world.attach(Layer())
+        for _ in range(100):
+            x, y = random.uniform(0, side), random.uniform(0, side)
+            layer.attach(Collider(bounds=(x, y, x + 12, y + 12)))
+
+    return world, broadphase
+
+
+def timed(func, repeat):
+    """Return the fastest time of repeat calls to func."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = default_timer()
+        func()
+        best = min(best, default_timer() - start)
+    return best
+
+
+def main():
+    for count in (1000, 10000, 50000):
+        world, broadphase = build_world(count)
+        rows = Collider.batch_in(world).rows
+        bounds = Collider._column_store.columns["bounds"]
+
+        first = timed(broadphase.step, 1)
+        refresh = timed(broadphase.step, 5)
+
+        def moving_step():
+            # Jitter every collider a little, as between two frames
+            bounds[rows] += np.random.uniform(-1, 1, (len(rows), 1))
+            broadphase.step(refresh=False)
+
+        moving = timed(moving_step, 5)
+
+        print("{:>6} colliders: first {:8.2f}ms  refresh {:8.2f}ms  "
+              "incremental {:8.2f}ms  pairs {}".format(
+                  count, first * 1000, refresh * 1000, moving * 1000,
+                  len(broadphase.pair_ids)))
+
+        world.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Benchmarks for rollback snapshots.
+
+Run from the repository root with:
+    python -m benchmarks.rollback
+"""
+from random import Random
+from timeit import default_timer
+from tgm.sys import Entity, Tracked
+from tgm.sys.rollback import Rollback
+from tgm.sys.serialize import dumps, loads
+from tgm.game import World, Layer
+
+
+class Unit(Tracked, Entity):
+    def __init__(self):
+        super().__init__()
+        self.x = 0
+        self.y = 0
+        self.health = 100
+
+
+def build_world(count):
+    world = World()
+    units = []
+    for _ in range(count // 100):
+        layer = world.attach(Layer())
+        for _ in range(100):
+            units.append(layer.attach(Unit()))
+    return world, units
+
+
+def simulate(units, random, changed):
+    """Change the state of some units, as in one tick of a game."""
+    for unit in random.sample(units, changed):
+        unit.x += 1
+        unit.health -= 1
+
+
+def main():
+    count = 10000
+    random = Random(0)
+    world, units = build_world(count)
+    rollback = Rollback(world)
+
+    print("{} entities".format(count))
+    for changed in (10, 100, 1000):
+        snapshot_time = restore_time = 0
+        rounds = 20
+        for _ in range(rounds):
+            start = default_timer()
+            version = rollback.snapshot()
+            snapshot_time += default_timer() - start
+
+            # Eight ticks of prediction, as in a typical rollback window
+            for _ in range(8):
+                simulate(units, random, changed)
+
+            start = default_timer()
+            rollback.restore(version)
+            restore_time += default_timer() - start
+            rollback.release(version)
+
+        print("{:>5} changes/tick: snapshot {:8.4f}ms  restore {:8.3f}ms"
+              .format(changed, snapshot_time / rounds * 1000,
+                      restore_time / rounds * 1000))
+
+    rollback.close()
+
+    # Full copies of the tree, for comparison
+    start = default_timer()
+    data = dumps(world)
+    copy_time = default_timer() - start
+    start = default_timer()
+    loads(data)
+    load_time = default_timer() - start
+    print("full copy: snapshot {:8.3f}ms  restore {:8.3f}ms".format(
+        copy_time * 1000, load_time * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Benchmarks for running worlds across processes.
+
+Run from the repository root with:
+    python -m benchmarks.runner
+"""
+import os
+from timeit import default_timer
+from tgm.sys import Entity
+from tgm.game import World, Layer
+from tgm.game.runner import WorldRunner
+
+
+class Unit(Entity):
+    def __init__(self):
+        super().__init__()
+        self.x = 0
+
+
+def build_world(units=200):
+    world = World()
+    layer = world.attach(Layer())
+    for _ in range(units):
+        layer.attach(Unit())
+    return world
+
+
+def step_world(world, inputs):
+    """A stand in for a game tick, touching every unit a few times."""
+    total = 0
+    for _ in range(5):
+        for unit in world.find(Unit):
+            unit.x += 1
+            total += unit.x
+    return total
+
+
+def main():
+    worlds = 64
+    ticks = 20
+    cores = os.cpu_count() or 1
+
+    counts = sorted({1, 2, 4, cores} & set(range(1, cores + 1)))
+    for processes in counts:
+        with WorldRunner(step_world, processes=processes) as runner:
+            for i in range(worlds):
+                runner.add(i, build_world())
+            runner.step()
+
+            start = default_timer()
+            for _ in range(ticks):
+                runner.step()
+            elapsed = default_timer() - start
+
+        print("{:>3} processes: {:8.1f} world ticks/s".format(
+            processes, worlds * ticks / elapsed))
+
+
+if __name__ == "__main__":
+    main()
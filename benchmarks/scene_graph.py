@@ -0,0 +1,257 @@
+"""Benchmarks for the core scene graph operations across tree shapes.
+
+Run from the repository root with:
+    python -m benchmarks.scene_graph
+    python -m benchmarks.scene_graph --sizes 1000 1000000 --output base.json
+    python -m benchmarks.scene_graph --compare base.json
+
+Each operation is timed on wide, deep, balanced and skewed trees, keeping
+the fastest of several rounds.  With --compare the results are checked
+against a baseline written by --output, and the exit status is 1 if any
+operation got slower by more than the threshold.
+"""
+import argparse
+from collections import deque
+import gc
+import json
+import platform
+from random import Random
+import sys
+from timeit import default_timer
+from tgm.sys import Node, Entity, Component, Tag, Event, on, emit
+
+SHAPES = ("wide", "deep", "balanced", "skewed")
+OPERATIONS = ("attach", "find", "find_with", "children_with", "parent",
+              "find_trim", "emit", "destroy")
+
+# Nodes visited by the per-node operations, such as parent
+SAMPLES = 1000
+
+# Length of the chains in deep trees, kept well within the recursion limit
+DEPTH = 200
+
+
+class Ping(Event):
+    pass
+
+
+class Group(Entity):
+    pass
+
+
+class Unit(Entity):
+    def __init__(self, health):
+        super().__init__()
+        self.health = health
+
+    @on(Ping)
+    def ping(self):
+        self.health -= 1
+
+
+class Brain(Component):
+    pass
+
+
+class Hidden(Tag):
+    pass
+
+
+def build(shape, size, random):
+    """Build a tree of size nodes under Groups attached to the root,
+    returning the root and the nodes."""
+    root = Node()
+    nodes = []
+
+    def add(parent):
+        roll = random.random()
+        if roll < 0.1:
+            node = Brain()
+        elif roll < 0.12:
+            node = Hidden()
+        else:
+            node = Unit(random.randrange(100))
+        nodes.append(node)
+        return parent.attach(node)
+
+    if shape == "wide":
+        group = root.attach(Group())
+        while len(nodes) < size:
+            add(group)
+
+    elif shape == "deep":
+        while len(nodes) < size:
+            parent = root.attach(Group())
+            for _ in range(DEPTH):
+                if len(nodes) >= size:
+                    break
+                child = add(parent)
+                if isinstance(child, Unit):
+                    parent = child
+
+    elif shape == "balanced":
+        # Units have eight children each, filled breadth first
+        queue = deque()
+        while len(nodes) < size:
+            if not queue:
+                queue.append(root.attach(Group()))
+            parent = queue.popleft()
+            for _ in range(8):
+                if len(nodes) >= size:
+                    break
+                child = add(parent)
+                if isinstance(child, Unit):
+                    queue.append(child)
+
+    elif shape == "skewed":
+        # Each group holds half of the remaining nodes
+        remaining = size
+        while len(nodes) < size:
+            group = root.attach(Group())
+            for _ in range(max(remaining // 2, 1)):
+                if len(nodes) >= size:
+                    break
+                add(group)
+            remaining = size - len(nodes)
+
+    return root, nodes
+
+
+def run_shape(shape, size, rounds):
+    """Time each operation on one tree, returning {operation: seconds}."""
+    best = {}
+
+    def record(operation, elapsed):
+        best[operation] = min(best.get(operation, elapsed), elapsed)
+
+    for _ in range(rounds):
+        # The same tree is built each round
+        random = Random(0)
+
+        start = default_timer()
+        root, nodes = build(shape, size, random)
+        record("attach", default_timer() - start)
+
+        samples = random.sample(nodes, min(SAMPLES, len(nodes)))
+
+        start = default_timer()
+        list(root.find(Brain))
+        record("find", default_timer() - start)
+
+        start = default_timer()
+        list(root.find_with(Brain))
+        record("find_with", default_timer() - start)
+
+        start = default_timer()
+        for node in samples:
+            list(node.children_with(Brain))
+        record("children_with", default_timer() - start)
+
+        start = default_timer()
+        for node in samples:
+            node.parent(Group)
+        record("parent", default_timer() - start)
+
+        start = default_timer()
+        list(root.find(Unit["health", lambda unit: unit.health > 50],
+                       trim=Node[Hidden]))
+        record("find_trim", default_timer() - start)
+
+        start = default_timer()
+        for node in samples:
+            emit(node, Ping)
+        record("emit", default_timer() - start)
+
+        start = default_timer()
+        root.destroy()
+        record("destroy", default_timer() - start)
+
+    return best
+
+
+def run(shapes, sizes, rounds):
+    results = {}
+    for size in sizes:
+        for shape in shapes:
+            # Collections are paused, as by timeit, so that their timing
+            # doesn't add noise
+            gc.collect()
+            gc.disable()
+            try:
+                timings = run_shape(shape, size, rounds)
+            finally:
+                gc.enable()
+            for operation, elapsed in timings.items():
+                results["{}/{}/{}".format(shape, size, operation)] = elapsed
+            print("{:>8} {:<9}".format(size, shape) + "".join(
+                " {}={:.2f}ms".format(operation, timings[operation] * 1000)
+                for operation in OPERATIONS
+            ))
+    return results
+
+
+def compare(results, baseline, threshold, min_difference):
+    """Print how each result compares to the baseline, returning the names
+    of those which regressed.
+
+    Slowdowns of less than min_difference seconds are put down to noise.
+    """
+    regressions = []
+    for name, elapsed in sorted(results.items()):
+        try:
+            base = baseline[name]
+        except KeyError:
+            continue
+        ratio = elapsed / base if base else 1
+        flag = ""
+        if ratio > threshold and elapsed - base > min_difference:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print("{:<40} {:10.3f}ms {:10.3f}ms {:6.2f}x{}".format(
+            name, base * 1000, elapsed * 1000, ratio, flag
+        ))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[1000, 10000, 100000])
+    parser.add_argument("--shapes", nargs="+", choices=SHAPES,
+                        default=list(SHAPES))
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--output", help="write the results to a JSON file")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="compare against results written by --output")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="slowdown ratio counted as a regression")
+    parser.add_argument("--min-difference", type=float, default=0.5,
+                        help="slowdown in ms ignored as noise")
+    args = parser.parse_args(argv)
+
+    results = run(args.shapes, args.sizes, args.rounds)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({
+                "python": platform.python_version(),
+                "implementation": platform.python_implementation(),
+                "rounds": args.rounds,
+                "results": results,
+            }, file, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.threshold,
+                              args.min_difference / 1000)
+        if regressions:
+            print("{} regressions over {}x".format(len(regressions),
+                                                    args.threshold))
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+def next_power_of_2(x):
+    if x == 0:
+        return 0
+    return 1 << ((x - 1).bit_length())
+
+
+class CellAllocator:
+    """Hands out regions of a square texture atlas to textures.
+
+    The atlas is divided like a quadtree, each texture getting the smallest
+    free square power of two cell it fits in, and the atlas doubles in size
+    when no cell is large enough.  Cells are (x1, y1, x2, y2) tuples trimmed
+    to the size requested.
+
+    Free cells are kept in a set for each cell size, so finding a cell only
+    looks at each size once.  A freed cell is merged with its three
+    siblings, found from its position, whenever they're all free.
+
+    This only does the bookkeeping, drivers subclass it to manage the
+    texture itself.
+    """
+    def __init__(self, size):
+        self.size = size
+
+        # The (x, y) positions of the free cells of each size
+        self.free = {size: {(0, 0)}}
+
+    @property
+    def cells(self):
+        """The free cells, as (x1, y1, x2, y2) tuples."""
+        return sorted(
+            (x, y, x + size, y + size)
+            for size, positions in self.free.items()
+            for x, y in positions
+        )
+
+    def aquire_cell(self, width, height):
+        while True:
+            cell = self.find_cell(width, height)
+            if cell is not None:
+                return cell
+            self.size_up()
+
+    def find_cell(self, width, height):
+        """Take a cell for the given size, or return None if there isn't
+        one free, without growing the atlas."""
+        target_cell_size = max(next_power_of_2(max(width, height)), 1)
+
+        find_size = target_cell_size
+        while find_size <= self.size:
+            if self.free.get(find_size):
+                x, y = self.free[find_size].pop()
+
+                # Split down to the size needed, taking the first quarter
+                # each time
+                while find_size > target_cell_size:
+                    find_size //= 2
+                    self.free.setdefault(find_size, set()).update((
+                        (x + find_size, y),
+                        (x, y + find_size),
+                        (x + find_size, y + find_size)
+                    ))
+
+                return (x, y, x + width, y + height)
+            find_size *= 2
+
+        return None
+
+    def size_up(self):
+        self.size *= 2
+        new_size = self.size
+        old_size = new_size // 2
+
+        self.release_cell((old_size, old_size, new_size, new_size))
+        self.release_cell((0, old_size, old_size, new_size))
+        self.release_cell((old_size, 0, new_size, old_size))
+
+    def release_cell(self, cell):
+        size = max(next_power_of_2(max(cell[2] - cell[0],
+                                       cell[3] - cell[1])), 1)
+        x, y = cell[:2]
+
+        while size < self.size:
+            free = self.free.get(size)
+            parent_size = size * 2
+            parent_x = x // parent_size * parent_size
+            parent_y = y // parent_size * parent_size
+            siblings = [
+                position for position in (
+                    (parent_x, parent_y),
+                    (parent_x + size, parent_y),
+                    (parent_x, parent_y + size),
+                    (parent_x + size, parent_y + size)
+                )
+                if position != (x, y)
+            ]
+
+            if not free or not all(sibling in free for sibling in siblings):
+                break
+            free.difference_update(siblings)
+            x, y, size = parent_x, parent_y, parent_size
+
+        self.free.setdefault(size, set()).add((x, y))
+
+
+class PagedCellAllocator:
+    """Hands out cells from pages of a fixed size, adding a page when none
+    of them has room.
+
+    Existing pages never grow, so no pixels are copied when more space is
+    needed and pages stay within the largest texture size the GPU allows.
+    Cells are (x1, y1, x2, y2, page) tuples, page being the key of the page
+    in pages.  A texture larger than the page size gets a page of its own,
+    which is removed again once its cell is released, and its key reused.
+
+    Drivers subclass it and extend add_page and remove_page to create and
+    free each page's texture.
+    """
+    def __init__(self, page_size):
+        self.page_size = page_size
+        self.pages = {}
+        self.add_page(page_size)
+
+    def add_page(self, size):
+        """Add an empty page of the given size, returning its key."""
+        page = 0
+        while page in self.pages:
+            page += 1
+        self.pages[page] = CellAllocator(size)
+        return page
+
+    def remove_page(self, page):
+        """Remove an empty page."""
+        del self.pages[page]
+
+    def aquire_cell(self, width, height):
+        for page, allocator in self.pages.items():
+            cell = allocator.find_cell(width, height)
+            if cell is not None:
+                return cell + (page,)
+
+        size = max(self.page_size, next_power_of_2(max(width, height)))
+        page = self.add_page(size)
+        return self.pages[page].find_cell(width, height) + (page,)
+
+    def release_cell(self, cell):
+        page = cell[4]
+        allocator = self.pages[page]
+        allocator.release_cell(cell[:4])
+
+        # Oversized pages are only ever used by one texture, so are freed
+        # once it's done with rather than kept for later textures
+        if allocator.size > self.page_size and allocator.free.get(
+                allocator.size):
+            self.remove_page(page)
@@ -0,0 +1,196 @@
+"""Growable typed buffers for staging vertex data before it's drawn."""
+from collections import defaultdict
+from hashlib import blake2b
+import numpy as np
+
+
+class StagingBuffer:
+    """An array of fixed width rows which grows as rows are appended.
+
+    Storage is kept between frames, so once it's grown to fit a frame's
+    data appending allocates nothing.
+    """
+    def __init__(self, dtype, components=1, capacity=1024):
+        self._data = np.empty((capacity, components), dtype)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def array(self):
+        """A view of the rows appended so far."""
+        return self._data[:self.size]
+
+    def reserve(self, count):
+        """Append count uninitialised rows, returning a view to fill them."""
+        start = self.size
+        end = start + count
+        if end > len(self._data):
+            capacity = max(end, len(self._data) * 2)
+            data = np.empty((capacity,) + self._data.shape[1:],
+                            self._data.dtype)
+            data[:start] = self._data[:start]
+            self._data = data
+        self.size = end
+        return self._data[start:end]
+
+    def extend(self, values):
+        """Append rows from an array, buffer or sequence of values."""
+        values = np.asarray(values, self._data.dtype)
+        values = values.reshape(-1, self._data.shape[1])
+        self.reserve(len(values))[...] = values
+
+    def clear(self):
+        self.size = 0
+
+
+class DrawBuffer:
+    """Indexed 2D geometry staged for one draw call.
+
+    Vertex positions are float32 pairs and texture coordinates are pairs in
+    atlas pixels.  By default colours are float32 RGBA and texture
+    coordinates float32, while compact buffers hold uint8 RGBA colours,
+    normalised when drawn, and int16 texture coordinates, halving the size
+    of each vertex.
+
+    Quad buffers hold no indices, every four vertices making a quad drawn
+    as the triangles 0, 1, 2 and 0, 2, 3.
+    """
+    def __init__(self, compact=False, quads=False):
+        self.compact = compact
+        self.quads = quads
+
+        self.indices = StagingBuffer(np.uint32)
+        self.vertices = StagingBuffer(np.float32, 2)
+        if compact:
+            self.colors = StagingBuffer(np.uint8, 4)
+            self.uvs = StagingBuffer(np.int16, 2)
+        else:
+            self.colors = StagingBuffer(np.float32, 4)
+            self.uvs = StagingBuffer(np.float32, 2)
+
+    @property
+    def layout(self):
+        return self.compact, self.quads
+
+    def add(self, indices, vertices, colors, uvs, uv_offset, uv_scale):
+        """Append geometry, remapping its texture coordinates from 0 to 1
+        across a texture to uv_offset + uv * uv_scale in the atlas.
+
+        Colours are from 0 to 1, except that uint8 arrays are taken as they
+        are by compact buffers.  indices are ignored by quad buffers.
+        """
+        base = len(self.vertices)
+        self.vertices.extend(vertices)
+
+        if not self.quads:
+            staged = self.indices.reserve(np.size(indices))
+            np.add(np.asarray(indices).reshape(-1), base,
+                   out=staged[:, 0], casting="unsafe")
+
+        if not self.compact:
+            self.colors.extend(colors)
+        elif getattr(colors, "dtype", None) == np.uint8:
+            self.colors.extend(colors)
+        else:
+            colors = np.asarray(colors, np.float32).reshape(-1, 4)
+            staged = self.colors.reserve(len(colors))
+            staged[...] = np.rint(colors * 255)
+
+        uvs = np.asarray(uvs, np.float32).reshape(-1, 2)
+        staged = self.uvs.reserve(len(uvs))
+        if self.compact:
+            staged[...] = np.rint(uvs * uv_scale + uv_offset)
+        else:
+            np.multiply(uvs, uv_scale, out=staged)
+            staged += uv_offset
+
+    def update_hash(self, hasher):
+        """Feed the layout and staged data to a hashlib hasher."""
+        hasher.update(bytes(self.layout))
+        for buffer in (self.indices, self.vertices, self.colors, self.uvs):
+            hasher.update(len(buffer).to_bytes(8, "little"))
+            hasher.update(buffer.array)
+
+    def triangle_indices(self):
+        """The indices of the staged triangles, generated for quads."""
+        if not self.quads:
+            return self.indices.array[:, 0]
+        quads = np.arange(0, len(self.vertices), 4, dtype=np.uint32)
+        return (quads[:, None] + _QUAD_INDICES).reshape(-1)
+
+    def clear(self):
+        self.indices.clear()
+        self.vertices.clear()
+        self.colors.clear()
+        self.uvs.clear()
+
+
+_QUAD_INDICES = np.array([0, 1, 2, 0, 2, 3], np.uint32)
+
+
+def draw_calls_digest(draw_calls):
+    """Hash a texture's queued (action, *arguments) draw calls, so an
+    unchanged list of draw calls can be detected."""
+    hasher = blake2b(digest_size=16)
+    for draw_call in draw_calls:
+        hasher.update(draw_call[0].__name__.encode())
+        for argument in draw_call[1:]:
+            if isinstance(argument, DrawBuffer):
+                argument.update_hash(hasher)
+            else:
+                hasher.update(repr(argument).encode())
+    return hasher.digest()
+
+
+class DrawBufferPool:
+    """Draw buffers of each layout, reused from frame to frame."""
+    def __init__(self):
+        self._buffers = defaultdict(list)
+        self._used = defaultdict(int)
+
+    def take(self, compact=False, quads=False):
+        """Return a cleared buffer which isn't in use."""
+        layout = (compact, quads)
+        buffers = self._buffers[layout]
+        if self._used[layout] == len(buffers):
+            buffers.append(DrawBuffer(compact, quads))
+        draw_buffer = buffers[self._used[layout]]
+        draw_buffer.clear()
+        self._used[layout] += 1
+        return draw_buffer
+
+    def release_all(self):
+        """Mark every buffer as free, once their draws are done."""
+        self._used.clear()
+
+
+class RingAllocator:
+    """Hands out ranges of a buffer in order, starting again from the
+    beginning once the buffer is full.
+
+    allocate returns where the range starts and whether the buffer must be
+    orphaned first, giving it new storage so ranges still being drawn from
+    aren't overwritten.  That happens when it wraps around, or when the
+    range doesn't fit at all, in which case the capacity is doubled until it
+    does.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.head = 0
+
+    def allocate(self, count):
+        if count > self.capacity:
+            while count > self.capacity:
+                self.capacity *= 2
+            self.head = count
+            return 0, True
+
+        if self.head + count > self.capacity:
+            self.head = count
+            return 0, True
+
+        start = self.head
+        self.head += count
+        return start, False
@@ -19,7 +19,8 @@ class Texture:
         self.width = width
         self.height = height
 
-    def add_draw_2d(self, texture, indices, vertices, colors, uvs):
+    def add_draw_2d(self, texture, indices, vertices, colors, uvs,
+                    compact=False):
         pass
 
     def update(self):
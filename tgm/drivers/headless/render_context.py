@@ -0,0 +1,296 @@
+"""A render driver which records what would be drawn instead of drawing it.
+
+It needs no display or GPU, so the frame loop and render batching can be
+benchmarked and tested anywhere.  The work the pyglet driver would do is
+counted per frame:
+
+>>> set_update_function(game.update, 60)
+>>> run(frames=600)
+>>> Manager.frames[-1].draw_calls
+12
+"""
+from hashlib import blake2b
+from itertools import count
+import struct
+import numpy as np
+from tgm.drivers.atlas import PagedCellAllocator
+
+
+class FrameStats:
+    """What was drawn during one frame."""
+    def __init__(self):
+        self.draw_calls = 0
+        self.vertices = 0
+        self.indices = 0
+        self.clears = 0
+
+        # Binds of a render target or of a texture to draw from
+        self.state_changes = 0
+
+        self.atlas_allocations = 0
+        self.atlas_releases = 0
+
+        # Retained textures left as they were, their draw calls unchanged
+        self.skipped_textures = 0
+
+        # Each call as a tuple, ("draw_2d", vertex_count, index_count),
+        # ("clear", red, green, blue, alpha) or ("copy", width, height)
+        self.calls = []
+
+    def to_dict(self):
+        return {
+            "draw_calls": self.draw_calls,
+            "vertices": self.vertices,
+            "indices": self.indices,
+            "clears": self.clears,
+            "state_changes": self.state_changes,
+            "atlas_allocations": self.atlas_allocations,
+            "atlas_releases": self.atlas_releases,
+            "skipped_textures": self.skipped_textures,
+        }
+
+
+class Manager:
+    initialized = False
+
+    @classmethod
+    def init(cls):
+        if cls.initialized:
+            return
+        cls.initialized = True
+
+        cls.target_fps = 60
+        cls.update_function = None
+        cls.running = False
+
+        # Stats for the frame being drawn, and those of finished frames
+        cls.frame = FrameStats()
+        cls.frames = []
+
+        # Whether textures are drawn straight into their atlas cells, as in
+        # the pyglet driver, where textures drawing from their own atlas
+        # page go through a render target
+        cls.direct_rendering = True
+
+        cls.atlas = PagedCellAllocator(4096)
+        cls.default_texture = Texture(1, 1)
+
+    @classmethod
+    def record(cls, call):
+        frame = cls.frame
+        frame.calls.append(call)
+        if call[0] == "clear":
+            frame.clears += 1
+        else:
+            frame.draw_calls += 1
+            frame.state_changes += 1
+            if call[0] == "draw_2d":
+                frame.vertices += call[1]
+                frame.indices += call[2]
+
+
+def set_update_function(function, fps):
+    Manager.init()
+    Manager.update_function = function
+    set_fps(fps)
+
+
+def set_fps(fps):
+    Manager.init()
+    Manager.target_fps = fps
+
+
+def load_texture(path):
+    """Create a texture the size of a PNG image, without reading its pixels.
+    """
+    with open(path, "rb") as file:
+        header = file.read(24)
+    if header[:8] != b"\x89PNG\r\n\x1a\n":
+        raise ValueError("{} is not a PNG image".format(path))
+    width, height = struct.unpack(">II", header[16:24])
+    return Texture(width, height)
+
+
+def run(frames=None):
+    """Run the frame loop as fast as possible, for the given number of frames
+    or until stop is called.
+
+    Every frame is given a time step of exactly 1 / fps, so runs are
+    repeatable.  The stats of each frame are kept in Manager.frames.
+    """
+    Manager.init()
+    Manager.running = True
+    Manager.frames = []
+
+    while Manager.running and (frames is None or len(Manager.frames) < frames):
+        if Manager.update_function is None:
+            break
+        Manager.update_function(1 / Manager.target_fps, Manager.target_fps)
+        Manager.frames.append(Manager.frame)
+        Manager.frame = FrameStats()
+
+    Manager.running = False
+
+
+def stop():
+    """Stop run after the current frame."""
+    Manager.running = False
+
+
+# Numbers telling textures apart for as long as the process runs
+_texture_serials = count()
+
+
+class Texture:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self._new_size = (width, height)
+
+        Manager.init()
+
+        self.draw_calls = []
+        self.cell = Manager.atlas.aquire_cell(width, height)
+        Manager.frame.atlas_allocations += 1
+
+        # Retained textures are only drawn again when their draw calls or
+        # the textures they draw from have changed, which is found from a
+        # hash of the draw calls' arguments.  Those are staged as they're
+        # queued, as the other drivers stage them, and hashed in update
+        self.retained = False
+        self.version = 0
+        self._serial = next(_texture_serials)
+        self._sources = set()
+        self._staged = []
+        self._signature = None
+
+    def add_draw_2d(self, texture, indices, vertices, colors, uvs,
+                    compact=False):
+        if texture is None:
+            texture = Manager.default_texture
+        self._sources.add(texture)
+        if self.retained:
+            self._staged.append((compact, indices is None) + tuple(
+                None if values is None else np.array(values)
+                for values in (indices, vertices, colors, uvs)
+            ))
+
+        # Batches are split where the atlas page or vertex layout changes,
+        # as they are when drawn
+        layout = (texture.cell[4], compact, indices is None)
+        if (not self._is_last_draw_action("draw_2d")
+                or self.draw_calls[-1][3] != layout):
+            self.draw_calls.append(["draw_2d", 0, 0, layout])
+
+        draw_call = self.draw_calls[-1]
+        draw_call[1] += np.size(vertices) // 2
+        if indices is not None:
+            draw_call[2] += np.size(indices)
+
+    def update(self):
+        if (self.width, self.height) != self._new_size:
+            self._resize(*self._new_size)
+
+        if not self._draw_calls_changed():
+            self._discard_draw_calls()
+            Manager.frame.skipped_textures += 1
+            return
+
+        # Drawn straight into the texture's cell, or to a render target
+        # then copied into it
+        direct = Manager.direct_rendering and not self._samples_own_page()
+        Manager.frame.state_changes += 1
+        for draw_call in self.draw_calls:
+            if draw_call[0] == "draw_2d":
+                draw_call = tuple(draw_call[:3])
+            Manager.record(draw_call)
+        self._discard_draw_calls()
+        if not direct:
+            Manager.record(("copy", self.width, self.height))
+        self.version += 1
+
+    def _discard_draw_calls(self):
+        self.draw_calls = []
+        self._sources.clear()
+        self._staged = []
+
+    def _samples_own_page(self):
+        """Whether any queued batch draws from the texture's atlas page."""
+        page = self.cell[4]
+        return any(draw_call[0] == "draw_2d" and draw_call[3][0] == page
+                   for draw_call in self.draw_calls)
+
+    def _draw_calls_changed(self):
+        if not self.retained:
+            self._signature = None
+            return True
+
+        hasher = blake2b(digest_size=16)
+        for compact, quads, *arrays in self._staged:
+            hasher.update(bytes((compact, quads)))
+            for values in arrays:
+                if values is not None:
+                    hasher.update(struct.pack("<Q", values.size))
+                    hasher.update(np.ascontiguousarray(values))
+
+        # Keyed by serial number, as an id could be reused by a texture
+        # created after another was freed, and keeping the textures
+        # themselves would stop them being freed
+        sources = frozenset(
+            (texture._serial, texture.version) for texture in self._sources
+        )
+        signature = (self.width, self.height, tuple(self.draw_calls),
+                     hasher.digest(), sources)
+        changed = signature != self._signature
+        self._signature = signature
+        return changed
+
+    def resize(self, width, height):
+        self._new_size = (width, height)
+
+    def _resize(self, width, height):
+        Manager.atlas.release_cell(self.cell)
+        self.cell = Manager.atlas.aquire_cell(width, height)
+        Manager.frame.atlas_releases += 1
+        Manager.frame.atlas_allocations += 1
+        self.width = width
+        self.height = height
+
+    def add_clear(self, red=0, green=0, blue=0, alpha=0):
+        if not self._is_last_draw_action("clear"):
+            self.draw_calls.append(("clear", red, green, blue, alpha))
+
+    def _is_last_draw_action(self, name):
+        try:
+            return self.draw_calls[-1][0] == name
+        except IndexError:
+            return False
+
+    def destroy(self):
+        if self.cell is not None:
+            Manager.atlas.release_cell(self.cell)
+            Manager.frame.atlas_releases += 1
+            self.cell = None
+
+    def __del__(self):
+        self.destroy()
+
+
+class Window(Texture):
+    def __init__(self, width, height, caption="", resizable=True):
+        super().__init__(width, height)
+
+        self.caption = caption
+        self.mouse_x = width // 2
+        self.mouse_y = height // 2
+        self.mouse_buttons = set()
+        self.keys = set()
+
+    def update(self):
+        super().update()
+
+        # Presenting the window
+        Manager.record(("copy", self.width, self.height))
+
+    def set_caption(self, caption):
+        self.caption = caption
@@ -0,0 +1,142 @@
+from unittest import TestCase
+import gc
+import os
+import struct
+import tempfile
+import weakref
+from tgm.drivers.headless import render_context
+from tgm.drivers.headless.render_context import (
+    Manager, Texture, Window, load_texture, run, set_update_function, stop
+)
+
+
+class TestHeadlessRenderContext(TestCase):
+    def setUp(self):
+        # textures left by other tests are released before starting afresh
+        gc.collect()
+        Manager.initialized = False
+        Manager.init()
+
+    def test_frame_loop(self):
+        window = Window(320, 240)
+        sprite = Texture(16, 16)
+        steps = []
+
+        def update(dt, fps):
+            steps.append(dt)
+            window.add_clear()
+            for _ in range(3):
+                window.add_draw_2d(sprite, [0, 1, 2, 0, 2, 3],
+                                   [0, 0, 1, 0, 1, 1, 0, 1],
+                                   [1] * 16, [0, 0, 1, 0, 1, 1, 0, 1])
+            window.update()
+            if len(steps) == 5:
+                stop()
+
+        set_update_function(update, 50)
+        run()
+        self.assertEqual(steps, [1 / 50] * 5)
+        self.assertEqual(len(Manager.frames), 5)
+
+        # consecutive draws are batched into one call.  The sprite shares
+        # the window's atlas page, so the batch is drawn to the render
+        # target, copied into the window's cell then presented
+        frame = Manager.frames[-1]
+        self.assertEqual(frame.draw_calls, 3)
+        self.assertEqual(frame.vertices, 12)
+        self.assertEqual(frame.indices, 18)
+        self.assertEqual(frame.clears, 1)
+        self.assertEqual(frame.calls[:2], [("clear", 0, 0, 0, 0),
+                                           ("draw_2d", 12, 18)])
+
+        run(frames=2)
+        self.assertEqual(len(Manager.frames), 2)
+
+    def test_direct_rendering(self):
+        texture = Texture(16, 16)
+        other_page = Texture(4097, 4)
+        self.assertNotEqual(other_page.cell[4], texture.cell[4])
+        quad = ([0, 1, 2, 0, 2, 3], [0, 0, 1, 0, 1, 1, 0, 1], [1] * 16,
+                [0, 0, 1, 0, 1, 1, 0, 1])
+        texture.add_draw_2d(other_page, *quad)
+        texture.update()
+        self.assertEqual(Manager.frame.calls, [("draw_2d", 4, 6)])
+
+        # drawing from the texture's own page goes through the render target
+        texture.add_draw_2d(None, *quad)
+        texture.update()
+        self.assertEqual(Manager.frame.calls[1:],
+                         [("draw_2d", 4, 6), ("copy", 16, 16)])
+
+        Manager.direct_rendering = False
+        texture.add_draw_2d(other_page, *quad)
+        texture.update()
+        self.assertEqual(Manager.frame.calls[-1], ("copy", 16, 16))
+
+    def test_retained(self):
+        background = Texture(64, 64)
+        background.retained = True
+        sprite = Texture(8, 8)
+
+        def draw(x):
+            background.add_clear(0, 0, 1, 1)
+            background.add_draw_2d(sprite, [0, 1, 2], [x, 0, 8, 0, 8, 8],
+                                   [1] * 12, [0, 0, 1, 0, 1, 1])
+            background.update()
+
+        draw(0)
+        draw(0)
+        self.assertEqual(Manager.frame.skipped_textures, 1)
+        self.assertEqual(len(Manager.frame.calls), 3)
+
+        draw(1)
+        self.assertEqual(len(Manager.frame.calls), 6)
+
+        # drawn again when a texture it draws from changes
+        sprite.update()
+        draw(1)
+        self.assertEqual(Manager.frame.skipped_textures, 1)
+        self.assertEqual(len(Manager.frame.calls), 9)
+
+        draw(1)
+        self.assertEqual(Manager.frame.to_dict()["skipped_textures"], 2)
+
+        # and when it draws from a different texture at the same version,
+        # even if the new texture took the old one's id
+        sprite.destroy()
+        sprite = Texture(8, 8)
+        sprite.version = 1
+        draw(1)
+        self.assertEqual(Manager.frame.skipped_textures, 2)
+        self.assertEqual(len(Manager.frame.calls), 12)
+
+        # a retained texture doesn't keep the textures it drew from alive
+        sprite = weakref.ref(sprite)
+        gc.collect()
+        self.assertIsNone(sprite())
+
+    def test_atlas_accounting(self):
+        # the default texture is allocated when the driver starts
+        self.assertEqual(Manager.frame.atlas_allocations, 1)
+
+        texture = Texture(100, 50)
+        self.assertEqual(texture.cell[2] - texture.cell[0], 100)
+        texture.resize(200, 200)
+        texture.update()
+        texture.destroy()
+        frame = Manager.frame.to_dict()
+        self.assertEqual(frame["atlas_allocations"], 3)
+        self.assertEqual(frame["atlas_releases"], 2)
+
+    def test_load_texture(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "sprite.png")
+        with open(path, "wb") as file:
+            file.write(b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) +
+                       b"IHDR" + struct.pack(">II", 24, 12))
+        texture = load_texture(path)
+        self.assertEqual((texture.width, texture.height), (24, 12))
+        os.remove(path)
+
+        with self.assertRaises(ValueError):
+            load_texture(render_context.__file__)
@@ -1,14 +1,27 @@
 import pyglet
 import tkinter as tk
 from pyglet import gl
-from itertools import cycle
 import gc
-
-
-def next_power_of_2(x):
-    if x == 0:
-        return 0
-    return 1 << ((x - 1).bit_length())
+from itertools import count
+import numpy as np
+from tgm.drivers.atlas import PagedCellAllocator, next_power_of_2
+from tgm.drivers.buffers import (
+    DrawBufferPool, StagingBuffer, RingAllocator, draw_calls_digest
+)
+from tgm.drivers.state import StateCache
+
+# Interleaved 2D vertex layouts, by whether they're compact, with their GL
+# colour and texture coordinate types
+VERTEX_2D_FORMATS = {
+    False: (np.dtype([("position", np.float32, 2),
+                      ("color", np.float32, 4),
+                      ("uv", np.float32, 2)]),
+            gl.GL_FLOAT, gl.GL_FLOAT),
+    True: (np.dtype([("position", np.float32, 2),
+                     ("color", np.uint8, 4),
+                     ("uv", np.int16, 2)]),
+           gl.GL_UNSIGNED_BYTE, gl.GL_SHORT),
+}
 
 
 class Manager:
@@ -28,13 +41,38 @@ class Manager:
 
         cls.tk_root = tk.Tk()
 
-        cls.atlas = TextureAtlas(4096)
+        # GL state, and the state calls issued and skipped over the last
+        # full frame.  Windows are drawn by pyglet after the update which
+        # renders them, so a frame runs from the start of one update to the
+        # start of the next, and the counts lag the texture counts by one
+        cls.state = StateCache()
+        cls.state_counts = {"issued": 0, "skipped": 0}
+
+        # Textures rendered and skipped as unchanged, this frame and last
+        cls.frame_texture_counts = {"rendered": 0, "skipped": 0}
+        cls.texture_counts = {"rendered": 0, "skipped": 0}
+
+        # Whether textures are drawn straight into their atlas cells, rather
+        # than into a target which is then copied into the cell.  Textures
+        # drawing from their own atlas page always use the target, as that
+        # page can't be read while it's being rendered to
+        cls.direct_rendering = True
+
+        max_texture_size = gl.GLint()
+        gl.glGetIntegerv(gl.GL_MAX_TEXTURE_SIZE, max_texture_size)
+        cls.atlas = TextureAtlas(min(4096, max_texture_size.value))
         cls._target = create_texture(1024, 1024)
         cls.buffer_manager = pyglet.image.get_buffer_manager()
         cls.col_buffer = cls.buffer_manager.get_color_buffer()
 
-        cls.vertex_list_2d = pyglet.graphics.vertex_list_indexed(
-            0, [], "v2f/stream", "c4f/stream", "t2f/stream")
+        cls.vertex_buffers_2d = {}
+        cls.vertex_staging_2d = {}
+        for compact, (dtype, _, _) in VERTEX_2D_FORMATS.items():
+            cls.vertex_buffers_2d[compact] = StreamBuffer(
+                gl.GL_ARRAY_BUFFER, 1 << 16, dtype.itemsize)
+            cls.vertex_staging_2d[compact] = StagingBuffer(dtype)
+        cls.index_buffer_2d = StreamBuffer(
+            gl.GL_ELEMENT_ARRAY_BUFFER, 1 << 16, 4)
         cls.quad = pyglet.graphics.vertex_list_indexed(
             4,
             [0, 1, 2, 0, 2, 3],
@@ -70,52 +108,62 @@ class Manager:
                 del cls.fps_list[-1]
             fps = len(cls.fps_list) / sum(cls.fps_list)
 
+            # Taken before updating so that the window draws following the
+            # last update are counted with it
+            cls.state_counts = cls.state.take_counts()
+
+            # pyglet may have changed the state while drawing windows
+            cls.state.invalidate()
+            cls.frame_texture_counts = {"rendered": 0, "skipped": 0}
             cls.update_function(cls.frame_dt, fps)
+            cls.texture_counts = cls.frame_texture_counts
 
             cls.frame_dt = 0
             cls.time_passed -= 1 / cls.target_fps
 
 
 def bind_texture_region(texture, x, y, w, h, premultiplied=False, flip=False):
-    gl.glTexParameteri(
-        gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MIN_FILTER, gl.GL_NEAREST)
-    gl.glTexParameteri(
-        gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MAG_FILTER, gl.GL_NEAREST)
-    gl.glEnable(gl.GL_SCISSOR_TEST)
-
-    gl.glEnable(gl.GL_BLEND)
-    if premultiplied:
-        gl.glBlendFunc(gl.GL_ONE, gl.GL_ONE_MINUS_SRC_ALPHA)
-
-    else:
-        gl.glBlendFuncSeparate(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA,
-                               gl.GL_ONE, gl.GL_ONE_MINUS_SRC_ALPHA)
-
-    gl.glMatrixMode(gl.GL_MODELVIEW)
-    gl.glLoadIdentity()
-
-    gl.glViewport(x, y, w, h)
-    gl.glScissor(x, y, w, h)
-
-    gl.glBindFramebufferEXT(
-        gl.GL_DRAW_FRAMEBUFFER_EXT,
-        Manager.col_buffer.gl_buffer
-    )
+    state = Manager.state
+
+    # Set on whichever texture is bound
+    bound = state.get("texture")
+    if bound is None or state.changed(("filter", bound), gl.GL_NEAREST):
+        gl.glTexParameteri(
+            gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MIN_FILTER, gl.GL_NEAREST)
+        gl.glTexParameteri(
+            gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MAG_FILTER, gl.GL_NEAREST)
+    enable(gl.GL_SCISSOR_TEST)
+
+    enable(gl.GL_BLEND)
+    if state.changed("premultiplied", premultiplied):
+        if premultiplied:
+            gl.glBlendFunc(gl.GL_ONE, gl.GL_ONE_MINUS_SRC_ALPHA)
+
+        else:
+            gl.glBlendFuncSeparate(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA,
+                                   gl.GL_ONE, gl.GL_ONE_MINUS_SRC_ALPHA)
+
+    load_modelview_identity()
+
+    set_viewport(x, y, w, h)
+
+    if state.changed("framebuffer", Manager.col_buffer.gl_buffer):
+        gl.glBindFramebufferEXT(
+            gl.GL_DRAW_FRAMEBUFFER_EXT,
+            Manager.col_buffer.gl_buffer
+        )
 
-    gl.glFramebufferTexture2DEXT(
-        gl.GL_DRAW_FRAMEBUFFER_EXT,
-        gl.GL_COLOR_ATTACHMENT0_EXT,
-        texture.target,
-        texture.id,
-        0
-    )
+    if state.changed(("attachment", Manager.col_buffer.gl_buffer),
+                     texture.id):
+        gl.glFramebufferTexture2DEXT(
+            gl.GL_DRAW_FRAMEBUFFER_EXT,
+            gl.GL_COLOR_ATTACHMENT0_EXT,
+            texture.target,
+            texture.id,
+            0
+        )
 
-    gl.glMatrixMode(gl.GL_PROJECTION)
-    gl.glLoadIdentity()
-    if flip:
-        gl.gluOrtho2D(0, w, h, 0)
-    else:
-        gl.gluOrtho2D(0, w, 0, h)
+    load_projection(w, h, flip)
 
 
 def draw_texture_region(texture, u1, v1, u2, v2, x1, y1, x2, y2):
@@ -134,115 +182,161 @@ def clear_color(r, g, b, a):
 
 
 def bind_window(w, h):
-    gl.glBindFramebufferEXT(gl.GL_DRAW_FRAMEBUFFER_EXT, 0)
-    gl.glMatrixMode(gl.GL_MODELVIEW)
-    gl.glLoadIdentity()
-    gl.glViewport(0, 0, w, h)
-    gl.glScissor(0, 0, w, h);
-    gl.glMatrixMode(gl.GL_PROJECTION)
-    gl.glLoadIdentity()
-    gl.gluOrtho2D(0, w, h, 0)
+    if Manager.state.changed("framebuffer", 0):
+        gl.glBindFramebufferEXT(gl.GL_DRAW_FRAMEBUFFER_EXT, 0)
+    load_modelview_identity()
+    set_viewport(0, 0, w, h)
+    load_projection(w, h, True)
 
 
 def draw_vertex_list(vertex_list, texture):
-    gl.glEnable(gl.GL_TEXTURE_2D)
-    gl.glBindTexture(gl.GL_TEXTURE_2D, texture.id)
+    enable(gl.GL_TEXTURE_2D)
+    bind_texture(texture)
     vertex_list.draw(gl.GL_TRIANGLES)
 
 
-def create_texture(w, h):
-    return pyglet.image.Texture.create(
-        w, h, internalformat=gl.GL_RGBA
-    )
+def enable(capability):
+    if Manager.state.changed(("enabled", capability), True):
+        gl.glEnable(capability)
+
+
+def bind_texture(texture):
+    if Manager.state.changed("texture", texture.id):
+        gl.glBindTexture(gl.GL_TEXTURE_2D, texture.id)
+
+
+def set_matrix_mode(mode):
+    if Manager.state.changed("matrix_mode", mode):
+        gl.glMatrixMode(mode)
+
+
+def load_modelview_identity():
+    # Only ever replaced by the identity, so it needs loading once
+    if Manager.state.changed("modelview", "identity"):
+        set_matrix_mode(gl.GL_MODELVIEW)
+        gl.glLoadIdentity()
+
+
+def load_projection(w, h, flip):
+    if Manager.state.changed("projection", (w, h, flip)):
+        set_matrix_mode(gl.GL_PROJECTION)
+        gl.glLoadIdentity()
+        if flip:
+            gl.gluOrtho2D(0, w, h, 0)
+        else:
+            gl.gluOrtho2D(0, w, 0, h)
+
+
+def set_viewport(x, y, w, h):
+    if Manager.state.changed("viewport", (x, y, w, h)):
+        gl.glViewport(x, y, w, h)
+        gl.glScissor(x, y, w, h)
+
+
+class StreamBuffer:
+    """A GL buffer which data is streamed into every frame.
+
+    Each write goes after the last, in a range nothing is drawing from, so
+    it's uploaded without waiting on the GPU.  When the buffer is full it's
+    orphaned and writing starts again from the beginning.
+    """
+    def __init__(self, target, capacity, item_size):
+        self.target = target
+        self.item_size = item_size
+        self.allocator = RingAllocator(capacity)
+
+        self.id = gl.GLuint()
+        gl.glGenBuffers(1, self.id)
+        self._orphan()
+
+    def write(self, array):
+        """Upload a contiguous array of items, returning the byte offset it
+        was written to."""
+        start, orphan = self.allocator.allocate(len(array))
+        gl.glBindBuffer(self.target, self.id)
+        if orphan:
+            self._orphan()
+
+        offset = start * self.item_size
+        gl.glBufferSubData(self.target, offset, array.nbytes,
+                           array.ctypes.data)
+        return offset
+
+    def _orphan(self):
+        gl.glBindBuffer(self.target, self.id)
+        gl.glBufferData(self.target,
+                        self.allocator.capacity * self.item_size,
+                        None, gl.GL_STREAM_DRAW)
 
 
-def resize_texture(texture, w, h):
-    new_texture = create_texture(w, h)
-    bind_texture_region(new_texture, 0, 0, w, h)
-    draw_texture_region(
-        texture,
-        0, 0, texture.width, texture.height,
-        0, 0, texture.width, texture.height
+def draw_vertices_2d(compact, vertex_offset, index_offset, count, texture):
+    """Draw vertices streamed to the given offset, as indexed triangles or
+    as quads when index_offset is None."""
+    dtype, color_type, uv_type = VERTEX_2D_FORMATS[compact]
+    stride = dtype.itemsize
+
+    enable(gl.GL_TEXTURE_2D)
+    bind_texture(texture)
+
+    # Texture coordinates are in texture pixels
+    set_matrix_mode(gl.GL_TEXTURE)
+    gl.glPushMatrix()
+    gl.glLoadIdentity()
+    gl.glScalef(1 / texture.width, 1 / texture.height, 1)
+
+    # The attribute pointers start at the batch's vertices, so its indices
+    # are used as they are
+    gl.glPushClientAttrib(gl.GL_CLIENT_VERTEX_ARRAY_BIT)
+    gl.glBindBuffer(gl.GL_ARRAY_BUFFER, Manager.vertex_buffers_2d[compact].id)
+    gl.glEnableClientState(gl.GL_VERTEX_ARRAY)
+    gl.glEnableClientState(gl.GL_COLOR_ARRAY)
+    gl.glEnableClientState(gl.GL_TEXTURE_COORD_ARRAY)
+    gl.glVertexPointer(2, gl.GL_FLOAT, stride,
+                       vertex_offset + dtype.fields["position"][1])
+    gl.glColorPointer(4, color_type, stride,
+                      vertex_offset + dtype.fields["color"][1])
+    gl.glTexCoordPointer(2, uv_type, stride,
+                         vertex_offset + dtype.fields["uv"][1])
+
+    if index_offset is None:
+        gl.glDrawArrays(gl.GL_QUADS, 0, count)
+    else:
+        gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER,
+                        Manager.index_buffer_2d.id)
+        gl.glDrawElements(gl.GL_TRIANGLES, count, gl.GL_UNSIGNED_INT,
+                          index_offset)
+        gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, 0)
+
+    gl.glBindBuffer(gl.GL_ARRAY_BUFFER, 0)
+    gl.glPopClientAttrib()
+    gl.glPopMatrix()
+
+
+def create_texture(w, h):
+    texture = pyglet.image.Texture.create(
+        w, h, internalformat=gl.GL_RGBA
     )
-    return new_texture
-
-
-class TextureAtlas:
-    def __init__(self, size):
-        self.texture = create_texture(size, size)
-        self.size = size
-        self.cells = [(0, 0, size, size)]
-
-    def aquire_cell(self, width, height):
-        target_cell_size = next_power_of_2(max(width, height))
-        find_size = target_cell_size
-
-        while True:
-            while find_size <= self.size:
-                for i, cell in enumerate(self.cells):
-                    if cell[2] - cell[0] == find_size:
-                        while find_size > target_cell_size:
-                            cells = self._split_cell(self.cells[i])
-                            self.cells[i:i + 1] = cells
-                            find_size //= 2
-
-                        cell = self.cells.pop(i)
-                        return (
-                            cell[0],
-                            cell[1],
-                            cell[0] + width,
-                            cell[1] + height
-                        )
-                find_size *= 2
-
-            find_size = max(target_cell_size, self.size)
-            self.size_up()
-
-    def size_up(self):
-        self.size *= 2
-        new_size = self.size
-        old_size = new_size // 2
-
-        self.release_cell((old_size, old_size, new_size, new_size))
-        self.release_cell((0, old_size, old_size, new_size))
-        self.release_cell((old_size, 0, new_size, old_size))
-
-        self.texture = resize_texture(self.texture, self.size, self.size)
-        print("RESIZE", self.size)
-
-    def release_cell(self, cell):
-        size = next_power_of_2(max(cell[2] - cell[0], cell[3] - cell[1]))
-        cell = (
-            cell[0],
-            cell[1],
-            cell[0] + size,
-            cell[1] + size
-        )
-        self.cells.insert(0, cell)
 
-        parent_size = size * 2
-        x1 = (cell[0] // parent_size) * parent_size
-        y1 = (cell[1] // parent_size) * parent_size
-        parent_cell = (x1, y1, x1 + parent_size, y1 + parent_size)
+    # Creating a texture binds it, and it may reuse a deleted texture's id
+    Manager.state.invalidate("texture")
+    Manager.state.invalidate(("filter", texture.id))
+    return texture
 
-        siblings = self._split_cell(parent_cell)
 
-        if all(sibling in self.cells for sibling in siblings):
-            for sibling in reversed(siblings):
-                self.cells.remove(sibling)
-            self.release_cell(parent_cell)
+class TextureAtlas(PagedCellAllocator):
+    def __init__(self, page_size):
+        # The texture of each page
+        self.textures = {}
+        super().__init__(page_size)
 
-    def _split_cell(self, cell):
-        x1, y1, x2, y2 = cell
-        mid_x = (x1 + x2) // 2
-        mid_y = (y1 + y2) // 2
+    def add_page(self, size):
+        page = super().add_page(size)
+        self.textures[page] = create_texture(size, size)
+        return page
 
-        return [
-            (x1, y1, mid_x, mid_y),
-            (mid_x, y1, x2, mid_y),
-            (x1, mid_y, mid_x, y2),
-            (mid_x, mid_y, x2, y2)
-        ]
+    def remove_page(self, page):
+        super().remove_page(page)
+        del self.textures[page]
 
 
 def set_update_function(function, fps):
@@ -258,13 +352,16 @@ def load_texture(path):
     image = pyglet.image.load(path)
     texture = Texture(image.width, image.height)
     bind_texture_region(
-        Manager.atlas.texture,
+        Manager.atlas.textures[texture.cell[4]],
         texture.cell[0], texture.cell[1],
         texture.width, texture.height,
         flip=True
     )
     clear_color(0, 0, 0, 0)
     image.blit(0, 0)
+
+    # Blitting binds the image's texture and sets its own state
+    Manager.state.invalidate()
     return texture
 
 
@@ -273,6 +370,10 @@ def run():
     gc.collect()
 
 
+# Numbers telling textures apart for as long as the process runs
+_texture_serials = count()
+
+
 class Texture:
     def __init__(self, width, height):
         self.width = width
@@ -284,50 +385,77 @@ class Texture:
         self.draw_calls = []
         self.cell = Manager.atlas.aquire_cell(width, height)
 
-    def add_draw_2d(self, texture, indices, vertices, colors, uvs):
-        if texture is None:
-            texture = Manager.default_texture
+        self._draw_buffers = DrawBufferPool()
 
-        x, y = texture.cell[:2]
-        # bounds = [(x + 0.5, texture.width - 1), (y + 0.5, texture.height - 1)]
-        bounds = [(x, texture.width), (y, texture.height)]
+        # Retained textures keep their contents, and are only drawn again
+        # when their draw calls or the textures they draw from have changed
+        self.retained = False
+        self.version = 0
+        self._serial = next(_texture_serials)
+        self._sources = set()
+        self._signature = None
 
-        global_uvs = (
-            start + size * factor
-            for factor, (start, size) in zip(uvs, cycle(bounds))
+    def add_draw_2d(self, texture, indices, vertices, colors, uvs,
+                    compact=False):
+        if texture is None:
+            texture = Manager.default_texture
+        self._sources.add(texture)
+
+        # Batches are split where the atlas page or vertex layout changes
+        page = texture.cell[4]
+        layout = (compact, indices is None)
+        if (not self._is_last_draw_action(self._action_draw_2d)
+                or self.draw_calls[-1][1].layout != layout
+                or self.draw_calls[-1][2] != page):
+            self.draw_calls.append((self._action_draw_2d,
+                                    self._draw_buffers.take(*layout), page))
+
+        self.draw_calls[-1][1].add(
+            indices, vertices, colors, uvs,
+            texture.cell[:2], (texture.width, texture.height)
         )
 
-        if not self._is_last_draw_action(self._action_draw_2d):
-            self.draw_calls.append((self._action_draw_2d, [], [], [], []))
-
-        draw_call = self.draw_calls[-1]
-        draw_call[1].extend(len(draw_call[2]) // 2 + index for index in indices)
-        draw_call[2].extend(vertices)
-        draw_call[3].extend(colors)
-        draw_call[4].extend(global_uvs)
-
     def update(self):
         if (self.width, self.height) != self._new_size:
             self._resize(*self._new_size)
 
-        self.start_draw()
+        if not self._draw_calls_changed():
+            self._discard_draw_calls()
+            Manager.frame_texture_counts["skipped"] += 1
+            return
+
+        direct = Manager.direct_rendering and not self._samples_own_page()
+
+        if direct:
+            self.start_direct_draw()
+        else:
+            self.start_draw()
         for draw_call in self.draw_calls:
             draw_call[0](*draw_call[1:])
+        self._discard_draw_calls()
+        if not direct:
+            self.end_draw()
+
+        self.version += 1
+        Manager.frame_texture_counts["rendered"] += 1
+
+    def _discard_draw_calls(self):
         self.draw_calls = []
-        self.end_draw()
+        self._draw_buffers.release_all()
+        self._sources.clear()
 
     def resize(self, width, height):
         self._new_size = (width, height)
 
     def _resize(self, width, height):
-        x1, y1, x2, y2 = self.cell
+        x1, y1, x2, y2, page = self.cell
 
         target = Manager.get_target(self.width, self.height)
 
         bind_texture_region(target, 0, 0, self.width, self.height)
         clear_color(0, 0, 0, 0)
         draw_texture_region(
-            Manager.atlas.texture,
+            Manager.atlas.textures[page],
             x1, y1, x2, y2,
             0, 0, self.width, self.height
         )
@@ -336,7 +464,8 @@ class Texture:
         self.cell = Manager.atlas.aquire_cell(width, height)
         x, y = self.cell[:2]
 
-        bind_texture_region(Manager.atlas.texture, x, y, width, height)
+        bind_texture_region(Manager.atlas.textures[self.cell[4]],
+                            x, y, width, height)
         clear_color(0, 0, 0, 0)
 
         draw_texture_region(
@@ -353,15 +482,27 @@ class Texture:
                 (self._action_clear, red, green, blue, alpha)
             )
 
-    def _action_draw_2d(self, indices, vertices, colors, uvs):
-        Manager.vertex_list_2d.resize(len(vertices) // 2, len(indices))
-        Manager.vertex_list_2d.indices = indices
-        Manager.vertex_list_2d.vertices = vertices
-        Manager.vertex_list_2d.colors = colors
-        Manager.vertex_list_2d.tex_coords = [
-            coord / Manager.atlas.size for coord in uvs
-            ]
-        draw_vertex_list(Manager.vertex_list_2d, Manager.atlas.texture)
+    def _action_draw_2d(self, draw_buffer, page):
+        compact = draw_buffer.compact
+        staging = Manager.vertex_staging_2d[compact]
+        staging.clear()
+        vertices = staging.reserve(len(draw_buffer.vertices))[:, 0]
+        vertices["position"] = draw_buffer.vertices.array
+        vertices["color"] = draw_buffer.colors.array
+        vertices["uv"] = draw_buffer.uvs.array
+        vertex_offset = Manager.vertex_buffers_2d[compact].write(vertices)
+
+        if draw_buffer.quads:
+            index_offset = None
+            count = len(vertices)
+        else:
+            index_offset = Manager.index_buffer_2d.write(
+                draw_buffer.indices.array
+            )
+            count = len(draw_buffer.indices)
+
+        draw_vertices_2d(compact, vertex_offset, index_offset, count,
+                         Manager.atlas.textures[page])
 
     def _action_clear(self, r, g, b, a):
         clear_color(r, g, b, a)
@@ -372,10 +513,33 @@ class Texture:
             0, 0, self.width, self.height
         )
 
+    def start_direct_draw(self):
+        """Render straight into the texture's cell of its atlas page, which
+        is cleared first as end_draw clears it before copying the target.
+
+        Only used when no batch draws from the same page, as reading the
+        texture being rendered to is a feedback loop which GL leaves
+        undefined, even though the cells read and written never overlap.
+        """
+        x, y = self.cell[:2]
+        bind_texture_region(
+            Manager.atlas.textures[self.cell[4]],
+            x, y, self.width, self.height
+        )
+        clear_color(0, 0, 0, 0)
+
+    def _samples_own_page(self):
+        """Whether any queued batch draws from the texture's atlas page."""
+        page = self.cell[4]
+        return any(draw_call[0] == self._action_draw_2d
+                   and draw_call[2] == page
+                   for draw_call in self.draw_calls)
+
     def end_draw(self):
         x, y = self.cell[:2]
         bind_texture_region(
-            Manager.atlas.texture, x, y, self.width, self.height,
+            Manager.atlas.textures[self.cell[4]],
+            x, y, self.width, self.height,
             premultiplied=True
         )
         clear_color(0, 0, 0, 0)
@@ -384,6 +548,25 @@ class Texture:
             0, 0, self.width, self.height, 0, 0, self.width, self.height
         )
 
+    def _draw_calls_changed(self):
+        """Whether the queued draw calls would draw anything different from
+        what was drawn last time, always True unless it's retained."""
+        if not self.retained:
+            self._signature = None
+            return True
+
+        # Keyed by serial number, as an id could be reused by a texture
+        # created after another was freed, and keeping the textures
+        # themselves would stop them being freed
+        sources = frozenset(
+            (texture._serial, texture.version) for texture in self._sources
+        )
+        signature = (self.width, self.height,
+                     draw_calls_digest(self.draw_calls), sources)
+        changed = signature != self._signature
+        self._signature = signature
+        return changed
+
     def _is_last_draw_action(self, fnc):
         try:
             return self.draw_calls[-1][0] == fnc
@@ -391,7 +574,9 @@ class Texture:
             return False
 
     def destroy(self):
-        Manager.atlas.release_cell(self.cell)
+        if self.cell is not None:
+            Manager.atlas.release_cell(self.cell)
+            self.cell = None
 
     def __del__(self):
         self.destroy()
@@ -418,11 +603,14 @@ class Window(Texture):
 
         @self.window.event
         def on_draw():
-            x1, y1, x2, y2 = self.cell
+            # Between frames pyglet may have changed the state, such as the
+            # viewport when the window was resized
+            Manager.state.invalidate()
+            x1, y1, x2, y2, page = self.cell
             bind_window(self.window.width, self.window.height)
             clear_color(0, 0, 0, 1)
             draw_texture_region(
-                Manager.atlas.texture,
+                Manager.atlas.textures[page],
                 x1, y1, x2, y2,
                 0, 0, self.window.width, self.window.height
             )
@@ -0,0 +1,188 @@
+from unittest import TestCase, mock
+import ctypes
+import sys
+import types
+import numpy as np
+
+
+class FakeGL(types.ModuleType):
+    """Stands in for pyglet.gl, recording the GL calls made through it.
+
+    Constants are given distinct values as they're first looked up.
+    """
+    GLint = ctypes.c_int
+    GLuint = ctypes.c_uint
+
+    def __init__(self):
+        super().__init__("pyglet.gl")
+        self.calls = []
+        self.constants = {}
+        self.buffers = 0
+
+    def __getattr__(self, name):
+        if name.startswith("GL_"):
+            return self.constants.setdefault(name, len(self.constants) + 1)
+        if name.startswith("gl"):
+            return lambda *args: self.calls.append((name,) + args)
+        raise AttributeError(name)
+
+    def glGetIntegerv(self, name, value):
+        value.value = 4096
+
+    def glGenBuffers(self, count, buffer):
+        self.buffers += 1
+        buffer.value = self.buffers
+
+    def named(self, name):
+        """The arguments of each recorded call to a function."""
+        return [call[1:] for call in self.calls if call[0] == name]
+
+
+class FakeTexture:
+    ids = 0
+
+    def __init__(self, width, height):
+        FakeTexture.ids += 1
+        self.id = FakeTexture.ids
+        self.width = width
+        self.height = height
+        self.target = "GL_TEXTURE_2D"
+
+
+def create_texture(width, height, internalformat):
+    return FakeTexture(width, height)
+
+
+gl = FakeGL()
+pyglet = mock.MagicMock()
+pyglet.gl = gl
+pyglet.image.Texture.create.side_effect = create_texture
+
+# The driver is imported against the fakes, which are only installed while
+# it's imported
+with mock.patch.dict(sys.modules, {"pyglet": pyglet, "pyglet.gl": gl,
+                                   "tkinter": mock.MagicMock()}):
+    from tgm.drivers.pyglet import render_context
+
+Manager = render_context.Manager
+
+
+class TestPygletRenderContext(TestCase):
+    def setUp(self):
+        Manager.initialized = False
+        Manager.init()
+        del gl.calls[:]
+
+    def test_stream_buffer(self):
+        buffer = render_context.StreamBuffer(gl.GL_ARRAY_BUFFER, 8, 4)
+        self.assertEqual(gl.named("glBufferData"),
+                         [(gl.GL_ARRAY_BUFFER, 32, None, gl.GL_STREAM_DRAW)])
+
+        # writes follow one another without orphaning
+        del gl.calls[:]
+        items = np.arange(3, dtype=np.float32)
+        self.assertEqual(buffer.write(items), 0)
+        self.assertEqual(buffer.write(items), 12)
+        self.assertEqual(gl.named("glBufferData"), [])
+        self.assertEqual([call[:3] for call in gl.named("glBufferSubData")],
+                         [(gl.GL_ARRAY_BUFFER, 0, 12),
+                          (gl.GL_ARRAY_BUFFER, 12, 12)])
+
+        # a write which doesn't fit orphans the buffer and starts again
+        del gl.calls[:]
+        self.assertEqual(buffer.write(items), 0)
+        self.assertEqual(gl.named("glBufferData"),
+                         [(gl.GL_ARRAY_BUFFER, 32, None, gl.GL_STREAM_DRAW)])
+
+        # one larger than the buffer grows it
+        del gl.calls[:]
+        self.assertEqual(buffer.write(np.arange(20, dtype=np.float32)), 0)
+        self.assertEqual(gl.named("glBufferData"),
+                         [(gl.GL_ARRAY_BUFFER, 128, None, gl.GL_STREAM_DRAW)])
+        self.assertEqual(gl.named("glBufferSubData")[0][:3],
+                         (gl.GL_ARRAY_BUFFER, 0, 80))
+
+    def test_draw_2d(self):
+        texture = render_context.Texture(16, 16)
+        sprite = render_context.Texture(8, 8)
+        stride = render_context.VERTEX_2D_FORMATS[False][0].itemsize
+
+        # consecutive draws from a page are batched into one indexed draw
+        del gl.calls[:]
+        quad = ([0, 1, 2, 0, 2, 3], [0, 0, 8, 0, 8, 8, 0, 8], [1] * 16,
+                [0, 0, 1, 0, 1, 1, 0, 1])
+        texture.add_draw_2d(sprite, *quad)
+        texture.add_draw_2d(sprite, *quad)
+        texture.update()
+        self.assertEqual(
+            [call[:3] for call in gl.named("glBufferSubData")],
+            [(gl.GL_ARRAY_BUFFER, 0, 8 * stride),
+             (gl.GL_ELEMENT_ARRAY_BUFFER, 0, 12 * 4)]
+        )
+        self.assertEqual(gl.named("glDrawElements"),
+                         [(gl.GL_TRIANGLES, 12, gl.GL_UNSIGNED_INT, 0)])
+        self.assertEqual(gl.named("glVertexPointer"),
+                         [(2, gl.GL_FLOAT, stride, 0)])
+
+        # the next batch is streamed after the last
+        del gl.calls[:]
+        texture.add_draw_2d(sprite, *quad)
+        texture.update()
+        self.assertEqual(gl.named("glVertexPointer"),
+                         [(2, gl.GL_FLOAT, stride, 8 * stride)])
+        self.assertEqual(gl.named("glDrawElements"),
+                         [(gl.GL_TRIANGLES, 6, gl.GL_UNSIGNED_INT, 12 * 4)])
+
+    def test_draw_2d_compact_quads(self):
+        texture = render_context.Texture(16, 16)
+        sprite = render_context.Texture(8, 8)
+        stride = render_context.VERTEX_2D_FORMATS[True][0].itemsize
+        self.assertEqual(stride, 16)
+
+        # quads are drawn from their vertices alone, with uint8 colours and
+        # int16 texture coordinates
+        del gl.calls[:]
+        texture.add_draw_2d(sprite, None, [0, 0, 8, 0, 8, 8, 0, 8],
+                            [255] * 16, [0, 0, 1, 0, 1, 1, 0, 1],
+                            compact=True)
+        texture.update()
+        self.assertEqual(
+            [call[:3] for call in gl.named("glBufferSubData")],
+            [(gl.GL_ARRAY_BUFFER, 0, 4 * stride)]
+        )
+        self.assertEqual(gl.named("glDrawArrays"), [(gl.GL_QUADS, 0, 4)])
+        self.assertEqual(gl.named("glDrawElements"), [])
+        self.assertEqual(gl.named("glVertexPointer"),
+                         [(2, gl.GL_FLOAT, stride, 0)])
+        self.assertEqual(gl.named("glColorPointer"),
+                         [(4, gl.GL_UNSIGNED_BYTE, stride, 8)])
+        self.assertEqual(gl.named("glTexCoordPointer"),
+                         [(2, gl.GL_SHORT, stride, 12)])
+
+    def test_state_calls(self):
+        target = Manager.get_target(16, 16)
+        render_context.bind_texture_region(target, 0, 0, 16, 16)
+        Manager.state.take_counts()
+
+        # binding the same region again changes no state, so makes no calls
+        del gl.calls[:]
+        render_context.bind_texture_region(target, 0, 0, 16, 16)
+        self.assertEqual(gl.calls, [])
+        counts = Manager.state.take_counts()
+        self.assertEqual(counts["issued"], 0)
+        self.assertGreater(counts["skipped"], 0)
+
+        # only the state which changed is set, the matrix mode is still
+        # the projection
+        render_context.bind_texture_region(target, 0, 0, 8, 8)
+        self.assertEqual([call[0] for call in gl.calls],
+                         ["glViewport", "glScissor", "glLoadIdentity",
+                          "gluOrtho2D"])
+
+        # and everything is set again once the state is invalidated
+        del gl.calls[:]
+        Manager.state.invalidate()
+        render_context.bind_texture_region(target, 0, 0, 8, 8)
+        self.assertEqual(len(gl.named("glBindFramebufferEXT")), 1)
+        self.assertEqual(len(gl.named("glFramebufferTexture2DEXT")), 1)
+        self.assertEqual(len(gl.named("glTexParameteri")), 2)
@@ -0,0 +1,143 @@
+"""Reading and writing PNG images as NumPy arrays, with only zlib.
+
+Supports 8 bit greyscale, RGB and RGBA images without interlacing, which
+covers what image editors export for sprites.
+"""
+import struct
+import zlib
+import numpy as np
+
+_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Colour types and their channels
+_CHANNELS = {0: 1, 2: 3, 4: 2, 6: 4}
+
+
+def read_png(path):
+    """Read a PNG image into a uint8 array of shape (height, width, 4)."""
+    with open(path, "rb") as file:
+        data = file.read()
+    if data[:8] != _SIGNATURE:
+        raise ValueError("{} is not a PNG image".format(path))
+
+    offset = 8
+    header = None
+    compressed = []
+    while offset < len(data):
+        length, kind = struct.unpack_from(">I4s", data, offset)
+        chunk = data[offset + 8:offset + 8 + length]
+        offset += 12 + length
+        if kind == b"IHDR":
+            header = struct.unpack(">IIBBBBB", chunk)
+        elif kind == b"IDAT":
+            compressed.append(chunk)
+        elif kind == b"IEND":
+            break
+
+    width, height, depth, colour_type, _, _, interlace = header
+    if depth != 8 or colour_type not in _CHANNELS or interlace:
+        raise ValueError(
+            "{} uses an unsupported PNG format, only 8 bit greyscale, RGB "
+            "and RGBA without interlacing can be read".format(path)
+        )
+
+    channels = _CHANNELS[colour_type]
+    rows = _unfilter(zlib.decompress(b"".join(compressed)),
+                     width * channels, height, channels)
+    pixels = rows.reshape(height, width, channels)
+
+    if channels < 3:
+        grey = pixels[..., :1]
+        alpha = pixels[..., 1:] if channels == 2 else None
+        pixels = np.concatenate([grey, grey, grey], axis=2)
+    else:
+        alpha = pixels[..., 3:] if channels == 4 else None
+        pixels = pixels[..., :3]
+
+    if alpha is None:
+        alpha = np.full((height, width, 1), 255, np.uint8)
+    return np.ascontiguousarray(np.concatenate([pixels, alpha], axis=2))
+
+
+def write_png(path, pixels):
+    """Write a uint8 array of shape (height, width, 4) as an RGBA PNG."""
+    pixels = np.ascontiguousarray(pixels, dtype=np.uint8)
+    height, width = pixels.shape[:2]
+
+    # Each row is stored unfiltered, marked with filter type 0
+    rows = np.zeros((height, width * 4 + 1), np.uint8)
+    rows[:, 1:] = pixels.reshape(height, width * 4)
+
+    with open(path, "wb") as file:
+        file.write(_SIGNATURE)
+        _write_chunk(file, b"IHDR",
+                     struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+        _write_chunk(file, b"IDAT", zlib.compress(rows.tobytes()))
+        _write_chunk(file, b"IEND", b"")
+
+
+def _write_chunk(file, kind, data):
+    file.write(struct.pack(">I", len(data)))
+    file.write(kind)
+    file.write(data)
+    file.write(struct.pack(">I", zlib.crc32(kind + data)))
+
+
+def _unfilter(data, stride, height, channels):
+    """Undo the filter applied to each row of the image data."""
+    raw = np.frombuffer(data, np.uint8).reshape(height, stride + 1)
+    rows = np.zeros((height, stride), np.uint8)
+    previous = np.zeros(stride, np.uint8)
+
+    for y in range(height):
+        kind = raw[y, 0]
+        row = raw[y, 1:]
+
+        if kind == 0:
+            current = row.copy()
+        elif kind == 1:
+            # Each byte adds the one a pixel before, a running sum for each
+            # channel
+            current = np.cumsum(
+                row.reshape(-1, channels), axis=0, dtype=np.uint8
+            ).reshape(-1)
+        elif kind == 2:
+            current = row + previous
+        else:
+            current = _unfilter_row(kind, row, previous, channels)
+
+        rows[y] = current
+        previous = current
+
+    return rows
+
+
+def _unfilter_row(kind, row, previous, channels):
+    """Undo the Average or Paeth filters, which depend on the bytes decoded
+    before them so can't be vectorised."""
+    row = row.tolist()
+    above = previous.tolist()
+    current = [0] * len(row)
+
+    for i, value in enumerate(row):
+        left = current[i - channels] if i >= channels else 0
+        if kind == 3:
+            current[i] = (value + (left + above[i]) // 2) & 0xFF
+        elif kind == 4:
+            upper_left = above[i - channels] if i >= channels else 0
+            estimate = left + above[i] - upper_left
+            distance_left = abs(estimate - left)
+            distance_above = abs(estimate - above[i])
+            distance_upper_left = abs(estimate - upper_left)
+            if (distance_left <= distance_above
+                    and distance_left <= distance_upper_left):
+                predictor = left
+            elif distance_above <= distance_upper_left:
+                predictor = above[i]
+            else:
+                predictor = upper_left
+            current[i] = (value + predictor) & 0xFF
+        else:
+            raise ValueError("Unknown PNG filter type {}".format(kind))
+
+    return np.array(current, np.uint8)
@@ -0,0 +1,146 @@
+"""Vectorised triangle rasterisation into NumPy framebuffers.
+
+Framebuffers are float32 arrays of shape (height, width, 4) holding RGBA
+values from 0 to 1, with pixel (x, y) at [y, x].  Triangles are textured
+from an atlas framebuffer with nearest sampling, modulated by their vertex
+colours and alpha blended in order, matching the fixed-function pipeline the
+pyglet driver sets up.
+"""
+import numpy as np
+
+# Fragments generated at once, bounding memory use for large triangles
+MAX_FRAGMENTS = 1 << 18
+
+
+def clear(target, red=0, green=0, blue=0, alpha=0):
+    """Fill a framebuffer with a colour."""
+    target[...] = (red, green, blue, alpha)
+
+
+def draw_triangles(target, atlas, positions, colors, uvs):
+    """Draw a batch of triangles into the target framebuffer.
+
+    positions has shape (n, 3, 2) in target pixels, colors (n, 3, 4) and
+    uvs (n, 3, 2) in atlas pixels.  Later triangles are drawn over earlier
+    ones.
+    """
+    positions = np.array(positions, np.float64).reshape(-1, 3, 2)
+    colors = np.array(colors, np.float32).reshape(-1, 3, 4)
+    uvs = np.array(uvs, np.float64).reshape(-1, 3, 2)
+
+    # Wind every triangle anticlockwise so their edge functions agree,
+    # dropping those with no area
+    edge_a = positions[:, 1] - positions[:, 0]
+    edge_b = positions[:, 2] - positions[:, 0]
+    area = edge_a[:, 0] * edge_b[:, 1] - edge_a[:, 1] * edge_b[:, 0]
+    flip = area < 0
+    for array in (positions, colors, uvs):
+        array[flip] = array[flip][:, [0, 2, 1]]
+    area = np.abs(area)
+    keep = area > 0
+    positions, colors, uvs, area = (positions[keep], colors[keep],
+                                    uvs[keep], area[keep])
+    if not len(positions):
+        return
+
+    # Pixels whose centres are within each triangle's bounding box
+    height, width = target.shape[:2]
+    low = np.ceil(positions.min(axis=1) - 0.5).astype(np.int64)
+    high = np.floor(positions.max(axis=1) - 0.5).astype(np.int64)
+    low = np.maximum(low, 0)
+    high = np.minimum(high, (width - 1, height - 1))
+    box_width = np.maximum(high[:, 0] - low[:, 0] + 1, 0)
+    box_height = np.maximum(high[:, 1] - low[:, 1] + 1, 0)
+    counts = box_width * box_height
+
+    # Draw in chunks of whole triangles, keeping their order
+    start = 0
+    totals = np.cumsum(counts)
+    while start < len(counts):
+        base = totals[start - 1] if start else 0
+        end = int(np.searchsorted(totals, base + MAX_FRAGMENTS, "right"))
+        end = max(end, start + 1)
+        chunk = slice(start, end)
+        _draw_chunk(target, atlas, positions[chunk], colors[chunk],
+                    uvs[chunk], area[chunk], low[chunk], box_width[chunk],
+                    counts[chunk])
+        start = end
+
+
+def _draw_chunk(target, atlas, positions, colors, uvs, area, low,
+                box_width, counts):
+    total = int(counts.sum())
+    if not total:
+        return
+
+    # One fragment per pixel in each bounding box
+    triangle = np.repeat(np.arange(len(counts)), counts)
+    offset = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    row_width = box_width[triangle]
+    x = low[triangle, 0] + offset % row_width
+    y = low[triangle, 1] + offset // row_width
+
+    # The edge opposite vertex i runs from vertex i + 1 to i + 2, and its
+    # edge function, a * x + b * y + c, is vertex i's barycentric weight
+    # scaled by the area
+    edge_start = positions[:, [1, 2, 0]]
+    edge_end = positions[:, [2, 0, 1]]
+    dx = edge_end[..., 0] - edge_start[..., 0]
+    dy = edge_end[..., 1] - edge_start[..., 1]
+    a = -dy
+    b = dx
+    c = dy * edge_start[..., 0] - dx * edge_start[..., 1]
+
+    # Pixels exactly on an edge shared by two triangles belong to only one
+    # of them, so nothing is blended twice
+    owns_edge = (dy < 0) | ((dy == 0) & (dx > 0))
+
+    centre_x = (x + 0.5)[:, None]
+    centre_y = (y + 0.5)[:, None]
+    edges = a[triangle] * centre_x + b[triangle] * centre_y + c[triangle]
+    inside = ((edges > 0) | ((edges == 0) & owns_edge[triangle])).all(axis=1)
+
+    triangle, x, y = triangle[inside], x[inside], y[inside]
+    weights = (edges[inside] / area[triangle, None]).astype(np.float32)
+
+    color = np.einsum("fv,fvc->fc", weights, colors[triangle])
+    uv = np.einsum("fv,fvc->fc", weights, uvs[triangle].astype(np.float32))
+
+    atlas_height, atlas_width = atlas.shape[:2]
+    u = np.clip(uv[:, 0].astype(np.int64), 0, atlas_width - 1)
+    v = np.clip(uv[:, 1].astype(np.int64), 0, atlas_height - 1)
+    source = atlas[v, u] * color
+
+    _blend(target, x, y, source)
+
+
+def _blend(target, x, y, source):
+    """Alpha blend fragments into the target in order.
+
+    Fragments covering the same pixel are blended in separate passes, each
+    pass taking the next fragment of every pixel.
+    """
+    pixel = y * target.shape[1] + x
+    order = np.argsort(pixel, kind="stable")
+    pixel = pixel[order]
+
+    # The rank of each fragment among those covering its pixel
+    first = np.ones(len(pixel), bool)
+    first[1:] = pixel[1:] != pixel[:-1]
+    group_start = np.maximum.accumulate(
+        np.where(first, np.arange(len(pixel)), 0)
+    )
+    rank = np.arange(len(pixel)) - group_start
+
+    x, y, source = x[order], y[order], source[order]
+    for layer in range(int(rank.max()) + 1 if len(rank) else 0):
+        selected = rank == layer
+        layer_x, layer_y = x[selected], y[selected]
+        src = source[selected]
+        dst = target[layer_y, layer_x]
+
+        alpha = src[:, 3:]
+        result = np.empty_like(dst)
+        result[:, :3] = src[:, :3] * alpha + dst[:, :3] * (1 - alpha)
+        result[:, 3:] = alpha + dst[:, 3:] * (1 - alpha)
+        target[layer_y, layer_x] = result
@@ -0,0 +1,278 @@
+"""A render driver which rasterises into NumPy arrays, without OpenGL.
+
+Textures live in cells of an atlas framebuffer just as in the pyglet
+driver, and draws are rasterised when a texture is updated, so the pixels
+match what the pyglet driver would produce.  It's for offscreen rendering,
+such as golden image tests and thumbnails:
+
+>>> window = Window(320, 240)
+>>> draw_scene(window)
+>>> window.update()
+>>> window.save("thumbnail.png")
+
+The frame loop is run as fast as possible with a fixed time step, as in the
+headless driver.
+"""
+from itertools import count
+import numpy as np
+from tgm.drivers.atlas import PagedCellAllocator
+from tgm.drivers.buffers import DrawBufferPool, draw_calls_digest
+from tgm.drivers.software.png import read_png, write_png
+from tgm.drivers.software.rasterizer import clear, draw_triangles
+
+
+class Manager:
+    initialized = False
+
+    @classmethod
+    def init(cls):
+        if cls.initialized:
+            return
+        cls.initialized = True
+
+        cls.target_fps = 60
+        cls.update_function = None
+        cls.running = False
+        cls.frames = 0
+
+        # Textures rendered and skipped as unchanged, this frame and last
+        cls.frame_texture_counts = {"rendered": 0, "skipped": 0}
+        cls.texture_counts = {"rendered": 0, "skipped": 0}
+
+        cls.atlas = SoftwareAtlas(256)
+        cls.default_texture = Texture(1, 1)
+        clear(cls.default_texture.pixels(), 1, 1, 1, 1)
+
+
+class SoftwareAtlas(PagedCellAllocator):
+    def __init__(self, page_size):
+        # The pixels of each page
+        self.page_pixels = {}
+        super().__init__(page_size)
+
+    def add_page(self, size):
+        page = super().add_page(size)
+        self.page_pixels[page] = np.zeros((size, size, 4), np.float32)
+        return page
+
+    def remove_page(self, page):
+        super().remove_page(page)
+        del self.page_pixels[page]
+
+
+def set_update_function(function, fps):
+    Manager.init()
+    Manager.update_function = function
+    set_fps(fps)
+
+
+def set_fps(fps):
+    Manager.init()
+    Manager.target_fps = fps
+
+
+def load_texture(path):
+    image = read_png(path).astype(np.float32) / 255
+    texture = Texture(image.shape[1], image.shape[0])
+
+    # Blended onto the cleared cell, as the pyglet driver blits images
+    alpha = image[..., 3:]
+    pixels = texture.pixels()
+    pixels[..., :3] = image[..., :3] * alpha
+    pixels[..., 3:] = alpha
+    return texture
+
+
+def run(frames=None):
+    """Run the frame loop as fast as possible, for the given number of frames
+    or until stop is called, giving each frame a time step of 1 / fps."""
+    Manager.init()
+    Manager.running = True
+    Manager.frames = 0
+
+    while Manager.running and (frames is None or Manager.frames < frames):
+        if Manager.update_function is None:
+            break
+        Manager.frame_texture_counts = {"rendered": 0, "skipped": 0}
+        Manager.update_function(1 / Manager.target_fps, Manager.target_fps)
+        Manager.texture_counts = Manager.frame_texture_counts
+        Manager.frames += 1
+
+    Manager.running = False
+
+
+def stop():
+    """Stop run after the current frame."""
+    Manager.running = False
+
+
+# Numbers telling textures apart for as long as the process runs
+_texture_serials = count()
+
+
+class Texture:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self._new_size = (width, height)
+
+        Manager.init()
+
+        self.draw_calls = []
+        self.cell = Manager.atlas.aquire_cell(width, height)
+
+        # The cell is released to the atlas it came from, even once the
+        # driver has been restarted with a new one
+        self._atlas = Manager.atlas
+
+        self._draw_buffers = DrawBufferPool()
+
+        # Retained textures keep their contents, and are only drawn again
+        # when their draw calls or the textures they draw from have changed
+        self.retained = False
+        self.version = 0
+        self._serial = next(_texture_serials)
+        self._sources = set()
+        self._signature = None
+
+    def pixels(self):
+        """Return a view of the texture's cell of the atlas, as an array of
+        shape (height, width, 4)."""
+        x, y = self.cell[:2]
+        pixels = Manager.atlas.page_pixels[self.cell[4]]
+        return pixels[y:y + self.height, x:x + self.width]
+
+    def read_pixels(self):
+        """Return a copy of the texture's pixels as uint8 RGBA values."""
+        pixels = np.clip(self.pixels() * 255 + 0.5, 0, 255)
+        return pixels.astype(np.uint8)
+
+    def save(self, path):
+        """Write the texture to a PNG image."""
+        write_png(path, self.read_pixels())
+
+    def add_draw_2d(self, texture, indices, vertices, colors, uvs,
+                    compact=False):
+        if texture is None:
+            texture = Manager.default_texture
+        self._sources.add(texture)
+
+        # Batches are split where the atlas page or vertex layout changes
+        page = texture.cell[4]
+        layout = (compact, indices is None)
+        if (not self._is_last_draw_action(self._action_draw_2d)
+                or self.draw_calls[-1][1].layout != layout
+                or self.draw_calls[-1][2] != page):
+            self.draw_calls.append((self._action_draw_2d,
+                                    self._draw_buffers.take(*layout), page))
+
+        self.draw_calls[-1][1].add(
+            indices, vertices, colors, uvs,
+            texture.cell[:2], (texture.width, texture.height)
+        )
+
+    def update(self):
+        if (self.width, self.height) != self._new_size:
+            self._resize(*self._new_size)
+
+        if not self._draw_calls_changed():
+            self._discard_draw_calls()
+            Manager.frame_texture_counts["skipped"] += 1
+            return
+
+        for draw_call in self.draw_calls:
+            draw_call[0](*draw_call[1:])
+        self._discard_draw_calls()
+
+        self.version += 1
+        Manager.frame_texture_counts["rendered"] += 1
+
+    def _discard_draw_calls(self):
+        self.draw_calls = []
+        self._draw_buffers.release_all()
+        self._sources.clear()
+
+    def resize(self, width, height):
+        self._new_size = (width, height)
+
+    def _resize(self, width, height):
+        old_pixels = self.pixels().copy()
+
+        Manager.atlas.release_cell(self.cell)
+        self.cell = Manager.atlas.aquire_cell(width, height)
+        self.width = width
+        self.height = height
+
+        # The old contents are kept at the same position
+        pixels = self.pixels()
+        clear(pixels)
+        kept_height = min(height, old_pixels.shape[0])
+        kept_width = min(width, old_pixels.shape[1])
+        pixels[:kept_height, :kept_width] = (
+            old_pixels[:kept_height, :kept_width]
+        )
+
+    def add_clear(self, red=0, green=0, blue=0, alpha=0):
+        if not self._is_last_draw_action(self._action_clear):
+            self.draw_calls.append(
+                (self._action_clear, red, green, blue, alpha)
+            )
+
+    def _action_draw_2d(self, draw_buffer, page):
+        indices = draw_buffer.triangle_indices()
+        colors = draw_buffer.colors.array[indices]
+        if draw_buffer.compact:
+            colors = colors / np.float32(255)
+        draw_triangles(self.pixels(), Manager.atlas.page_pixels[page],
+                       draw_buffer.vertices.array[indices], colors,
+                       draw_buffer.uvs.array[indices])
+
+    def _action_clear(self, r, g, b, a):
+        clear(self.pixels(), r, g, b, a)
+
+    def _draw_calls_changed(self):
+        """Whether the queued draw calls would draw anything different from
+        what was drawn last time, always True unless it's retained."""
+        if not self.retained:
+            self._signature = None
+            return True
+
+        # Keyed by serial number, as an id could be reused by a texture
+        # created after another was freed, and keeping the textures
+        # themselves would stop them being freed
+        sources = frozenset(
+            (texture._serial, texture.version) for texture in self._sources
+        )
+        signature = (self.width, self.height,
+                     draw_calls_digest(self.draw_calls), sources)
+        changed = signature != self._signature
+        self._signature = signature
+        return changed
+
+    def _is_last_draw_action(self, fnc):
+        try:
+            return self.draw_calls[-1][0] == fnc
+        except IndexError:
+            return False
+
+    def destroy(self):
+        if self.cell is not None:
+            self._atlas.release_cell(self.cell)
+            self.cell = None
+
+    def __del__(self):
+        self.destroy()
+
+
+class Window(Texture):
+    def __init__(self, width, height, caption="", resizable=True):
+        super().__init__(width, height)
+
+        self.caption = caption
+        self.mouse_x = width // 2
+        self.mouse_y = height // 2
+        self.mouse_buttons = set()
+        self.keys = set()
+
+    def set_caption(self, caption):
+        self.caption = caption
@@ -0,0 +1,184 @@
+from unittest import TestCase
+import gc
+import os
+import tempfile
+import numpy as np
+from tgm.drivers.software.png import read_png, write_png
+from tgm.drivers.software.rasterizer import draw_triangles
+from tgm.drivers.software.render_context import (
+    Manager, Texture, Window, load_texture, run, set_update_function, stop
+)
+
+QUAD = [0, 1, 2, 0, 2, 3]
+UNIT_UVS = [0, 0, 1, 0, 1, 1, 0, 1]
+
+
+def rectangle(x1, y1, x2, y2):
+    return [x1, y1, x2, y1, x2, y2, x1, y2]
+
+
+class TestRasterizer(TestCase):
+    def test_triangle(self):
+        target = np.zeros((4, 4, 4), np.float32)
+        atlas = np.ones((1, 1, 4), np.float32)
+        draw_triangles(target, atlas, [[(0, 0), (4, 0), (0, 4)]],
+                       [[(1, 0, 0, 1)] * 3], [[(0, 0)] * 3])
+
+        # pixels whose centres lie on the diagonal edge belong to the
+        # triangle on its other side
+        covered = target[..., 3] == 1
+        self.assertEqual(covered.sum(), 6)
+        self.assertTrue(covered[0, :3].all())
+        self.assertFalse(covered[0, 3])
+        self.assertEqual(tuple(target[0, 0]), (1, 0, 0, 1))
+
+    def test_shared_edges(self):
+        target = np.zeros((8, 8, 4), np.float32)
+        atlas = np.ones((1, 1, 4), np.float32)
+        corners = np.array([(0, 0), (8, 0), (8, 8), (0, 8)], float)
+        draw_triangles(target, atlas, corners[QUAD].reshape(2, 3, 2),
+                       np.full((2, 3, 4), 0.5, np.float32),
+                       np.zeros((2, 3, 2)))
+
+        # every pixel is blended exactly once
+        self.assertTrue(np.allclose(target[..., 3], 0.5))
+
+    def test_overdraw_order(self):
+        target = np.zeros((2, 2, 4), np.float32)
+        atlas = np.ones((1, 1, 4), np.float32)
+        triangles = [[(0, 0), (4, 0), (0, 4)]] * 2
+        colors = [[(1, 0, 0, 1)] * 3, [(0, 0, 1, 0.5)] * 3]
+        draw_triangles(target, atlas, triangles, colors, np.zeros((2, 3, 2)))
+        self.assertTrue(np.allclose(target[0, 0], (0.5, 0, 0.5, 1)))
+
+
+class TestSoftwareRenderContext(TestCase):
+    def setUp(self):
+        gc.collect()
+        Manager.initialized = False
+        Manager.init()
+
+    def test_draw(self):
+        window = Window(16, 16)
+        window.add_clear(0, 0, 0, 1)
+        window.add_draw_2d(None, QUAD, rectangle(4, 4, 12, 8),
+                           [0, 1, 0, 1] * 4, UNIT_UVS)
+        window.update()
+
+        pixels = window.read_pixels()
+        self.assertEqual(tuple(pixels[5, 5]), (0, 255, 0, 255))
+        self.assertEqual(tuple(pixels[9, 5]), (0, 0, 0, 255))
+        self.assertEqual((pixels[..., 1] == 255).sum(), 8 * 4)
+
+    def test_compact_quads(self):
+        window = Window(16, 16)
+        window.add_draw_2d(None, None, rectangle(4, 4, 12, 8),
+                           [0, 1, 0, 1] * 4, UNIT_UVS, compact=True)
+        window.add_draw_2d(None, QUAD, rectangle(0, 0, 2, 2),
+                           [1, 0, 0, 1] * 4, UNIT_UVS)
+        self.assertEqual(len(window.draw_calls), 2)
+        window.update()
+
+        pixels = window.read_pixels()
+        self.assertEqual((pixels[..., 1] == 255).sum(), 8 * 4)
+        self.assertEqual((pixels[..., 0] == 255).sum(), 2 * 2)
+
+    def test_retained(self):
+        panel = Texture(8, 8)
+        panel.retained = True
+        frames = []
+
+        def update(dt, fps):
+            frames.append(dict(Manager.texture_counts))
+            panel.add_clear(1, 0, 0, 1)
+            panel.update()
+            if len(frames) == 3:
+                # drawn over behind the driver's back, which a retained
+                # texture keeps
+                panel.pixels()[0, 0] = 0
+
+        set_update_function(update, 60)
+        run(frames=5)
+        self.assertEqual(frames[1:], [{"rendered": 1, "skipped": 0}] +
+                         [{"rendered": 0, "skipped": 1}] * 3)
+        self.assertEqual(tuple(panel.read_pixels()[0, 0]), (0, 0, 0, 0))
+        self.assertEqual(tuple(panel.read_pixels()[1, 1]), (255, 0, 0, 255))
+
+        panel.add_clear(0, 1, 0, 1)
+        panel.update()
+        self.assertEqual(tuple(panel.read_pixels()[0, 0]), (0, 255, 0, 255))
+
+    def test_textures(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "sprite.png")
+        image = np.zeros((2, 2, 4), np.uint8)
+        image[0, 0] = (255, 0, 0, 255)
+        image[1, 1] = (0, 0, 255, 255)
+        write_png(path, image)
+        self.assertTrue((read_png(path) == image).all())
+
+        sprite = load_texture(path)
+        window = Window(4, 4)
+        window.add_draw_2d(sprite, QUAD, rectangle(0, 0, 4, 4),
+                           [1] * 16, UNIT_UVS)
+        window.update()
+        pixels = window.read_pixels()
+        self.assertEqual(tuple(pixels[0, 0]), (255, 0, 0, 255))
+        self.assertEqual(tuple(pixels[3, 3]), (0, 0, 255, 255))
+        self.assertEqual(tuple(pixels[0, 3]), (0, 0, 0, 0))
+
+        window.save(path)
+        self.assertTrue((read_png(path) == pixels).all())
+        os.remove(path)
+
+    def test_resize(self):
+        texture = Texture(4, 4)
+        texture.add_clear(1, 1, 1, 1)
+        texture.update()
+        texture.resize(600, 8)
+        texture.update()
+        self.assertEqual(texture.pixels().shape, (8, 600, 4))
+        # too large for the first page, so it gets a page of its own
+        self.assertEqual(texture.cell[4], 1)
+        self.assertEqual(Manager.atlas.pages[1].size, 1024)
+        self.assertTrue((texture.pixels()[:4, :4] == 1).all())
+        self.assertTrue((texture.pixels()[4:] == 0).all())
+
+        # and the page's pixels are freed along with the texture
+        texture.destroy()
+        self.assertNotIn(1, Manager.atlas.page_pixels)
+
+    def test_pages(self):
+        # textures are drawn from their own pages, in order
+        sprites = [Texture(256, 256) for _ in range(3)]
+        self.assertEqual([sprite.cell[4] for sprite in sprites], [1, 2, 3])
+        colours = [(1, 0, 0, 1), (0, 1, 0, 1), (0, 0, 1, 1)]
+        for sprite, colour in zip(sprites, colours):
+            sprite.add_clear(*colour)
+            sprite.update()
+
+        window = Window(4, 4)
+        for x, sprite in enumerate(sprites):
+            window.add_draw_2d(sprite, QUAD, rectangle(x, 0, x + 2, 4),
+                               [1] * 16, UNIT_UVS)
+        self.assertEqual(len(window.draw_calls), 3)
+        window.update()
+
+        pixels = window.read_pixels()
+        self.assertEqual([tuple(pixel[:3]) for pixel in pixels[0]],
+                         [(255, 0, 0), (0, 255, 0), (0, 0, 255),
+                          (0, 0, 255)])
+
+    def test_frame_loop(self):
+        frames = []
+
+        def update(dt, fps):
+            frames.append(dt)
+            if len(frames) == 3:
+                stop()
+
+        set_update_function(update, 30)
+        run()
+        self.assertEqual(frames, [1 / 30] * 3)
+        run(frames=2)
+        self.assertEqual(Manager.frames, 2)
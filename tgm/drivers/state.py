@@ -0,0 +1,48 @@
+"""Tracking render state so calls which wouldn't change it can be skipped.
+"""
+
+
+class StateCache:
+    """Remembers the value each piece of state was last set to.
+
+    Drivers ask whether setting a key to a value changes it before making
+    the call which sets it, and the calls made and skipped are counted.
+    Keys are forgotten when the state may have been changed behind the
+    cache's back, so the next call is always made.
+
+    >>> if state.changed("viewport", (0, 0, 320, 240)):
+    ...     gl.glViewport(0, 0, 320, 240)
+    """
+    def __init__(self):
+        self._values = {}
+        self.issued = 0
+        self.skipped = 0
+
+    def get(self, key, default=None):
+        """The value key was last set to, or default if it's not known."""
+        return self._values.get(key, default)
+
+    def changed(self, key, value):
+        """Record key being set to value, returning False if it already
+        was, so the call setting it can be skipped."""
+        if key in self._values and self._values[key] == value:
+            self.skipped += 1
+            return False
+        self._values[key] = value
+        self.issued += 1
+        return True
+
+    def invalidate(self, key=None):
+        """Forget the value of a key, or of every key."""
+        if key is None:
+            self._values.clear()
+        else:
+            self._values.pop(key, None)
+
+    def take_counts(self):
+        """Return the calls issued and skipped since the counts were last
+        taken, as a dict, and start counting afresh."""
+        counts = {"issued": self.issued, "skipped": self.skipped}
+        self.issued = 0
+        self.skipped = 0
+        return counts
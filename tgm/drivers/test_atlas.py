@@ -0,0 +1,83 @@
+from unittest import TestCase
+from random import Random
+from tgm.drivers.atlas import (
+    CellAllocator, PagedCellAllocator, next_power_of_2
+)
+
+
+class TestCellAllocator(TestCase):
+    def test_next_power_of_2(self):
+        self.assertEqual(next_power_of_2(0), 0)
+        self.assertEqual(next_power_of_2(1), 1)
+        self.assertEqual(next_power_of_2(5), 8)
+        self.assertEqual(next_power_of_2(64), 64)
+
+    def test_aquire_cell(self):
+        atlas = CellAllocator(64)
+        cells = [atlas.aquire_cell(30, 20) for _ in range(4)]
+        self.assertEqual(sorted(cell[:2] for cell in cells),
+                         [(0, 0), (0, 32), (32, 0), (32, 32)])
+        self.assertEqual(cells[0][2] - cells[0][0], 30)
+        self.assertEqual(cells[0][3] - cells[0][1], 20)
+        self.assertEqual(atlas.cells, [])
+
+        # the atlas grows when it's full
+        atlas.aquire_cell(10, 10)
+        self.assertEqual(atlas.size, 128)
+
+    def test_release_cell(self):
+        atlas = CellAllocator(64)
+        cells = [atlas.aquire_cell(16, 16) for _ in range(16)]
+        for cell in cells:
+            atlas.release_cell(cell)
+
+        # freed cells merge back into the whole atlas
+        self.assertEqual(atlas.cells, [(0, 0, 64, 64)])
+
+    def test_no_overlaps(self):
+        random = Random(0)
+        atlas = CellAllocator(64)
+        cells = []
+        for _ in range(2000):
+            if cells and random.random() < 0.4:
+                atlas.release_cell(cells.pop(random.randrange(len(cells))))
+                continue
+
+            size = random.choice((1, 3, 8, 20, 40))
+            x1, y1, x2, y2 = atlas.aquire_cell(size, size)
+            for other in cells:
+                self.assertFalse(x1 < other[2] and other[0] < x2
+                                 and y1 < other[3] and other[1] < y2)
+            cells.append((x1, y1, x2, y2))
+
+        for cell in cells:
+            atlas.release_cell(cell)
+        self.assertEqual(atlas.cells, [(0, 0, atlas.size, atlas.size)])
+
+
+class TestPagedCellAllocator(TestCase):
+    def test_pages(self):
+        atlas = PagedCellAllocator(64)
+        cells = [atlas.aquire_cell(32, 32) for _ in range(5)]
+        self.assertEqual([cell[4] for cell in cells], [0, 0, 0, 0, 1])
+        self.assertEqual(len(atlas.pages), 2)
+        self.assertEqual(atlas.pages[0].size, 64)
+
+        # freed space is used before adding pages
+        atlas.release_cell(cells[1])
+        self.assertEqual(atlas.aquire_cell(10, 10)[4], 0)
+
+        # large textures get a page of their own
+        cell = atlas.aquire_cell(100, 20)
+        self.assertEqual(cell, (0, 0, 100, 20, 2))
+        self.assertEqual(atlas.pages[2].size, 128)
+
+        # and the page is removed once it's released, its key being reused
+        atlas.release_cell(cell)
+        self.assertEqual(sorted(atlas.pages), [0, 1])
+        self.assertEqual(atlas.aquire_cell(200, 20)[4], 2)
+        self.assertEqual(atlas.pages[2].size, 256)
+
+        # pages of the usual size are kept when empty
+        atlas.release_cell(cells[4])
+        self.assertEqual(sorted(atlas.pages), [0, 1, 2])
@@ -0,0 +1,94 @@
+from unittest import TestCase
+from array import array
+import numpy as np
+from tgm.drivers.buffers import (
+    StagingBuffer, DrawBuffer, RingAllocator, draw_calls_digest
+)
+
+
+class TestStagingBuffer(TestCase):
+    def test_extend(self):
+        buffer = StagingBuffer(np.float32, 2, capacity=2)
+        buffer.extend([1, 2, 3, 4])
+        buffer.extend(np.array([[5, 6]]))
+        buffer.extend(array("f", [7, 8]))
+        self.assertEqual(len(buffer), 4)
+        self.assertEqual(buffer.array.tolist(),
+                         [[1, 2], [3, 4], [5, 6], [7, 8]])
+
+        # storage is kept when cleared
+        data = buffer._data
+        buffer.clear()
+        buffer.extend([9, 10])
+        self.assertIs(buffer._data, data)
+        self.assertEqual(buffer.array.tolist(), [[9, 10]])
+
+
+class TestDrawBuffer(TestCase):
+    def test_add(self):
+        draw_buffer = DrawBuffer()
+        quad = ([0, 1, 2, 0, 2, 3], [0, 0, 1, 0, 1, 1, 0, 1], [1] * 16,
+                [0, 0, 1, 0, 1, 1, 0, 1])
+        draw_buffer.add(*quad, (32, 64), (16, 8))
+        draw_buffer.add(*quad, (0, 0), (4, 4))
+
+        self.assertEqual(draw_buffer.indices.array[:, 0].tolist(),
+                         [0, 1, 2, 0, 2, 3, 4, 5, 6, 4, 6, 7])
+        self.assertEqual(draw_buffer.uvs.array[:4].tolist(),
+                         [[32, 64], [48, 64], [48, 72], [32, 72]])
+        self.assertEqual(draw_buffer.uvs.array[6].tolist(), [4, 4])
+        self.assertEqual(len(draw_buffer.colors), 8)
+
+    def test_compact_quads(self):
+        draw_buffer = DrawBuffer(compact=True, quads=True)
+        draw_buffer.add(None, [0, 0, 1, 0, 1, 1, 0, 1], [0.5, 1, 0, 1] * 4,
+                        [0, 0, 1, 0, 1, 1, 0, 1], (32, 64), (16, 8))
+        draw_buffer.add(None, [0] * 8, np.full((4, 4), 9, np.uint8),
+                        [0] * 8, (0, 0), (1, 1))
+
+        self.assertEqual(draw_buffer.colors.array.dtype, np.uint8)
+        self.assertEqual(draw_buffer.colors.array[0].tolist(),
+                         [128, 255, 0, 255])
+        self.assertEqual(draw_buffer.colors.array[4].tolist(), [9] * 4)
+        self.assertEqual(draw_buffer.uvs.array.dtype, np.int16)
+        self.assertEqual(draw_buffer.uvs.array[2].tolist(), [48, 72])
+
+        self.assertEqual(len(draw_buffer.indices), 0)
+        self.assertEqual(draw_buffer.triangle_indices().tolist(),
+                         [0, 1, 2, 0, 2, 3, 4, 5, 6, 4, 6, 7])
+
+    def test_digest(self):
+        def clear(*colour):
+            pass
+
+        def draw_2d(draw_buffer):
+            pass
+
+        def calls(x):
+            draw_buffer = DrawBuffer()
+            draw_buffer.add([0, 1, 2], [0, 0, x, 0, 0, 1], [1] * 12,
+                            [0] * 6, (0, 0), (1, 1))
+            return [(clear, 0, 0, 0, 1), (draw_2d, draw_buffer)]
+
+        self.assertEqual(draw_calls_digest(calls(1)),
+                         draw_calls_digest(calls(1)))
+        self.assertNotEqual(draw_calls_digest(calls(1)),
+                            draw_calls_digest(calls(2)))
+        self.assertNotEqual(draw_calls_digest(calls(1)),
+                            draw_calls_digest(calls(1)[1:]))
+
+
+class TestRingAllocator(TestCase):
+    def test_allocate(self):
+        ring = RingAllocator(8)
+        self.assertEqual(ring.allocate(3), (0, False))
+        self.assertEqual(ring.allocate(5), (3, False))
+
+        # wraps around when full
+        self.assertEqual(ring.allocate(1), (0, True))
+        self.assertEqual(ring.allocate(4), (1, False))
+
+        # grows to fit
+        self.assertEqual(ring.allocate(20), (0, True))
+        self.assertEqual(ring.capacity, 32)
+        self.assertEqual(ring.allocate(12), (20, False))
@@ -0,0 +1,22 @@
+from unittest import TestCase
+from tgm.drivers.state import StateCache
+
+
+class TestStateCache(TestCase):
+    def test_changed(self):
+        state = StateCache()
+        self.assertTrue(state.changed("viewport", (0, 0, 320, 240)))
+        self.assertFalse(state.changed("viewport", (0, 0, 320, 240)))
+        self.assertTrue(state.changed("viewport", (0, 0, 640, 480)))
+        self.assertTrue(state.changed(("enabled", 1), True))
+        self.assertEqual(state.get("viewport"), (0, 0, 640, 480))
+
+        # forgotten state is always set again
+        state.invalidate("viewport")
+        self.assertIsNone(state.get("viewport"))
+        self.assertTrue(state.changed("viewport", (0, 0, 640, 480)))
+        state.invalidate()
+        self.assertTrue(state.changed(("enabled", 1), True))
+
+        self.assertEqual(state.take_counts(), {"issued": 5, "skipped": 1})
+        self.assertEqual(state.take_counts(), {"issued": 0, "skipped": 0})
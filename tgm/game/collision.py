@@ -0,0 +1,251 @@
+"""Broadphase collision detection for Collider components."""
+import numpy as np
+from tgm.sys import Component, Event, emit
+from tgm.sys.columnar import ColumnarComponent, Column
+
+
+# Pairs of collider ids viewed as single values for set operations
+_PAIR_DTYPE = np.dtype([("first", np.int64), ("second", np.int64)])
+
+
+class Collider(ColumnarComponent):
+    """An axis aligned bounding box which takes part in collision detection.
+
+    The bounds are stored as (x1, y1, x2, y2) in a column so the broadphase
+    can process every collider at once.
+
+    >>> player.attach(Collider(bounds=(0, 0, 16, 32)))
+    <tgm.game.collision.Collider at 318f9f0>
+    """
+    bounds = Column("f8", 4)
+
+
+class CollisionStart(Event):
+    """Called on a collider, and the node it's attached to, when it starts
+    overlapping another collider.
+
+    Handlers are passed the collider and the other collider.
+    """
+    pass
+
+
+class CollisionEnd(Event):
+    """Called on a collider, and the node it's attached to, when it stops
+    overlapping another collider.
+
+    Handlers are passed the collider and the other collider.
+    """
+    pass
+
+
+class Broadphase(Component):
+    """Finds the overlapping pairs of colliders in the node it's attached to.
+
+    Colliders are bucketed into a uniform grid and tested against the others
+    sharing their cells, with every step vectorised over all colliders.  The
+    cell size defaults to twice the average collider size.  Pairs which have
+    started or stopped overlapping since the last step are reported through
+    the CollisionStart and CollisionEnd events.
+
+    >>> broadphase = world.attach(Broadphase())
+    >>> broadphase.step()
+    >>> broadphase.pairs
+    [(<tgm.game.collision.Collider at 318f9f0>, <...Collider at 319f9f0>)]
+    """
+    def __init__(self, cell_size=None):
+        super().__init__()
+        self.cell_size = cell_size
+        self._store = Collider._column_store
+
+        # Sorted ids of the colliders being tracked
+        self._members = np.zeros(0, dtype=np.int64)
+
+        # Rows and ids of the tracked colliders, kept in a stable order
+        # between steps
+        self._order = np.zeros(0, dtype=np.intp)
+        self._order_ids = np.zeros(0, dtype=np.int64)
+
+        # The tracked colliders by id, which also holds on to those in the
+        # last step's pairs until their CollisionEnd has been emitted
+        self._colliders = {}
+
+        # Overlapping pairs of collider ids as (lower id, higher id).  Ids
+        # come from the column store and, unlike rows, are never reused
+        self.pair_ids = np.zeros((0, 2), dtype=np.int64)
+
+    @property
+    def pairs(self):
+        """The overlapping pairs of colliders found by the last step."""
+        colliders = self._colliders
+        return [(colliders[a], colliders[b]) for a, b in self.pair_ids]
+
+    def step(self, refresh=True):
+        """Find the overlapping pairs and emit events for any changes.
+
+        Finding the colliders to test searches the parent's tree, if no
+        colliders have been attached or detached since the last step this can
+        be skipped by passing refresh=False.  Destroyed colliders are dropped
+        either way, ending any pairs they were part of.
+        """
+        parent = self.parent()
+        if parent is None:
+            raise ValueError(
+                "Can't step {}, it isn't attached to a node".format(self)
+            )
+
+        if refresh:
+            self._refresh(parent)
+        else:
+            self._drop_destroyed()
+
+        pair_ids = self._find_pairs()
+
+        # The index shows whether anything in the tree handles the events
+        index = parent._node_index
+        if index.get(CollisionStart) or index.get(CollisionEnd):
+            self._emit_changes(self.pair_ids, pair_ids)
+        self.pair_ids = pair_ids
+
+        if len(self._colliders) != len(self._members):
+            members = set(self._members.tolist())
+            self._colliders = {
+                collider_id: collider
+                for collider_id, collider in self._colliders.items()
+                if collider_id in members
+            }
+
+    def _refresh(self, parent):
+        """Update the tracked colliders from the parent's tree."""
+        rows = Collider.batch_in(parent).rows
+        ids = self._store.ids[rows]
+        members = np.sort(ids)
+
+        if not np.array_equal(members, self._members):
+            # Keep the previous order of surviving colliders so that the
+            # grid entries stay close to sorted
+            kept = np.isin(self._order_ids, members)
+            added = ~np.isin(ids, self._order_ids[kept])
+            self._order = np.concatenate((self._order[kept], rows[added]))
+            self._order_ids = np.concatenate(
+                (self._order_ids[kept], ids[added])
+            )
+            self._members = members
+
+            node = self._store.node
+            for row, collider_id in zip(rows[added], ids[added].tolist()):
+                self._colliders[collider_id] = node(row)
+
+    def _drop_destroyed(self):
+        """Stop tracking colliders whose rows have been released."""
+        alive = self._store.ids[self._order] == self._order_ids
+        if not alive.all():
+            self._order = self._order[alive]
+            self._order_ids = self._order_ids[alive]
+            self._members = np.sort(self._order_ids)
+
+    def _find_pairs(self):
+        """Find the overlapping pairs of the tracked colliders."""
+        rows = self._order
+        bounds = self._store.columns["bounds"][rows]
+        if len(bounds) < 2:
+            return np.zeros((0, 2), dtype=np.int64)
+
+        cell_size = self.cell_size
+        if cell_size is None:
+            # Cells a little larger than the typical collider keep most
+            # colliders in at most four cells
+            extents = bounds[:, 2:] - bounds[:, :2]
+            cell_size = max(float(extents.max(axis=1).mean()) * 2, 1e-9)
+
+        cells = np.floor(bounds / cell_size).astype(np.int64)
+        origin = cells[:, :2].min(axis=0)
+        cells -= np.tile(origin, 2)
+        height = int(cells[:, 3].max()) + 1
+
+        # Put every collider in each cell it covers
+        widths = cells[:, 2] - cells[:, 0] + 1
+        heights = cells[:, 3] - cells[:, 1] + 1
+        counts = widths * heights
+        entries = np.repeat(np.arange(len(rows)), counts)
+        offsets = _ranges(counts)
+        entry_x = cells[entries, 0] + offsets % widths[entries]
+        entry_y = cells[entries, 1] + offsets // widths[entries]
+        entry_cells = entry_x * height + entry_y
+
+        # Sorting the entries by cell groups the colliders sharing each cell,
+        # the stable sort is quick on the mostly unchanged order of the last
+        # step
+        order = np.argsort(entry_cells, kind="stable")
+        entries = entries[order]
+        entry_cells = entry_cells[order]
+
+        # Pair each entry with the entries after it in the same cell
+        ends = np.searchsorted(entry_cells, entry_cells, side="right")
+        pair_counts = ends - np.arange(len(entries)) - 1
+        first = np.repeat(np.arange(len(entries)), pair_counts)
+        second = first + 1 + _ranges(pair_counts)
+        pair_cells = entry_cells[first]
+        first = entries[first]
+        second = entries[second]
+
+        overlaps = (
+            (bounds[first, 0] <= bounds[second, 2])
+            & (bounds[second, 0] <= bounds[first, 2])
+            & (bounds[first, 1] <= bounds[second, 3])
+            & (bounds[second, 1] <= bounds[first, 3])
+        )
+        first = first[overlaps]
+        second = second[overlaps]
+        pair_cells = pair_cells[overlaps]
+
+        # Colliders sharing several cells are only paired in the cell holding
+        # the corner of their overlap
+        corner = np.maximum(bounds[first, :2], bounds[second, :2])
+        corner_cells = np.floor(corner / cell_size).astype(np.int64) - origin
+        corner_cells = corner_cells[:, 0] * height + corner_cells[:, 1]
+        owned = corner_cells == pair_cells
+
+        first = self._order_ids[first[owned]]
+        second = self._order_ids[second[owned]]
+        pairs = np.stack(
+            (np.minimum(first, second), np.maximum(first, second)), axis=1
+        )
+        return pairs
+
+    def _emit_changes(self, old_ids, new_ids):
+        """Emit CollisionStart and CollisionEnd for pairs that changed."""
+        old_keys = _pair_keys(old_ids)
+        new_keys = _pair_keys(new_ids)
+
+        colliders = self._colliders
+        started = np.setdiff1d(new_keys, old_keys, assume_unique=True)
+        for a, b in started.tolist():
+            _emit_pair(CollisionStart, colliders[a], colliders[b])
+
+        # Pairs with a collider which has since been destroyed or detached
+        # are ended too
+        ended = np.setdiff1d(old_keys, new_keys, assume_unique=True)
+        for a, b in ended.tolist():
+            _emit_pair(CollisionEnd, colliders[a], colliders[b])
+
+
+def _pair_keys(pairs):
+    """View pairs of ids as single values for set operations."""
+    pairs = np.ascontiguousarray(pairs, dtype=np.int64)
+    return pairs.view(_PAIR_DTYPE).ravel()
+
+
+def _ranges(counts):
+    """Concatenate arange(count) for each count."""
+    total = int(counts.sum())
+    starts = np.repeat(np.cumsum(counts) - counts, counts)
+    return np.arange(total) - starts
+
+
+def _emit_pair(event_type, a, b):
+    """Emit the event for both colliders in a pair and their parents."""
+    for collider, other in ((a, b), (b, a)):
+        emit(collider, event_type, collider, other)
+        parent = collider.parent()
+        if parent is not None:
+            emit(parent, event_type, collider, other)
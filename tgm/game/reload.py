@@ -0,0 +1,282 @@
+"""Hot reloading a level by patching the live tree built from it."""
+from collections import defaultdict
+from copy import deepcopy
+from hashlib import blake2b
+from io import BytesIO
+import pickle
+from tgm.sys import Node, node_hash
+from tgm.sys.node import _new_node, _reindex, _type_hash
+from tgm.sys.serialize import _get_state, _set_state, _preorder
+
+
+class LevelReloader:
+    """Keeps a live tree in step with an editable level definition.
+
+    The live tree is built from the definition once, then each reload
+    compares the new definition with the previous one and applies only the
+    difference to the live tree.  Live nodes whose definition didn't change
+    are left alone, along with any runtime state and nodes attached to them
+    since, and only attributes whose value changed in the definition are
+    written.
+
+    Attributes may reference other nodes of the definition, which are
+    translated to the corresponding live nodes.
+
+    >>> reloader = LevelReloader(load_level("forest.level"))
+    >>> world.attach(reloader.live)
+    >>> reloader.reload(load_level("forest.level"))
+    """
+    def __init__(self, definition):
+        self.definition = definition
+
+        # Maps definition nodes to the live nodes built from them
+        self._live = {}
+
+        # Caches the fingerprints and content hashes of definition nodes, see
+        # _fingerprint and _content_hash
+        self._fingerprints = {}
+        self._content_hashes = {}
+        self.live = self._build([definition])[0]
+
+        # How much the last reload changed
+        self.last_added = 0
+        self.last_removed = 0
+        self.last_updated = 0
+
+    def live_node(self, definition_node):
+        """Return the live node built from a node of the definition."""
+        return self._live[definition_node]
+
+    def reload(self, definition):
+        """Patch the live tree to match a new version of the definition."""
+        if type(definition) is not type(self.definition):
+            raise ValueError("The reloaded level's root is a {}, not a {}"
+                             .format(type(definition).__name__,
+                                     type(self.definition).__name__))
+
+        live = {}
+        updates = []
+        removed = []
+        added = []
+
+        stack = [(self.definition, definition)]
+        while stack:
+            old, new = stack.pop()
+            live_node = self._live[old]
+            live[new] = live_node
+
+            # Equal fingerprints can hide a changed reference to a node
+            fingerprint, references = self._fingerprint(new)
+            if references or self._fingerprint(old)[0] != fingerprint:
+                updates.append((old, new, live_node))
+
+            pairs, old_only, new_only = self._pair_children(old, new)
+            stack.extend(pairs)
+            removed.extend(self._live[child] for child in old_only)
+            added.extend((live_node, child) for child in new_only)
+
+        previous, self._live = self._live, live
+        self._fingerprints = {
+            node: fingerprint
+            for node, fingerprint in self._fingerprints.items()
+            if node in live
+        }
+        self._content_hashes = {
+            node: content_hash
+            for node, content_hash in self._content_hashes.items()
+            if node in live
+        }
+        self.definition = definition
+
+        for node in removed:
+            node.destroy()
+
+        subtrees = self._build([child for _, child in added])
+        for (parent, _), subtree in zip(added, subtrees):
+            parent.attach(subtree)
+
+        updated = 0
+        if updates:
+            memo = self._memo()
+            for old, new, live_node in updates:
+                updated += self._update(old, new, live_node, previous, memo)
+
+        self.last_added = len(added)
+        self.last_removed = len(removed)
+        self.last_updated = updated
+
+    def _build(self, roots):
+        """Build live copies of definition subtrees, returning their roots.
+
+        Each subtree is linked and indexed in one pass, ready to be attached.
+        """
+        subtrees = []
+        for root in roots:
+            nodes = _preorder(root)
+            for node in nodes:
+                self._live[node] = _new_node(type(node))
+            subtrees.append(nodes)
+
+        # Every copy exists before any state is copied so that references
+        # between nodes can be translated
+        memo = self._memo()
+        for nodes in subtrees:
+            for node in nodes:
+                copy = self._live[node]
+                _set_state(copy, deepcopy(_get_state(node), memo))
+
+                if node is not nodes[0]:
+                    parent = self._live[node._node_parent]
+                    copy._node_parent = parent
+                    children = parent._node_children
+                    for key in type(copy).__mro__:
+                        children[key].add(copy)
+
+            # Children are always listed after their parents
+            _reindex(reversed([self._live[node] for node in nodes]))
+
+        return [self._live[nodes[0]] for nodes in subtrees]
+
+    def _update(self, old, new, live_node, previous, memo):
+        """Write the attributes which changed between two versions of a
+        node's definition to its live node, returning if any did.
+
+        previous maps the nodes of the old definition to live nodes.
+        """
+        old_state = _flat_state(old)
+        new_state = _flat_state(new)
+        updated = False
+
+        for name, value in new_state.items():
+            if name in old_state:
+                old_value = old_state[name]
+                if isinstance(old_value, Node) and isinstance(value, Node):
+                    if previous.get(old_value) is self._live.get(value):
+                        continue
+                elif not _changed(old_value, value):
+                    continue
+            setattr(live_node, name, deepcopy(value, memo))
+            updated = True
+
+        for name in old_state.keys() - new_state.keys():
+            if hasattr(live_node, name):
+                delattr(live_node, name)
+                updated = True
+
+        return updated
+
+    def _pair_children(self, old, new):
+        """Pair up the children of two versions of a definition node.
+
+        Children are paired first with identical subtrees, then with children
+        of the same type and attributes, then with the same structure, then
+        with the same type.  Returns the pairs, and the old and new children
+        left unpaired.
+        """
+        old_children = list(old._node_children.get(Node, ()))
+        new_children = list(new._node_children.get(Node, ()))
+        pairs = []
+
+        def same_attributes(node):
+            return type(node), self._fingerprint(node)
+
+        for key in (self._content_hash, same_attributes, node_hash, type):
+            unmatched = defaultdict(list)
+            for child in old_children:
+                unmatched[key(child)].append(child)
+
+            unpaired = []
+            for child in new_children:
+                same = unmatched.get(key(child))
+                if same:
+                    pairs.append((same.pop(), child))
+                else:
+                    unpaired.append(child)
+
+            old_children = [child for same in unmatched.values()
+                            for child in same]
+            new_children = unpaired
+
+        return pairs, old_children, new_children
+
+    def _fingerprint(self, node):
+        """Get bytes which are equal for definition nodes with equal
+        attributes, and whether the attributes reference other nodes."""
+        try:
+            return self._fingerprints[node]
+        except KeyError:
+            output = BytesIO()
+            pickler = _FingerprintPickler(output)
+            pickler.dump(_get_state(node))
+            fingerprint = output.getvalue(), pickler.references
+            self._fingerprints[node] = fingerprint
+            return fingerprint
+
+    def _content_hash(self, node):
+        """Hash the types and attributes of a definition node's subtree."""
+        try:
+            return self._content_hashes[node]
+        except KeyError:
+            pass
+
+        # Hash children before their parents without recursing
+        stack = [(node, False)]
+        while stack:
+            current, children_hashed = stack.pop()
+            children = current._node_children.get(Node, ())
+
+            if not children_hashed:
+                stack.append((current, True))
+                stack.extend((child, False) for child in children
+                             if child not in self._content_hashes)
+                continue
+
+            digest = blake2b(_type_hash(type(current)), digest_size=16)
+            digest.update(self._fingerprint(current)[0])
+            for child_hash in sorted(self._content_hashes[child]
+                                     for child in children):
+                digest.update(child_hash)
+            self._content_hashes[current] = digest.digest()
+
+        return self._content_hashes[node]
+
+    def _memo(self):
+        """Make a deepcopy memo which maps definition nodes to live ones."""
+        return {id(node): live_node for node, live_node in self._live.items()}
+
+
+class _FingerprintPickler(pickle.Pickler):
+    """Pickler which stores referenced nodes by their type alone."""
+    def __init__(self, file):
+        super().__init__(file, protocol=4)
+        self.references = False
+
+    def persistent_id(self, obj):
+        if isinstance(obj, Node):
+            self.references = True
+            return "{}.{}".format(type(obj).__module__,
+                                  type(obj).__qualname__)
+        return None
+
+
+def _flat_state(node):
+    """Get a node's attributes, including the values of its columns."""
+    state = _get_state(node)
+    columns = state.pop("_column_values", None)
+    if columns:
+        state.update(columns)
+    return state
+
+
+def _changed(old, new):
+    """Check if an attribute's value changed, treating values which can't
+    be compared as changed."""
+    if old is new:
+        return False
+    try:
+        result = old != new
+        if hasattr(result, "any"):
+            result = result.any()
+        return bool(result)
+    except (TypeError, ValueError):
+        return True
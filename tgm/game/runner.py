@@ -0,0 +1,151 @@
+"""Running many independent worlds across a pool of processes."""
+import multiprocessing
+import os
+
+
+class WorldRunner:
+    """Steps many independent worlds, sharded across worker processes.
+
+    Each world is sent to a worker once when it's added and then stays
+    there, so a tick only moves each world's inputs to its worker and its
+    outputs back.  Every worker steps its worlds at the same time, and step
+    returns once all of them have finished the tick.
+
+    The step function is called as step(world, inputs) in the worker and
+    returns the world's outputs.  It, the worlds, and the inputs and outputs
+    all have to be picklable, so the step function and node classes need to
+    be defined at module level.
+
+    >>> runner = WorldRunner(step_match)
+    >>> runner.add("match-1", Match())
+    >>> runner.step({"match-1": player_inputs})
+    {'match-1': snapshot}
+    """
+    def __init__(self, step, processes=None, context=None):
+        if processes is None:
+            processes = os.cpu_count() or 1
+        if context is None:
+            context = multiprocessing.get_context()
+
+        self._workers = []
+        for _ in range(processes):
+            connection, worker_connection = context.Pipe()
+            process = context.Process(
+                target=_worker, args=(step, worker_connection), daemon=True
+            )
+            process.start()
+            worker_connection.close()
+            self._workers.append((process, connection))
+
+        # Maps world ids to the index of the worker running them
+        self._placement = {}
+        self._loads = [0] * processes
+
+    def __len__(self):
+        return len(self._placement)
+
+    def add(self, world_id, world):
+        """Send a world to the least loaded worker."""
+        if world_id in self._placement:
+            raise ValueError("A world with id {!r} already exists".format(
+                world_id
+            ))
+
+        worker = self._loads.index(min(self._loads))
+        self._workers[worker][1].send(("add", world_id, world))
+        self._placement[world_id] = worker
+        self._loads[worker] += 1
+
+    def remove(self, world_id):
+        """Stop running a world and return it from its worker."""
+        worker = self._placement.pop(world_id)
+        self._loads[worker] -= 1
+
+        connection = self._workers[worker][1]
+        connection.send(("remove", world_id))
+        return _receive(connection)
+
+    def step(self, inputs=None):
+        """Step every world once, returning a dict of each world's outputs.
+
+        inputs maps world ids to the inputs for that world, worlds without
+        an entry are given None.  If stepping any world fails, the first
+        error is raised once every worker has finished.
+        """
+        if inputs is None:
+            inputs = {}
+
+        shards = [{} for _ in self._workers]
+        for world_id, worker in self._placement.items():
+            shards[worker][world_id] = inputs.get(world_id)
+
+        # Send every shard before waiting on any so the workers run at once
+        for (_, connection), shard in zip(self._workers, shards):
+            if shard:
+                connection.send(("step", shard))
+
+        # Every worker sent a shard has to be heard from, even once one has
+        # failed, or its reply would be read as the answer to a later command
+        outputs = {}
+        error = None
+        for (_, connection), shard in zip(self._workers, shards):
+            if not shard:
+                continue
+            try:
+                outputs.update(_receive(connection))
+            except Exception as worker_error:
+                if error is None:
+                    error = worker_error
+
+        if error is not None:
+            raise error
+        return outputs
+
+    def close(self):
+        """Shut down the worker processes."""
+        for process, connection in self._workers:
+            connection.send(("close",))
+            connection.close()
+        for process, _ in self._workers:
+            process.join()
+        self._workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _receive(connection):
+    """Receive a reply from a worker, raising any error it reports."""
+    status, value = connection.recv()
+    if status == "error":
+        raise value
+    return value
+
+
+def _worker(step, connection):
+    """Main loop of a worker process."""
+    worlds = {}
+    while True:
+        message = connection.recv()
+        command = message[0]
+
+        if command == "close":
+            return
+
+        if command == "add":
+            worlds[message[1]] = message[2]
+            continue
+
+        try:
+            if command == "remove":
+                reply = worlds.pop(message[1])
+            else:
+                reply = {world_id: step(worlds[world_id], world_inputs)
+                         for world_id, world_inputs in message[1].items()}
+        except Exception as error:
+            connection.send(("error", error))
+        else:
+            connection.send(("ok", reply))
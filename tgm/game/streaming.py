@@ -0,0 +1,197 @@
+"""Paging chunks of a level in and out of a World from a file on disk."""
+import mmap
+from queue import Queue, Empty
+import struct
+from threading import Thread
+from tgm.sys import Component
+from tgm.sys.serialize import dumps, loads_deferred
+
+_MAGIC = b"TGMC"
+_HEADER = struct.Struct("<4sI")
+_ENTRY = struct.Struct("<4dQQ")
+
+
+def write_chunks(path, chunks):
+    """Write a chunk file from an iterable of (bounds, node) pairs.
+
+    The bounds of each chunk are (x1, y1, x2, y2), and its node, typically
+    a Layer, is stored as a snapshot from tgm.sys.serialize.
+    """
+    chunks = [(bounds, dumps(node)) for bounds, node in chunks]
+
+    with open(path, "wb") as file:
+        file.write(_HEADER.pack(_MAGIC, len(chunks)))
+
+        offset = _HEADER.size + _ENTRY.size * len(chunks)
+        for bounds, data in chunks:
+            file.write(_ENTRY.pack(*bounds, offset, len(data)))
+            offset += len(data)
+
+        for _, data in chunks:
+            file.write(data)
+
+
+class ChunkFile:
+    """A memory mapped chunk file written by write_chunks.
+
+    Only the table of chunk bounds is read up front, each chunk's data is
+    paged in by the operating system when it's loaded.
+    """
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, count = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC:
+            raise ValueError("{} is not a chunk file".format(path))
+
+        self.bounds = []
+        self._spans = []
+        for i in range(count):
+            entry = _ENTRY.unpack_from(self._map,
+                                       _HEADER.size + _ENTRY.size * i)
+            self.bounds.append(entry[:4])
+            self._spans.append(entry[4:])
+
+    def __len__(self):
+        return len(self.bounds)
+
+    def load(self, i):
+        """Build chunk i, returning its root and the function which finishes
+        restoring it, as with loads_deferred."""
+        offset, length = self._spans[i]
+        with memoryview(self._map) as view:
+            return loads_deferred(bytes(view[offset:offset + length]))
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+class ChunkStreamer(Component):
+    """Attaches the chunks of a chunk file near a point to its parent.
+
+    Chunks are built on a background thread, then attached on the main
+    thread during update, at most max_attach_per_update at a time so no
+    single frame pays for many chunks.  A chunk is destroyed again once the
+    point is more than unload_radius away from it, which defaults to a
+    little further than load_radius so chunks on the edge don't thrash.
+    Destroying is spread out in the same way, at most
+    max_destroy_per_update at a time.
+
+    An error building a chunk, such as from corrupt data, is raised on the
+    main thread by the update or finish_loading which would have attached
+    it.
+
+    >>> streamer = world.attach(ChunkStreamer("level.chunks", 512))
+    >>> streamer.update(player.x, player.y)
+    """
+    def __init__(self, path, load_radius, unload_radius=None,
+                 max_attach_per_update=1, max_destroy_per_update=1):
+        super().__init__()
+        self.load_radius = load_radius
+        self.unload_radius = (
+            load_radius * 1.25 if unload_radius is None else unload_radius
+        )
+        self.max_attach_per_update = max_attach_per_update
+        self.max_destroy_per_update = max_destroy_per_update
+
+        self._chunks = ChunkFile(path)
+
+        # Attached chunk roots, chunks requested but not yet attached and
+        # attached chunks waiting to be destroyed, in the order they left
+        self.loaded = {}
+        self._pending = set()
+        self._unloading = {}
+
+        self._requests = Queue()
+        self._ready = Queue()
+        self._thread = Thread(target=self._load_chunks, daemon=True)
+        self._thread.start()
+
+    def update(self, x, y):
+        """Page chunks in and out around the given point."""
+        for i, bounds in enumerate(self._chunks.bounds):
+            distance = _distance_to(bounds, x, y)
+
+            if distance <= self.load_radius:
+                if i not in self.loaded and i not in self._pending:
+                    self._pending.add(i)
+                    self._requests.put(i)
+
+            if distance <= self.unload_radius:
+                self._unloading.pop(i, None)
+            else:
+                self._pending.discard(i)
+                if i in self.loaded:
+                    self._unloading[i] = None
+
+        for _ in range(self.max_attach_per_update):
+            try:
+                chunk = self._ready.get_nowait()
+            except Empty:
+                break
+            self._attach(*chunk)
+
+        for _ in range(min(self.max_destroy_per_update,
+                           len(self._unloading))):
+            self._unload()
+
+    def finish_loading(self):
+        """Wait for every requested chunk and attach them, and destroy every
+        chunk waiting to be unloaded, such as behind a loading screen."""
+        while self._pending:
+            self._attach(*self._ready.get())
+        while self._unloading:
+            self._unload()
+
+    def close(self):
+        """Stop the loader thread and release the chunk file."""
+        self._requests.put(None)
+        self._thread.join()
+        self._chunks.close()
+
+    def destroy(self):
+        super().destroy()
+        self.close()
+
+    def _attach(self, i, root, finish, error=None):
+        """Attach a loaded chunk, unless it's no longer wanted, or raise the
+        error that building it failed with."""
+        if error is not None:
+            self._pending.discard(i)
+            raise error
+        if i not in self._pending:
+            return
+        self._pending.remove(i)
+        finish()
+        self.loaded[i] = self.parent().attach(root)
+
+    def _unload(self):
+        """Destroy the chunk which has been waiting longest to unload."""
+        i = next(iter(self._unloading))
+        del self._unloading[i]
+        self.loaded.pop(i).destroy()
+
+    def _load_chunks(self):
+        """Build requested chunks, run on the loader thread."""
+        while True:
+            i = self._requests.get()
+            if i is None:
+                return
+            # Errors are passed to the main thread, which would otherwise
+            # wait forever for the chunk
+            try:
+                root, finish = self._chunks.load(i)
+            except Exception as error:
+                self._ready.put((i, None, None, error))
+            else:
+                self._ready.put((i, root, finish))
+
+
+def _distance_to(bounds, x, y):
+    """Distance from a point to the nearest point of a rectangle."""
+    x1, y1, x2, y2 = bounds
+    dx = max(x1 - x, 0, x - x2)
+    dy = max(y1 - y, 0, y - y2)
+    return (dx * dx + dy * dy) ** 0.5
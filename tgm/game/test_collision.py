@@ -0,0 +1,125 @@
+from unittest import TestCase
+from itertools import combinations
+from random import Random
+from tgm.sys import Entity, on
+from tgm.game import World
+from tgm.game.collision import (
+    Collider, Broadphase, CollisionStart, CollisionEnd
+)
+
+
+class Ball(Entity):
+    def __init__(self):
+        super().__init__()
+        self.started = []
+        self.ended = []
+
+    @on(CollisionStart)
+    def collision_start(self, collider, other):
+        self.started.append(other.parent())
+
+    @on(CollisionEnd)
+    def collision_end(self, collider, other):
+        self.ended.append(other.parent())
+
+
+def _overlaps(a, b):
+    return (a[0] <= b[2] and b[0] <= a[2]
+            and a[1] <= b[3] and b[1] <= a[3])
+
+
+class TestBroadphase(TestCase):
+    def test_pairs(self):
+        random = Random(1)
+        world = World()
+        broadphase = world.attach(Broadphase())
+        colliders = []
+        for _ in range(200):
+            x, y = random.uniform(0, 100), random.uniform(0, 100)
+            w, h = random.uniform(1, 8), random.uniform(1, 8)
+            colliders.append(world.attach(Entity()).attach(
+                Collider(bounds=(x, y, x + w, y + h))
+            ))
+
+        for _ in range(3):
+            broadphase.step()
+            expected = {
+                frozenset((a, b)) for a, b in combinations(colliders, 2)
+                if _overlaps(a.bounds, b.bounds)
+            }
+            found = {frozenset(pair) for pair in broadphase.pairs}
+            self.assertEqual(found, expected)
+
+            for collider in colliders:
+                collider.bounds += (random.uniform(-3, 3), 0) * 2
+
+    def test_events(self):
+        world = World()
+        broadphase = world.attach(Broadphase())
+        a = world.attach(Ball())
+        b = world.attach(Ball())
+        a_collider = a.attach(Collider(bounds=(0, 0, 10, 10)))
+        b.attach(Collider(bounds=(20, 0, 30, 10)))
+
+        broadphase.step()
+        self.assertEqual(a.started, [])
+
+        a_collider.bounds = (15, 0, 25, 10)
+        broadphase.step(refresh=False)
+        self.assertEqual(a.started, [b])
+        self.assertEqual(b.started, [a])
+
+        # ongoing overlaps aren't reported again
+        broadphase.step(refresh=False)
+        self.assertEqual(a.started, [b])
+
+        a_collider.bounds = (0, 0, 10, 10)
+        broadphase.step(refresh=False)
+        self.assertEqual(a.ended, [b])
+        self.assertEqual(b.ended, [a])
+
+    def test_refresh(self):
+        world = World()
+        broadphase = world.attach(Broadphase())
+        world.attach(Collider(bounds=(0, 0, 10, 10)))
+        broadphase.step()
+
+        other = world.attach(Collider(bounds=(5, 5, 10, 10)))
+        broadphase.step()
+        self.assertEqual(len(broadphase.pairs), 1)
+
+        other.destroy()
+        broadphase.step()
+        self.assertEqual(broadphase.pairs, [])
+
+    def test_destroyed(self):
+        world = World()
+        broadphase = world.attach(Broadphase())
+        a = world.attach(Ball())
+        b = world.attach(Ball())
+        a.attach(Collider(bounds=(0, 0, 10, 10)))
+        b_collider = b.attach(Collider(bounds=(5, 0, 15, 10)))
+        broadphase.step()
+        self.assertEqual(a.started, [b])
+
+        # a destroyed collider ends its pairs, even when its row is reused
+        # before the next step
+        row = b_collider._column_row
+        b_collider.destroy()
+        c = world.attach(Ball())
+        c_collider = c.attach(Collider(bounds=(5, 0, 15, 10)))
+        self.assertEqual(c_collider._column_row, row)
+
+        # the destroyed collider no longer has a parent to report
+        broadphase.step(refresh=False)
+        self.assertEqual(a.ended, [None])
+        self.assertEqual(broadphase.pairs, [])
+
+        broadphase.step()
+        self.assertEqual(a.started, [b, c])
+        self.assertEqual(broadphase.pairs[0][1], c_collider)
+
+    def test_detached(self):
+        broadphase = Broadphase()
+        with self.assertRaises(ValueError):
+            broadphase.step()
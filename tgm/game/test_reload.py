@@ -0,0 +1,96 @@
+from unittest import TestCase
+from unittest.mock import patch
+from tgm.sys import Node, Entity, Tracked, node_hash
+from tgm.sys.columnar import Column, ColumnarComponent
+from tgm.game import World, Layer
+from tgm.game.reload import LevelReloader
+
+
+class Tree(Entity, Tracked):
+    def __init__(self, x, target=None):
+        super().__init__()
+        self.x = x
+        self.target = target
+
+
+class Growth(ColumnarComponent):
+    height = Column()
+
+
+def make_level(xs):
+    level = Layer()
+    trees = [level.attach(Tree(x)) for x in xs]
+    for tree in trees:
+        tree.attach(Growth(height=tree.x))
+    return level, trees
+
+
+class TestLevelReloader(TestCase):
+    def setUp(self):
+        definition, self.trees = make_level([1, 2, 3])
+        self.trees[0].target = self.trees[1]
+
+        self.reloader = LevelReloader(definition)
+        self.world = World()
+        self.world.attach(self.reloader.live)
+
+    def live_trees(self):
+        return {tree.x: tree for tree in self.world.find(Tree)}
+
+    def test_build(self):
+        live = self.reloader.live
+        self.assertEqual(node_hash(live), node_hash(self.reloader.definition))
+        trees = self.live_trees()
+        self.assertEqual(set(trees), {1, 2, 3})
+        self.assertIs(trees[1].target, trees[2])
+        self.assertEqual(trees[3].get(Growth).height, 3)
+        self.assertIs(self.reloader.live_node(self.trees[2]), trees[3])
+
+    def test_reload_unchanged(self):
+        before = self.live_trees()
+        definition, trees = make_level([3, 2, 1])
+        trees[2].target = trees[1]
+        with patch("tgm.sys.node.Node.attach") as attach:
+            self.reloader.reload(definition)
+            self.assertFalse(attach.called)
+
+        self.assertEqual(self.live_trees(), before)
+        self.assertEqual(self.reloader.last_updated, 0)
+
+    def test_reload(self):
+        before = self.live_trees()
+        before[2].health = 5
+
+        definition, trees = make_level([1, 2, 4, 5])
+        trees[0].target = trees[3]
+        trees[1].attach(Node())
+        trees[2].get(Growth).height = 10
+        self.reloader.reload(definition)
+
+        after = self.live_trees()
+        self.assertEqual(set(after), {1, 2, 4, 5})
+        self.assertEqual(self.reloader.last_removed, 0)
+        self.assertEqual(self.reloader.last_added, 2)
+
+        # unchanged nodes keep their runtime state
+        self.assertIs(after[1], before[1])
+        self.assertIs(after[2], before[2])
+        self.assertEqual(after[2].health, 5)
+        self.assertEqual(len(list(after[2].children(Node))), 2)
+
+        # references are translated to the live tree
+        self.assertIs(after[1].target, after[5])
+        self.assertEqual(after[4].get(Growth).height, 10)
+        self.assertEqual(after[5].get(Growth).height, 5)
+        self.assertEqual(node_hash(self.reloader.live), node_hash(definition))
+
+        # reloads build on the previous one
+        definition, trees = make_level([1])
+        self.reloader.reload(definition)
+        self.assertEqual(set(self.live_trees()), {1})
+        self.assertEqual(self.reloader.last_removed, 3)
+        self.assertIsNone(self.live_trees()[1].target)
+
+    def test_reload_root_type(self):
+        with self.assertRaises(ValueError):
+            self.reloader.reload(Node())
@@ -0,0 +1,83 @@
+from unittest import TestCase
+import os
+from tgm.sys import Entity, Event, emit, on
+from tgm.game import World
+from tgm.game.runner import WorldRunner
+
+
+class Tick(Event):
+    pass
+
+
+class Counter(Entity):
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    @on(Tick)
+    def tick(self, amount):
+        self.count += amount
+
+
+def step_world(world, inputs):
+    counter = next(world.find(Counter))
+    emit(counter, Tick, inputs or 0)
+    return counter.count, os.getpid()
+
+
+def fail_step(world, inputs):
+    raise KeyError("broken")
+
+
+def step_or_fail(world, inputs):
+    if inputs == "fail":
+        raise KeyError("broken")
+    return step_world(world, inputs)
+
+
+class TestWorldRunner(TestCase):
+    def test_step(self):
+        with WorldRunner(step_world, processes=2) as runner:
+            for i in range(4):
+                world = World()
+                world.attach(Counter())
+                runner.add(i, world)
+            self.assertEqual(len(runner), 4)
+
+            runner.step({0: 1, 1: 2})
+            outputs = runner.step({0: 1, 3: 5})
+            self.assertEqual({i: count for i, (count, _) in outputs.items()},
+                             {0: 2, 1: 2, 2: 0, 3: 5})
+
+            # worlds are spread over the workers
+            pids = {pid for _, pid in outputs.values()}
+            self.assertEqual(len(pids), 2)
+            self.assertNotIn(os.getpid(), pids)
+
+            world = runner.remove(0)
+            self.assertEqual(next(world.find(Counter)).count, 2)
+            self.assertEqual(set(runner.step()), {1, 2, 3})
+
+            with self.assertRaises(ValueError):
+                runner.add(1, World())
+
+    def test_error(self):
+        with WorldRunner(fail_step, processes=1) as runner:
+            runner.add(0, World())
+            with self.assertRaises(KeyError):
+                runner.step()
+
+    def test_partial_error(self):
+        with WorldRunner(step_or_fail, processes=2) as runner:
+            for i in range(2):
+                world = World()
+                world.attach(Counter())
+                runner.add(i, world)
+
+            with self.assertRaises(KeyError):
+                runner.step({0: "fail", 1: 1})
+
+            # the other worker's reply doesn't leak into the next step
+            outputs = runner.step({0: 1, 1: 1})
+            self.assertEqual({i: count for i, (count, _) in outputs.items()},
+                             {0: 1, 1: 2})
@@ -0,0 +1,123 @@
+from unittest import TestCase
+import os
+import tempfile
+from tgm.sys import Entity
+from tgm.sys.columnar import Column, ColumnarComponent
+from tgm.game import World, Layer
+from tgm.game.streaming import write_chunks, ChunkFile, ChunkStreamer
+
+
+class Tree(Entity):
+    def __init__(self, region):
+        super().__init__()
+        self.region = region
+
+
+class Growth(ColumnarComponent):
+    height = Column()
+
+
+class TestStreaming(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.path = os.path.join(directory, "level.chunks")
+
+        chunks = []
+        for region in range(4):
+            layer = Layer()
+            for _ in range(10):
+                layer.attach(Tree(region)).attach(Growth(height=region))
+            chunks.append(((region * 100, 0, region * 100 + 100, 100), layer))
+        write_chunks(self.path, chunks)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_chunk_file(self):
+        chunks = ChunkFile(self.path)
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual(chunks.bounds[2], (200, 0, 300, 100))
+
+        root, finish = chunks.load(2)
+        finish()
+        trees = list(root.find(Tree))
+        self.assertEqual(len(trees), 10)
+        self.assertEqual({tree.region for tree in trees}, {2})
+        self.assertEqual({growth.height for growth in root.find(Growth)},
+                         {2})
+        chunks.close()
+
+    def test_streaming(self):
+        world = World()
+        streamer = world.attach(
+            ChunkStreamer(self.path, 10, max_attach_per_update=4)
+        )
+
+        def regions():
+            return {tree.region for tree in world.find(Tree)}
+
+        streamer.update(50, 50)
+        streamer.finish_loading()
+        self.assertEqual(regions(), {0})
+
+        # on the border of two chunks both are loaded
+        streamer.update(105, 50)
+        streamer.finish_loading()
+        self.assertEqual(regions(), {0, 1})
+
+        # chunks within the unload radius stay loaded
+        streamer.update(111, 50)
+        self.assertEqual(regions(), {0, 1})
+
+        streamer.update(350, 50)
+        streamer.finish_loading()
+        self.assertEqual(regions(), {3})
+        self.assertEqual(set(streamer.loaded), {3})
+
+        world.destroy()
+
+    def test_unload_budget(self):
+        world = World()
+        streamer = world.attach(ChunkStreamer(self.path, 300))
+
+        def regions():
+            return {tree.region for tree in world.find(Tree)}
+
+        streamer.update(0, 50)
+        streamer.finish_loading()
+        self.assertEqual(regions(), {0, 1, 2, 3})
+
+        # one chunk is destroyed per update
+        streamer.load_radius = streamer.unload_radius = 40
+        streamer.update(0, 50)
+        self.assertEqual(regions(), {0, 2, 3})
+
+        # chunks back in range are no longer unloaded
+        streamer.update(250, 50)
+        self.assertEqual(regions(), {0, 2})
+        streamer.update(250, 50)
+        self.assertEqual(regions(), {2})
+
+        world.destroy()
+
+    def test_load_error(self):
+        chunks = ChunkFile(self.path)
+        offset = chunks._spans[1][0]
+        chunks.close()
+        with open(self.path, "r+b") as file:
+            file.seek(offset)
+            file.write(b"XXXX")
+
+        world = World()
+        streamer = world.attach(ChunkStreamer(self.path, 10))
+
+        streamer.update(150, 50)
+        with self.assertRaises(ValueError):
+            streamer.finish_loading()
+
+        # the loader thread carries on with other chunks
+        streamer.update(250, 50)
+        streamer.finish_loading()
+        self.assertEqual({tree.region for tree in world.find(Tree)}, {2})
+
+        world.destroy()
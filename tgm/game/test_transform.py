@@ -0,0 +1,103 @@
+from unittest import TestCase
+from math import pi
+import numpy as np
+from tgm.sys import Entity
+from tgm.game import World
+from tgm.game.transform import Transform, TransformHierarchy
+
+
+class TestTransform(TestCase):
+    def setUp(self):
+        self.world = World()
+        self.hierarchy = self.world.attach(TransformHierarchy())
+
+        self.ship = self.world.attach(Entity())
+        self.ship_transform = self.ship.attach(Transform(position=(10, 0)))
+
+        self.turret = self.ship.attach(Entity())
+        self.turret_transform = self.turret.attach(
+            Transform(position=(0, 5), scale=(2, 2))
+        )
+
+        # entities without a transform are skipped over
+        self.gun = self.turret.attach(Entity()).attach(Entity())
+        self.gun_transform = self.gun.attach(Transform(position=(1, 0)))
+
+    def test_parent_transform(self):
+        self.assertIsNone(self.ship_transform.parent_transform())
+        self.assertIs(self.turret_transform.parent_transform(),
+                      self.ship_transform)
+        self.assertIs(self.gun_transform.parent_transform(),
+                      self.turret_transform)
+
+    def test_update(self):
+        self.hierarchy.update()
+        self.assertTrue(np.allclose(self.gun_transform.world_position,
+                                    (12, 5)))
+        self.assertFalse(self.gun_transform.dirty)
+
+        self.ship_transform.rotation = pi / 2
+        self.assertTrue(self.ship_transform.dirty)
+        self.hierarchy.update()
+        self.assertTrue(np.allclose(self.turret_transform.world_position,
+                                    (5, 0)))
+        self.assertTrue(np.allclose(self.gun_transform.world_position,
+                                    (5, 2)))
+
+    def test_element_writes(self):
+        self.hierarchy.update()
+
+        # elements can't be written as that wouldn't mark the transform dirty
+        with self.assertRaises(ValueError):
+            self.ship_transform.position[0] = 20
+        with self.assertRaises(ValueError):
+            self.ship_transform.scale *= 2
+        self.assertFalse(self.ship_transform.dirty)
+
+        self.ship_transform.position = self.ship_transform.position + (5, 0)
+        self.assertTrue(self.ship_transform.dirty)
+        self.hierarchy.update()
+        self.assertTrue(np.allclose(self.gun_transform.world_position,
+                                    (17, 5)))
+
+    def test_subtree_invalidation(self):
+        other = self.world.attach(Entity()).attach(Transform())
+        self.hierarchy.update()
+
+        # stale cached values reveal which transforms were recomputed
+        other.world[:] = 0
+        self.ship_transform.world[:] = 0
+        self.turret_transform.position = (0, 6)
+        self.hierarchy.update()
+
+        self.assertTrue(np.all(other.world == 0))
+        self.assertTrue(np.all(self.ship_transform.world == 0))
+        self.assertTrue(np.allclose(self.gun_transform.world_position,
+                                    (0, 0)))
+
+    def test_refresh(self):
+        self.hierarchy.update()
+        self.gun.destroy()
+        self.world.attach(self.turret)
+        self.hierarchy.refresh()
+        self.hierarchy.update()
+        self.assertTrue(np.allclose(self.turret_transform.world_position,
+                                    (0, 5)))
+
+    def test_automatic_refresh(self):
+        self.hierarchy.update()
+
+        # transforms attached after an update are found by the next one
+        child = self.gun.attach(Entity())
+        transform = child.attach(Transform(position=(0, 1)))
+        self.hierarchy.update()
+        self.assertTrue(np.allclose(transform.world_position, (12, 7)))
+        self.assertFalse(transform.dirty)
+
+        # as are destroyed ones, whose rows may be reused
+        row = transform._column_row
+        child.destroy()
+        other = self.ship.attach(Entity()).attach(Transform(position=(1, 1)))
+        self.assertEqual(other._column_row, row)
+        self.hierarchy.update()
+        self.assertTrue(np.allclose(other.world_position, (11, 1)))
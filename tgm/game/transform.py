@@ -0,0 +1,244 @@
+"""Hierarchical transforms with cached world matrices."""
+from weakref import WeakSet
+import numpy as np
+from tgm.sys import Component
+from tgm.sys.node import add_change_listener, _change_listeners
+from tgm.sys.columnar import ColumnarComponent, Column
+
+
+class _LocalColumn(Column):
+    """A column making up part of a transform's local matrix.
+
+    Setting it marks the transform as dirty.  Arrays are read as read-only
+    views, since writing to their elements couldn't mark it, so they have to
+    be replaced as a whole instead.
+    """
+    def __get__(self, node, owner):
+        value = super().__get__(node, owner)
+        if node is not None and self.shape:
+            value = value.view()
+            value.flags.writeable = False
+        return value
+
+    def __set__(self, node, value):
+        super().__set__(node, value)
+        node.dirty = True
+
+
+class Transform(ColumnarComponent):
+    """The position, rotation and scale of the node it's attached to.
+
+    Transforms are relative to the transform of the nearest ancestor which
+    has one.  Each transform caches its world matrix, which is only
+    recomputed by a TransformHierarchy when the transform or one of its
+    ancestors has changed.
+
+    >>> transform = player.attach(Transform(position=(10, 20)))
+    >>> transform.rotation += 0.5
+    >>> transform.position = transform.position + (5, 0)
+    >>> hierarchy.update()
+    >>> transform.world_position
+    array([15., 20.])
+
+    The position and scale are read-only arrays, so they have to be assigned
+    as a whole for the change to be seen.
+    """
+    position = _LocalColumn("f8", 2)
+    rotation = _LocalColumn("f8")
+    scale = _LocalColumn("f8", 2, default=1)
+
+    # Cached matrices, the world matrix is only valid while not dirty
+    local = Column("f8", (3, 3))
+    world = Column("f8", (3, 3))
+    dirty = Column("?", default=True)
+
+    # The row of the parent transform, or -1 for a root, and its depth
+    parent_row = Column("i8", default=-1)
+    depth = Column("i8")
+
+    @property
+    def world_position(self):
+        """The position of the transform's origin in world space."""
+        return self.world[:2, 2]
+
+    def parent_transform(self):
+        """Return the transform of the nearest ancestor that has one."""
+        node = self._node_parent
+        while node is not None:
+            node = node._node_parent
+            if node is None:
+                break
+            for transform in node._node_children.get(Transform, ()):
+                return transform
+        return None
+
+
+class TransformHierarchy(Component):
+    """Keeps the world matrices of the transforms in its parent up to date.
+
+    The parent links and depths of the transforms are found by refresh,
+    which walks the tree.  It's called by the next update whenever nodes
+    with transforms have been attached, detached or destroyed in the parent.
+    update otherwise works only on arrays, visiting the transforms a depth
+    at a time and recomputing only those which are dirty or have a dirty
+    ancestor.
+
+    Writes through a Batch don't mark transforms as dirty, so set the dirty
+    column of the batch alongside them:
+
+    >>> transforms = Transform.batch_in(world)
+    >>> transforms.position = transforms.position + velocities * dt
+    >>> transforms.dirty = True
+    """
+    def __init__(self):
+        super().__init__()
+        self._store = Transform._column_store
+        self._levels = None
+        _watch(self)
+
+    def __getstate__(self):
+        """Leave out the storage and levels, which refer to rows that a
+        restored copy's transforms won't have."""
+        state = dict(vars(self))
+        del state["_store"]
+        state["_levels"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._store = Transform._column_store
+        _watch(self)
+
+    def refresh(self):
+        """Find the parent and depth of every transform in the parent."""
+        transforms = list(self.parent().find(Transform))
+
+        # Transforms whose parent is outside the hierarchy are roots
+        members = set(transforms)
+        parents = {}
+        for transform in transforms:
+            parent = transform.parent_transform()
+            parents[transform] = parent if parent in members else None
+
+        depths = {}
+        for transform in transforms:
+            chain = []
+            while transform is not None and transform not in depths:
+                chain.append(transform)
+                transform = parents[transform]
+
+            depth = -1 if transform is None else depths[transform]
+            for transform in reversed(chain):
+                depth += 1
+                depths[transform] = depth
+
+        rows = np.array([transform._column_row for transform in transforms],
+                        dtype=np.intp)
+        depth_values = np.array([depths[transform]
+                                 for transform in transforms],
+                                dtype=np.int64)
+
+        columns = self._store.columns
+        columns["parent_row"][rows] = [
+            -1 if parents[transform] is None
+            else parents[transform]._column_row
+            for transform in transforms
+        ]
+        columns["depth"][rows] = depth_values
+        columns["dirty"][rows] = True
+
+        order = np.argsort(depth_values, kind="stable")
+        rows = rows[order]
+        splits = np.flatnonzero(np.diff(depth_values[order])) + 1
+        self._levels = np.split(rows, splits)
+
+    def update(self):
+        """Recompute the world matrix of every changed transform."""
+        if self._levels is None:
+            self.refresh()
+
+        columns = self._store.columns
+        dirty = columns["dirty"]
+        parent_row = columns["parent_row"]
+        local = columns["local"]
+        world = columns["world"]
+
+        for rows in self._levels:
+            parents = parent_row[rows]
+            has_parent = parents >= 0
+
+            # A transform whose parent changed has to be recomputed too
+            dirty[rows[has_parent]] |= dirty[parents[has_parent]]
+            changed = dirty[rows]
+            if not changed.any():
+                continue
+
+            rows = rows[changed]
+            parents = parents[changed]
+            has_parent = has_parent[changed]
+
+            local[rows] = _local_matrices(
+                columns["position"][rows],
+                columns["rotation"][rows],
+                columns["scale"][rows]
+            )
+
+            world[rows[~has_parent]] = local[rows[~has_parent]]
+            child_rows = rows[has_parent]
+            world[child_rows] = np.matmul(
+                world[parents[has_parent]], local[child_rows]
+            )
+
+        for rows in self._levels:
+            dirty[rows] = False
+
+
+def _local_matrices(positions, rotations, scales):
+    """Build translate * rotate * scale matrices for arrays of transforms."""
+    cos = np.cos(rotations)
+    sin = np.sin(rotations)
+
+    matrices = np.zeros((len(positions), 3, 3))
+    matrices[:, 0, 0] = cos * scales[:, 0]
+    matrices[:, 0, 1] = -sin * scales[:, 1]
+    matrices[:, 1, 0] = sin * scales[:, 0]
+    matrices[:, 1, 1] = cos * scales[:, 1]
+    matrices[:, :2, 2] = positions
+    matrices[:, 2, 2] = 1
+    return matrices
+
+
+class _HierarchyMaintainer:
+    """Change listener which marks hierarchies to be refreshed when a
+    transform is attached or detached below them."""
+    def node_attached(self, parent, node):
+        if _hierarchies and node._node_index.get(Transform):
+            _invalidate_from(parent)
+
+    def node_detached(self, parent, node):
+        if _hierarchies and node._node_index.get(Transform):
+            _invalidate_from(parent)
+
+    def attribute_set(self, node, name, old_value, value):
+        pass
+
+
+def _invalidate_from(node):
+    """Mark the hierarchies on the node and its ancestors to be refreshed."""
+    while node is not None:
+        for hierarchy in node._node_children.get(TransformHierarchy, ()):
+            hierarchy._levels = None
+        node = node._node_parent
+
+
+# Every TransformHierarchy in the process, which the listener keeping them
+# up to date skips its work without
+_hierarchies = WeakSet()
+_maintainer = _HierarchyMaintainer()
+
+
+def _watch(hierarchy):
+    """Refresh the hierarchy whenever its transforms change."""
+    _hierarchies.add(hierarchy)
+    if _maintainer not in _change_listeners:
+        add_change_listener(_maintainer)
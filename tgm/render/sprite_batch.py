@@ -0,0 +1,111 @@
+"""Drawing many textured quads at once."""
+import numpy as np
+
+# Corners of a sprite in the order they're drawn, about its centre and in
+# texture coordinates
+_CORNERS = np.array([(-0.5, -0.5), (0.5, -0.5), (0.5, 0.5), (-0.5, 0.5)],
+                    np.float32)
+_CORNER_UVS = np.array([(0, 0), (1, 0), (1, 1), (0, 1)], np.float32)
+
+
+class SpriteBatch:
+    """Sprites drawn together as a single draw call.
+
+    Each sprite has a texture, the position of its centre, a size, a
+    rotation in radians about its centre and an RGBA tint.  These are kept
+    as arrays which can be updated in place between draws, and the quads are
+    expanded from them with every step vectorised over all sprites.
+
+    textures is either one texture for every sprite or a sequence with a
+    texture for each, sizes default to the sizes of the textures and tints
+    may be floats from 0 to 1 or uint8 from 0 to 255.
+
+    >>> batch = SpriteBatch(bullet_texture, positions)
+    >>> batch.positions += velocities * dt
+    >>> batch.draw(window)
+    """
+    def __init__(self, textures, positions, sizes=None, rotations=None,
+                 tints=None, compact=True):
+        self.positions = np.array(positions, np.float32).reshape(-1, 2)
+        count = len(self.positions)
+        self.compact = compact
+
+        self.set_textures(textures)
+        if sizes is None:
+            sizes = self._texture_sizes()
+        self.sizes = np.array(sizes, np.float32).reshape(-1, 2)
+        self.sizes = np.broadcast_to(self.sizes, (count, 2)).copy()
+
+        if rotations is None:
+            rotations = 0
+        self.rotations = np.zeros(count, np.float32)
+        self.rotations[:] = rotations
+
+        if tints is None:
+            tints = (1, 1, 1, 1)
+        if getattr(tints, "dtype", None) == np.uint8:
+            self.tints = np.empty((count, 4), np.uint8)
+        else:
+            self.tints = np.empty((count, 4), np.float32)
+        self.tints[:] = tints
+
+        self._uvs = np.tile(_CORNER_UVS, (count, 1))
+
+    def __len__(self):
+        return len(self.positions)
+
+    def set_textures(self, textures):
+        """Change the textures the sprites are drawn with."""
+        self.textures = textures
+
+        # Runs of consecutive sprites sharing a texture, as
+        # (texture, start, end), each drawn with one add_draw_2d so the
+        # sprites stay in order
+        if hasattr(textures, "width"):
+            self._runs = [(textures, 0, len(self.positions))]
+            return
+
+        textures = list(textures)
+        if len(textures) != len(self.positions):
+            raise ValueError(
+                "{} textures given for {} sprites".format(
+                    len(textures), len(self.positions)
+                )
+            )
+        keys = np.array([id(texture) for texture in textures], np.uintp)
+        starts = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+        bounds = [0] + starts.tolist() + [len(textures)]
+        self._runs = [(textures[start], start, end)
+                      for start, end in zip(bounds, bounds[1:])]
+
+    def draw(self, target):
+        """Queue the sprites to be drawn onto a texture or window."""
+        if not len(self):
+            return
+
+        cos = np.cos(self.rotations)[:, None]
+        sin = np.sin(self.rotations)[:, None]
+        corners = _CORNERS * self.sizes[:, None]
+        vertices = np.empty((len(self), 4, 2), np.float32)
+        vertices[..., 0] = corners[..., 0] * cos - corners[..., 1] * sin
+        vertices[..., 1] = corners[..., 0] * sin + corners[..., 1] * cos
+        vertices += self.positions[:, None]
+        tints = self.tints
+        if tints.dtype == np.uint8 and not self.compact:
+            # Only compact buffers take uint8 colours as they are
+            tints = tints * np.float32(1 / 255)
+        colors = np.repeat(tints, 4, axis=0)
+        vertices = vertices.reshape(-1, 2)
+
+        for texture, start, end in self._runs:
+            target.add_draw_2d(
+                texture, None, vertices[start * 4:end * 4],
+                colors[start * 4:end * 4], self._uvs[start * 4:end * 4],
+                compact=self.compact
+            )
+
+    def _texture_sizes(self):
+        sizes = np.empty((len(self), 2), np.float32)
+        for texture, start, end in self._runs:
+            sizes[start:end] = (texture.width, texture.height)
+        return sizes
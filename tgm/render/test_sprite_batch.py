@@ -0,0 +1,82 @@
+from unittest import TestCase
+from math import pi
+import gc
+import numpy as np
+from tgm.drivers.headless import render_context as headless
+from tgm.drivers.software.render_context import Manager, Texture, Window
+from tgm.render.sprite_batch import SpriteBatch
+
+
+class TestSpriteBatch(TestCase):
+    def setUp(self):
+        gc.collect()
+        Manager.initialized = False
+        Manager.init()
+
+    def _solid_texture(self, width, height, colour):
+        texture = Texture(width, height)
+        texture.add_clear(*colour)
+        texture.update()
+        return texture
+
+    def test_draw(self):
+        red = self._solid_texture(4, 2, (1, 0, 0, 1))
+        blue = self._solid_texture(2, 2, (0, 0, 1, 1))
+        window = Window(16, 16)
+
+        batch = SpriteBatch([red, red, blue], [(4, 4), (12, 4), (12, 12)],
+                            rotations=[0, pi / 2, 0],
+                            tints=[(1, 1, 1, 1), (1, 1, 1, 1),
+                                   (1, 1, 1, 0.5)])
+        self.assertEqual(batch.sizes.tolist(), [[4, 2], [4, 2], [2, 2]])
+        batch.draw(window)
+        window.update()
+        pixels = window.read_pixels()
+
+        # one unrotated, one turned on its side and one half transparent
+        self.assertEqual(tuple(pixels[3, 2]), (255, 0, 0, 255))
+        self.assertEqual((pixels[:8, :8, 0] == 255).sum(), 8)
+        self.assertEqual((pixels[:8, 8:, 0] == 255).sum(), 8)
+        self.assertEqual(pixels[2, 12, 0], 255)
+        self.assertEqual(pixels[4, 14, 0], 0)
+        self.assertEqual(tuple(pixels[12, 12]), (0, 0, 128, 128))
+
+        # updated in place between draws
+        batch.positions[0] += 100
+        batch.draw(window)
+        window.add_clear()
+        window.update()
+        self.assertEqual(window.read_pixels()[..., 3].sum(), 0)
+
+    def test_draw_calls(self):
+        headless.Manager.initialized = False
+        headless.Manager.init()
+        window = headless.Window(64, 64)
+        textures = [headless.Texture(8, 8), headless.Texture(4, 4)]
+
+        positions = np.random.RandomState(0).uniform(0, 64, (100, 2))
+        batch = SpriteBatch([textures[i % 3 // 2] for i in range(100)],
+                            positions, tints=np.full(4, 255, np.uint8))
+        self.assertEqual(len(batch._runs), 67)
+        batch.draw(window)
+        window.update()
+
+        frame = headless.Manager.frame
+        self.assertEqual(frame.calls[0], ("draw_2d", 400, 0))
+
+        with self.assertRaises(ValueError):
+            batch.set_textures(textures)
+
+    def test_uint8_tints(self):
+        white = self._solid_texture(2, 2, (1, 1, 1, 1))
+        tints = np.array([(255, 0, 128, 255)], np.uint8)
+
+        # uint8 tints are the same whichever layout is used
+        results = []
+        for compact in (True, False):
+            window = Window(4, 4)
+            SpriteBatch(white, [(2, 2)], tints=tints,
+                        compact=compact).draw(window)
+            window.update()
+            results.append(tuple(window.read_pixels()[2, 2]))
+        self.assertEqual(results, [(255, 0, 128, 255)] * 2)
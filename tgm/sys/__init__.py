@@ -1,6 +1,12 @@
 from .query import Queryable, Query, QueryablePrimitive, make_query
-from .node import Node, node_tree_summary, add_instantiation_call
+from .node import (
+    Node, node_tree_summary, node_hash, tree_diff, add_instantiation_call,
+    add_change_listener, remove_change_listener
+)
 from .entity import Entity
 from .component import Component
 from .tag import Tag
-from .event import Event, on
+from .tracked import Tracked
+from .event import Event, on, emit
+from .spatial import SpatialHash
+from .stats import TreeStats
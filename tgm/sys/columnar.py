@@ -0,0 +1,317 @@
+"""Components which store their fields in contiguous NumPy arrays."""
+import weakref
+import numpy as np
+from tgm.sys import Component
+
+
+class Column:
+    """A field of a ColumnarComponent stored in a shared array.
+
+    Every instance of a ColumnarComponent subclass owns one row of each of
+    the class's columns, so the values of a field across all instances sit
+    next to each other in memory and can be processed in bulk.
+
+    class Body(ColumnarComponent):
+        position = Column("f8", 2)
+        velocity = Column("f8", 2)
+        health = Column("f4", default=100)
+
+    Reading a column with a shape returns a view into the storage, which is
+    only valid until the next instance of the class is created.  Reading or
+    writing a column of a destroyed instance raises a ValueError.
+    """
+    def __init__(self, dtype="f8", shape=(), default=0):
+        if isinstance(shape, int):
+            shape = (shape,)
+
+        self.dtype = np.dtype(dtype)
+        self.shape = tuple(shape)
+        self.default = default
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, node, owner):
+        if node is None:
+            return self
+        return owner._column_store.columns[self.name][self._row(node)]
+
+    def __set__(self, node, value):
+        store = type(node)._column_store
+        store.columns[self.name][self._row(node)] = value
+
+    def _row(self, node):
+        row = node._column_row
+        if row is None:
+            raise ValueError(
+                "Can't access column '{}' of {}, it has been destroyed".format(
+                    self.name, node
+                )
+            )
+        return row
+
+
+class ColumnStore:
+    """The arrays holding the columns of a ColumnarComponent subclass.
+
+    Rows are handed out to instances as they're created and returned to a
+    free list when they're destroyed.  When no rows are free the arrays are
+    doubled in size.
+
+    The store only keeps weak references to the instances, so an instance
+    which is garbage collected without being destroyed has its row returned
+    to the free list too.
+
+    Rows are reused, so each instance is also given an id from a running
+    count, kept in the ids array, which tells it apart from earlier owners
+    of its row.  Free rows have an id of -1.
+    """
+    def __init__(self, columns, capacity=16):
+        self._column_defs = list(columns)
+        self.columns = {
+            column.name: np.full(
+                (capacity,) + column.shape, column.default, column.dtype
+            )
+            for column in self._column_defs
+        }
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.ids = np.full(capacity, -1, dtype=np.int64)
+        self._next_id = 0
+
+        # A weak reference to the instance owning each row, or None
+        self._nodes = [None] * capacity
+        self._free = list(reversed(range(capacity)))
+
+    @property
+    def capacity(self):
+        return len(self.alive)
+
+    def node(self, row):
+        """The instance owning a row, or None if the row is free."""
+        ref = self._nodes[row]
+        return None if ref is None else ref()
+
+    def add_column(self, column):
+        """Add a column, giving every existing row the default value."""
+        if column.name in self.columns:
+            raise ValueError(
+                "The storage already has a column named '{}'".format(
+                    column.name
+                )
+            )
+        self._column_defs.append(column)
+        self.columns[column.name] = np.full(
+            (self.capacity,) + column.shape, column.default, column.dtype
+        )
+
+    def allocate(self, node):
+        """Claim a row for the given node, with every column at its default.
+        """
+        if not self._free:
+            self._grow()
+
+        row = self._free.pop()
+        for column in self._column_defs:
+            self.columns[column.name][row] = column.default
+        self.alive[row] = True
+        self.ids[row] = self._next_id
+        self._next_id += 1
+
+        def collected(ref):
+            # Only if the row hasn't already been released and reused
+            if self._nodes[row] is ref:
+                self.release(row)
+
+        self._nodes[row] = weakref.ref(node, collected)
+        return row
+
+    def release(self, row):
+        """Return a row to the free list."""
+        self.alive[row] = False
+        self.ids[row] = -1
+        self._nodes[row] = None
+        self._free.append(row)
+
+    def _grow(self):
+        """Double the capacity of every column."""
+        old_capacity = self.capacity
+        new_capacity = old_capacity * 2
+
+        for column in self._column_defs:
+            old_array = self.columns[column.name]
+            new_array = np.full(
+                (new_capacity,) + column.shape, column.default, column.dtype
+            )
+            new_array[:old_capacity] = old_array
+            self.columns[column.name] = new_array
+
+        alive = np.zeros(new_capacity, dtype=bool)
+        alive[:old_capacity] = self.alive
+        self.alive = alive
+        ids = np.full(new_capacity, -1, dtype=np.int64)
+        ids[:old_capacity] = self.ids
+        self.ids = ids
+        self._nodes.extend([None] * old_capacity)
+        self._free.extend(reversed(range(old_capacity, new_capacity)))
+
+
+class Batch:
+    """A group of rows from a ColumnStore which are operated on together.
+
+    Reading a column gives a read-only copy of the values for each row in
+    the batch, and assigning to a column writes the values back to the
+    storage.  Since writes to the copy couldn't reach the storage, columns
+    are updated by assigning a whole new array, which can be built with
+    np.where to change only some rows:
+
+    >>> bodies = Body.batch(world.find(Body))
+    >>> bodies.position = bodies.position + bodies.velocity * dt
+    >>> bodies.health = np.where(bodies.health < 0, 0, bodies.health)
+    """
+    def __init__(self, store, rows):
+        object.__setattr__(self, "_store", store)
+        object.__setattr__(self, "rows", rows)
+
+    @property
+    def nodes(self):
+        """The nodes which own each row of the batch, in row order."""
+        return [self._store.node(row) for row in self.rows]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getattr__(self, name):
+        try:
+            column = self._store.columns[name]
+        except KeyError:
+            raise AttributeError(
+                "Batch has no column '{}'".format(name)
+            ) from None
+        values = column[self.rows]
+        values.flags.writeable = False
+        return values
+
+    def __setattr__(self, name, value):
+        try:
+            column = self._store.columns[name]
+        except KeyError:
+            raise AttributeError(
+                "Batch has no column '{}'".format(name)
+            ) from None
+        column[self.rows] = value
+
+
+class ColumnarComponent(Component):
+    """The base class for components whose data is processed in bulk.
+
+    Fields are declared as Column class attributes.  Each instance holds a
+    row handle into its class's ColumnStore rather than storing the fields
+    on itself, which lets systems update every instance with vectorised
+    operations through a Batch.
+
+    Subclasses share the storage of the first class in their hierarchy to
+    declare columns, with any columns they add being added to that storage.
+    This keeps every node found by a query on a columnar class in the same
+    arrays.
+    """
+    _column_store = ColumnStore([])
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        columns = [value for value in vars(cls).values()
+                   if isinstance(value, Column)]
+        if not columns:
+            return
+
+        if cls._column_store is ColumnarComponent._column_store:
+            cls._column_store = ColumnStore(columns)
+            return
+
+        for column in columns:
+            cls._column_store.add_column(column)
+
+    def __new__(cls, *args, **kwargs):
+        obj = super().__new__(cls, *args, **kwargs)
+        obj._column_row = cls._column_store.allocate(obj)
+        return obj
+
+    def __init__(self, **values):
+        super().__init__()
+        for name, value in values.items():
+            setattr(self, name, value)
+
+    def __getstate__(self):
+        """Include the values of the component's columns in its state."""
+        state = dict(vars(self))
+        row = state.pop("_column_row")
+        if row is not None:
+            state["_column_values"] = {
+                name: column[row].copy()
+                for name, column in type(self)._column_store.columns.items()
+            }
+        return state
+
+    def __setstate__(self, state):
+        """Restore the component, claiming a new row for its columns."""
+        state = dict(state)
+        values = state.pop("_column_values", None)
+        self.__dict__.update(state)
+
+        self._column_row = None
+        if values is not None:
+            store = type(self)._column_store
+            self._column_row = store.allocate(self)
+            for name, value in values.items():
+                store.columns[name][self._column_row] = value
+
+    def destroy(self):
+        """Destroy the component and release its row in the storage."""
+        super().destroy()
+
+        if self._column_row is not None:
+            type(self)._column_store.release(self._column_row)
+            self._column_row = None
+
+    @classmethod
+    def batch(cls, nodes):
+        """Return a Batch of the rows belonging to the given nodes.
+
+        Accepts any iterable of instances, such as the results of a query:
+
+        >>> Body.batch(world.find(Body, trim=Disabled))
+        <tgm.sys.columnar.Batch at 318f9f0>
+        """
+        store = cls._column_store
+        rows = []
+        for node in nodes:
+            if type(node)._column_store is not store:
+                raise ValueError(
+                    "{} does not share {}'s column storage".format(
+                        node, cls.__name__
+                    )
+                )
+            if node._column_row is None:
+                raise ValueError(
+                    "Can't batch {}, it has been destroyed".format(node)
+                )
+            rows.append(node._column_row)
+        return Batch(store, np.array(rows, dtype=np.intp))
+
+    @classmethod
+    def batch_in(cls, node, query=None):
+        """Return a Batch of every instance found in the node.
+
+        Equivalent to cls.batch(node.find(query)), with the query defaulting
+        to the class itself.
+        """
+        if query is None:
+            query = cls
+        return cls.batch(node.find(query))
+
+    @classmethod
+    def batch_all(cls):
+        """Return a Batch of every live row in the class's storage."""
+        store = cls._column_store
+        return Batch(store, np.flatnonzero(store.alive))
@@ -22,3 +22,11 @@ def on(event_type):
         add_instantiation_call(func, _attach_event)
         return func
     return _event_wrap
+
+
+def emit(node, event_type, *args, **kwargs):
+    """Call each of the node's handlers for the given event type."""
+    handlers = node._node_children.get(event_type)
+    if handlers:
+        for event in tuple(handlers):
+            event(*args, **kwargs)
@@ -0,0 +1,177 @@
+"""Immutable snapshots of a subtree's index for concurrent queries."""
+from concurrent.futures import ThreadPoolExecutor
+from tgm.sys import Node, Queryable, QueryablePrimitive, make_query
+from tgm.sys.query import DummyQuery
+
+
+class FrozenIndex:
+    """A read-only copy of the structure and indexes of a subtree.
+
+    Queries on a FrozenIndex see the tree as it was when the index was
+    frozen, no matter what is attached or detached afterwards, and as
+    nothing in it is ever modified it can be searched from many threads at
+    once.  Query conditions still read the live nodes' attributes.
+
+    >>> frozen = FrozenIndex(world)
+    >>> frozen.parallel_find(Enemy["visible"])
+    [<mygame.enemy.Enemy at 318f9f0>, <mygame.enemy.Enemy at 318e9f0>]
+    """
+    def __init__(self, root):
+        self.root = root
+
+        # Maps each node to its index, with the sets replaced by tuples
+        self._index = {}
+
+        # Maps each node to its parent, the root's parent is outside the
+        # snapshot so is left out
+        self._parents = {root: None}
+
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            self._index[node] = {
+                key: tuple(node_set)
+                for key, node_set in node._node_index.items() if node_set
+            }
+            for child in node._node_children.get(Node, ()):
+                self._parents[child] = node
+                stack.append(child)
+
+    def __contains__(self, node):
+        return node in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def parent(self, node):
+        """Return the node's parent at the time the index was frozen."""
+        return self._parents[node]
+
+    def find(self, query, trim=None, node=None):
+        """Return the descendents of the node, defaulting to the root, which
+        match the query.
+
+        Behaves like Node.find, but on the frozen tree.
+        """
+        if node is None:
+            node = self.root
+        query, trim = self._prepare(query, trim)
+
+        for child in self._candidates(query, node):
+            for result in self._search(query, trim, child):
+                yield result
+
+    def parallel_find(self, query, trim=None, executor=None,
+                      max_workers=None):
+        """Return a list of the root's descendents which match the query,
+        searching the subtree under each top-level child as a separate task.
+
+        Uses the given concurrent.futures executor, or a new thread pool
+        with max_workers threads.
+        """
+        query, trim = self._prepare(query, trim)
+        children = list(self._candidates(query, self.root))
+
+        def search(child):
+            return list(self._search(query, trim, child))
+
+        if executor is None:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                parts = list(executor.map(search, children))
+        else:
+            parts = list(executor.map(search, children))
+
+        return [result for part in parts for result in part]
+
+    def _prepare(self, query, trim):
+        """Normalise the arguments of find into a key or Query, and a trim
+        function evaluated on the frozen tree."""
+        if isinstance(trim, Queryable):
+            trim_query = make_query(trim)
+
+            def trim(node):
+                return self._test(trim_query, node)
+
+        if not isinstance(query, QueryablePrimitive):
+            query = make_query(query)
+            if trim is not None:
+                query = query.trim(trim)
+                trim = None
+
+        return query, trim
+
+    def _candidates(self, query, node):
+        """Find the children of the node which are worth searching."""
+        if isinstance(query, QueryablePrimitive):
+            key = query
+        else:
+            key = self._optimal_key(query, node)
+
+        return (child
+                for child in self._index[node].get(key, ())
+                if child is not node)
+
+    def _search(self, query, trim, node):
+        """Find matches in the node's subtree, including the node itself."""
+        if isinstance(query, QueryablePrimitive):
+            # Checks trim the same way as _find_fast_trim
+            for child in self._index[node].get(query, ()):
+                if trim is not None and trim(child):
+                    continue
+                if child is node:
+                    yield child
+                else:
+                    for result in self._search(query, trim, child):
+                        yield result
+            return
+
+        if query._trim(node):
+            return
+        if self._test(query, node):
+            yield node
+        for child in self._candidates(query, node):
+            for result in self._search(query, trim, child):
+                yield result
+
+    def _test(self, query, node):
+        """Query.test evaluated against the frozen tree."""
+        if isinstance(query, DummyQuery):
+            return True
+
+        if not isinstance(node, query._key):
+            return False
+
+        if not query._condition(node):
+            return False
+
+        if query._trim(node):
+            return False
+
+        if query._region is not None and not query._region.test(node):
+            return False
+
+        child_query = query._child_query
+        if not isinstance(child_query, DummyQuery):
+            key = self._optimal_key(child_query, node)
+            if not any(self._test(child_query, child)
+                       for child in self._index[node].get(key, ())
+                       if child is not node):
+                return False
+
+        parent_query = query._parent_query
+        if not isinstance(parent_query, DummyQuery):
+            if not self._test(parent_query, self._parents.get(node)):
+                return False
+
+        return True
+
+    def _optimal_key(self, query, node):
+        """Query._optimal_key evaluated against the frozen tree."""
+        if isinstance(query, DummyQuery):
+            return object
+
+        index = self._index[node]
+        optimal_key = self._optimal_key(query._child_query, node)
+        if len(index.get(query._key, ())) < len(index.get(optimal_key, ())):
+            return query._key
+        return optimal_key
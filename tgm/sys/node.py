@@ -1,4 +1,5 @@
 from collections import defaultdict, Counter
+from hashlib import blake2b
 from inspect import getmro, getmembers
 from tgm.sys import Queryable, QueryablePrimitive, Query, make_query
 
@@ -12,14 +13,7 @@ class Node(metaclass=NodeMeta):
     """The base class for all objects in the scene graph."""
     def __new__(cls, *args, **kwargs):
         obj = super().__new__(cls)
-
-        # The attributes representing the node's position on the scene
-        obj._node_parent = None
-        obj._node_children = defaultdict(set)
-
-        # Maps types to child nodes which are of given type or have a
-        # descendent of given type.  If self is of this type, it is included
-        obj._node_index = defaultdict(set)
+        _init_node_state(obj)
 
         # Register each base class in the index of the created object
         for key in getmro(cls):
@@ -48,6 +42,11 @@ class Node(metaclass=NodeMeta):
         for key, node_set in node._node_index.items():
             if node_set:
                 self._add_index_key(key, node)
+        _invalidate_hash(self)
+
+        if _change_listeners:
+            for listener in _change_listeners:
+                listener.node_attached(self, node)
 
         return node
 
@@ -59,7 +58,7 @@ class Node(metaclass=NodeMeta):
         >>> player.destroy()
         None
         """
-        for child in self.children(Node):
+        for child in tuple(self.children(Node)):
             child.destroy()
 
         if self._node_parent is not None:
@@ -207,6 +206,15 @@ class Node(metaclass=NodeMeta):
         """
         return make_query(query).test(self)
 
+    def stats(self):
+        """Return the node counts and index sizes of the node's subtree.
+
+        >>> world.stats().to_json()
+        '{"nodes": 20000, "nodes_by_class": {"mygame.enemy.Enemy": 5000...'
+        """
+        from tgm.sys.stats import TreeStats
+        return TreeStats(self)
+
     def _detach(self, node):
         """Detach the given node from its parent."""
         for key, node_set in node._node_index.items():
@@ -216,6 +224,11 @@ class Node(metaclass=NodeMeta):
         for key in getmro(type(node)):
             self._node_children[key].remove(node)
         node._node_parent = None
+        _invalidate_hash(self)
+
+        if _change_listeners:
+            for listener in _change_listeners:
+                listener.node_detached(self, node)
 
         return node
 
@@ -233,6 +246,15 @@ class Node(metaclass=NodeMeta):
         if (self._node_parent is not None) and (not self._node_index[key]):
             self._node_parent._remove_index_key(key, self)
 
+    def __reduce_ex__(self, protocol):
+        """Pickle the node so that unpickling doesn't run __new__, which would
+        repeat its instantiation calls and rebuild its index."""
+        try:
+            state = self.__getstate__()
+        except AttributeError:
+            state = self.__dict__
+        return _new_node, (type(self),), state
+
     def __repr__(self):
         return "<{module}.{type} at {id:x}>".format(
             type=type(self).__name__,
@@ -241,17 +263,57 @@ class Node(metaclass=NodeMeta):
         )
 
 
+def _init_node_state(obj):
+    """Give a new node the attributes describing its place in the tree."""
+    # The attributes representing the node's position on the scene
+    obj._node_parent = None
+    obj._node_children = defaultdict(set)
+
+    # Maps types to child nodes which are of given type or have a
+    # descendent of given type.  If self is of this type, it is included
+    obj._node_index = defaultdict(set)
+
+    # The structural hash of the node's subtree, or None until node_hash is
+    # called.  If a node's hash is cached then so are its descendents'
+    obj._node_hash = None
+
+
+def _new_node(cls):
+    """Create a node without registering it in its own index or running its
+    instantiation calls, for use when its state is restored in bulk."""
+    obj = object.__new__(cls)
+    _init_node_state(obj)
+    return obj
+
+
 def node_tree_summary(node, indent="    ", prefix=""):
     """Get a summary of all the the node tree starting from the given node."""
+    return _tree_summary(node, indent, prefix, {})
+
+
+def _tree_summary(node, indent, prefix, summaries):
+    """Summarise a subtree, reusing the summaries of identical subtrees."""
+    summary_key = (node_hash(node), prefix)
+    try:
+        return summaries[summary_key]
+    except KeyError:
+        pass
+
     name = "{} in {}".format(type(node).__name__, type(node).__module__)
     tree_string = prefix + name
 
+    # Identical subtrees have the same hash so only one of each is summarised
     child_trees = Counter()
+    examples = {}
     for child in node.children(Node):
-        subtree_string = node_tree_summary(child, prefix=(prefix + indent))
-        child_trees[subtree_string] += 1
+        subtree_hash = node_hash(child)
+        child_trees[subtree_hash] += 1
+        examples.setdefault(subtree_hash, child)
 
-    for subtree_string, count in child_trees.most_common():
+    for subtree_hash, count in child_trees.most_common():
+        subtree_string = _tree_summary(
+            examples[subtree_hash], indent, prefix + indent, summaries
+        )
         indent_length = len(prefix + indent)
 
         subtree_string = "{}[{}] {}".format(
@@ -261,9 +323,137 @@ def node_tree_summary(node, indent="    ", prefix=""):
         )
 
         tree_string += "\n" + subtree_string
+
+    summaries[summary_key] = tree_string
     return tree_string
 
 
+def node_hash(node):
+    """Return a hash of the structure of the node's subtree, the types of its
+    nodes and how they're arranged.
+
+    The hash doesn't depend on the order of children, or on anything else
+    that varies between runs, so it can be compared across processes.  It's
+    cached on each node and only recomputed for nodes whose subtree has
+    changed since it was last called.
+    """
+    if node._node_hash is not None:
+        return node._node_hash
+
+    # Hash children before their parents without recursing
+    stack = [(node, False)]
+    while stack:
+        current, children_hashed = stack.pop()
+        children = current._node_children.get(Node, ())
+
+        if not children_hashed:
+            stack.append((current, True))
+            stack.extend((child, False)
+                         for child in children if child._node_hash is None)
+            continue
+
+        digest = blake2b(_type_hash(type(current)), digest_size=16)
+        for child_hash in sorted(child._node_hash for child in children):
+            digest.update(child_hash)
+        current._node_hash = digest.digest()
+
+    return node._node_hash
+
+
+def tree_diff(old, new):
+    """Return the differences between the structures of two trees.
+
+    Children are paired up first with identical subtrees and then with
+    children of the same type, and only pairs whose hashes differ are
+    searched, so the cost depends on how much has changed rather than on the
+    size of the trees.  Each difference is one of:
+
+    ("added", old_parent, new_node) - new_node has no counterpart among the
+    children of old_parent.
+    ("removed", old_node, new_parent) - old_node has no counterpart among
+    the children of new_parent.
+    ("replaced", old, new) - the roots are of different types.
+
+    >>> tree_diff(level, edited_level)
+    [('added', <mygame.level.Layer at 318f9f0>, <mygame.enemy.Enemy ...>)]
+    """
+    if type(old) is not type(new):
+        return [("replaced", old, new)]
+
+    differences = []
+    stack = [(old, new)]
+    while stack:
+        old_node, new_node = stack.pop()
+        if node_hash(old_node) == node_hash(new_node):
+            continue
+
+        pairs, removed, added = _pair_children(old_node, new_node)
+        stack.extend(pairs)
+        differences.extend(("removed", child, new_node) for child in removed)
+        differences.extend(("added", old_node, child) for child in added)
+
+    return differences
+
+
+def _pair_children(old, new):
+    """Pair the children of two nodes which differ only within their
+    subtrees.
+
+    Returns the pairs of children which differ, and the old and new children
+    left unpaired.  Children with identical subtrees are paired and dropped.
+    """
+    unmatched = defaultdict(list)
+    for child in old._node_children.get(Node, ()):
+        unmatched[node_hash(child)].append(child)
+
+    added = []
+    for child in new._node_children.get(Node, ()):
+        same = unmatched.get(node_hash(child))
+        if same:
+            same.pop()
+        else:
+            added.append(child)
+
+    by_type = defaultdict(list)
+    for same in unmatched.values():
+        for child in same:
+            by_type[type(child)].append(child)
+
+    pairs = []
+    unpaired = []
+    for child in added:
+        same_type = by_type.get(type(child))
+        if same_type:
+            pairs.append((same_type.pop(), child))
+        else:
+            unpaired.append(child)
+
+    removed = [child for same_type in by_type.values() for child in same_type]
+    return pairs, removed, unpaired
+
+
+# Maps node types to the hash of their name, see node_hash
+_type_hashes = {}
+
+
+def _type_hash(cls):
+    try:
+        return _type_hashes[cls]
+    except KeyError:
+        name = "{}.{}".format(cls.__module__, cls.__qualname__)
+        type_hash = blake2b(name.encode(), digest_size=16).digest()
+        _type_hashes[cls] = type_hash
+        return type_hash
+
+
+def _invalidate_hash(node):
+    """Clear the cached hash of a node whose subtree changed, and of its
+    ancestors."""
+    while node is not None and node._node_hash is not None:
+        node._node_hash = None
+        node = node._node_parent
+
+
 def _find_fast(node, key):
     """Optimised version of Node's find for a simple key and no trim.
 
@@ -323,6 +513,45 @@ def _find_with_fast_trim(node, key, trim):
             yield nested_child
 
 
+def _reindex(nodes):
+    """Rebuild the indexes of nodes from their children's indexes.
+
+    The nodes must be ordered so that each comes after all of its children,
+    which builds a new subtree's index in one pass rather than propagating
+    each key up the tree as every node is attached.
+    """
+    for node in nodes:
+        index = defaultdict(set)
+        for key in getmro(type(node)):
+            index[key].add(node)
+        for child in node._node_children.get(Node, ()):
+            for key, node_set in child._node_index.items():
+                if node_set:
+                    index[key].add(child)
+        node._node_index = index
+
+
+# Objects notified of changes made to any node, see add_change_listener
+_change_listeners = []
+
+
+def add_change_listener(listener):
+    """Register an object to be notified of every change to the scene graph.
+
+    The listener's node_attached(parent, node) and node_detached(parent, node)
+    are called after a node is attached or detached, and
+    attribute_set(node, name, old_value, value) is called before an attribute
+    of a Tracked node is set.  Listeners are called for every tree, so should
+    filter out nodes they aren't interested in.
+    """
+    _change_listeners.append(listener)
+
+
+def remove_change_listener(listener):
+    """Stop notifying a listener added with add_change_listener."""
+    _change_listeners.remove(listener)
+
+
 # Functions that get called when a given object is found in a node's namespace
 # {object: [functions_to_call]}
 _on_instantiation = {}
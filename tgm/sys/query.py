@@ -22,6 +22,30 @@ class Queryable:
         lhs = make_query(self)
         return rhs.parent_matches(lhs)
 
+    def within(self, x1, y1, x2, y2):
+        """Limit results to nodes positioned inside the given rectangle.
+
+        e.g. Enemy.within(0, 0, 640, 480)
+
+        Positions are read from a node's x and y attributes.  When searching
+        a node which has a SpatialHash attached, the index is used to find
+        candidates rather than testing every descendent.
+        """
+        return make_query(self).combine(
+            Query(region=_RectRegion(x1, y1, x2, y2))
+        )
+
+    def near(self, x, y, radius):
+        """Limit results to nodes positioned within radius of a point.
+
+        e.g. Enemy.near(player.x, player.y, 100)
+
+        Like within, this makes use of a SpatialHash where one is available.
+        """
+        return make_query(self).combine(
+            Query(region=_CircleRegion(x, y, radius))
+        )
+
 
 class QueryablePrimitive(Queryable):
     """Base class for objects that can be used as query indexes.
@@ -56,19 +80,24 @@ class Query(Queryable):
                  condition=lambda _: True,
                  parent_query=DummyQuery(),
                  child_query=DummyQuery(),
-                 trim=lambda _: False):
+                 trim=lambda _: False,
+                 region=None):
         """Constructs a query object which can be used to find nodes in
         the scene graph.
 
         Specifying a key will limit results to only nodes which inherit
         that type.  The engine indexes objects by their types, making
         this the most performant (and concise) way to query for objects.
+
+        A region limits results to nodes positioned inside it, and allows
+        a SpatialHash to be used to find candidates.
         """
         self._key = key
         self._condition = condition
         self._parent_query = parent_query
         self._child_query = child_query
         self._trim = trim
+        self._region = region
 
     def test(self, node):
         """Checks if the given node matches the query."""
@@ -82,6 +111,9 @@ class Query(Queryable):
         if self._trim(node):
             return False
 
+        if self._region is not None and not self._region.test(node):
+            return False
+
         if not isinstance(self._child_query, DummyQuery):
             optimal_key = self._child_query._optimal_key(node)
 
@@ -106,6 +138,13 @@ class Query(Queryable):
         but to get the full result set, convert it to a list, e.g.:
             list(query.find_in(world))
         """
+        if self._region is not None:
+            index = _spatial_index(node)
+            if index is not None:
+                for child in self._find_in_index(node, index):
+                    yield child
+                return
+
         key = self._optimal_key(node)
 
         for child in node._node_index[key]:
@@ -118,6 +157,24 @@ class Query(Queryable):
             for nested_child in self.find_in(child):
                 yield nested_child
 
+    def _find_in_index(self, node, index):
+        """Version of find_in which takes candidates from a spatial index
+        instead of searching the node's descendents."""
+        for candidate in index.query(self._region):
+            if not self.test(candidate):
+                continue
+
+            # Make sure the candidate is still a descendent of the node and
+            # that nothing on the path down to it is trimmed
+            parent = candidate._node_parent
+            while parent is not None and parent is not node:
+                if self._trim(parent):
+                    break
+                parent = parent._node_parent
+
+            if parent is node:
+                yield candidate
+
     def find_on(self, node):
         """Return every direct descendent in the node which matches the query.
 
@@ -201,6 +258,19 @@ class Query(Queryable):
         def trim(node):
             return self._trim(node) or other._trim(node)
 
+        # Only one region can be used to plan the search, any other is
+        # tested as a condition
+        if self._region is None:
+            region = other._region
+        else:
+            region = self._region
+            if other._region is not None:
+                region_condition = condition
+
+                def condition(node):
+                    return (region_condition(node)
+                            and other._region.test(node))
+
         # Pick the most specific key
         if issubclass(other._key, self._key):
             key = other._key
@@ -215,7 +285,7 @@ class Query(Queryable):
             def condition(node):
                 return old_condition(node) and isinstance(node, other._key)
 
-        return Query(key, condition, parent_query, child_query, trim)
+        return Query(key, condition, parent_query, child_query, trim, region)
 
     def _optimal_key(self, node):
         """Find the key which requires testing the minimal number of nodes."""
@@ -229,6 +299,43 @@ class Query(Queryable):
         return optimal_key
 
 
+class _RectRegion:
+    """Area used by Queryable.within to constrain node positions."""
+    def __init__(self, x1, y1, x2, y2):
+        self.bounds = (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+
+    def contains(self, x, y):
+        x1, y1, x2, y2 = self.bounds
+        return x1 <= x <= x2 and y1 <= y <= y2
+
+    def test(self, node):
+        return (hasattr(node, "x") and hasattr(node, "y")
+                and self.contains(node.x, node.y))
+
+
+class _CircleRegion(_RectRegion):
+    """Area used by Queryable.near to constrain node positions."""
+    def __init__(self, x, y, radius):
+        super().__init__(x - radius, y - radius, x + radius, y + radius)
+        self.x = x
+        self.y = y
+        self.radius = radius
+
+    def contains(self, x, y):
+        dx = x - self.x
+        dy = y - self.y
+        return dx * dx + dy * dy <= self.radius * self.radius
+
+
+def _spatial_index(node):
+    """Return the SpatialHash attached to the node, if there is one."""
+    from tgm.sys.spatial import SpatialHash
+
+    for index in node._node_children.get(SpatialHash, ()):
+        return index
+    return None
+
+
 def make_query(item):
     """Constructs a Query from a Queryable."""
     if isinstance(item, Query):
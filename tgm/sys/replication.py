@@ -0,0 +1,330 @@
+"""Replicating changes to a node tree as compact per-tick deltas.
+
+A ChangeTracker watches a tree for attaches, detaches and writes to the
+attributes of Tracked nodes, and encodes them as a delta once per tick.  A
+DeltaApplier replays those deltas onto a replica of the tree, which may be
+in another process:
+
+>>> tracker = ChangeTracker(server_world)
+>>> write_frame(connection, tracker.encode())
+...
+>>> applier = DeltaApplier(client_world)
+>>> applier.apply(read_frame(connection))
+"""
+from io import BytesIO
+import pickle
+import struct
+from timeit import default_timer
+from weakref import WeakSet
+from tgm.sys import Node, add_change_listener, remove_change_listener
+from tgm.sys.node import _new_node, _reindex
+from tgm.sys.serialize import _get_state, _set_state
+
+_FRAME = struct.Struct("<I")
+
+# Operations in a delta
+_CREATE = 0
+_MOVE = 1
+_DETACH = 2
+_FORGET = 3
+
+
+class ChangeTracker:
+    """Records the changes made to a tree so they can be sent as deltas.
+
+    Every node in the tree is given a network id.  The root has id 0, and is
+    expected to correspond to the root given to the DeltaApplier.  The
+    first delta encoded describes the whole tree, later deltas describe only
+    what changed since the previous one.
+
+    Attribute writes are coalesced so only the last value written to an
+    attribute in a tick is sent.  Values referring to a node which has left
+    the tree, such as a target which has been destroyed, are sent as None.
+    """
+    def __init__(self, root):
+        self.root = root
+        self._ids = {root: 0}
+        self._nodes = {0: root}
+        self._next_id = 1
+
+        self._ops = []
+        self._create_states = []
+        self._sets = {}
+        self._detached = set()
+
+        # Nodes which have left the tree, and so are sent as None
+        self._forgotten = WeakSet()
+
+        # Statistics on the encoded deltas
+        self.ticks = 0
+        self.total_bytes = 0
+        self.last_bytes = 0
+
+        for child in tuple(root.children(Node)):
+            self._create(root, child)
+        self._create_states.append((0, _get_state(root)))
+
+        add_change_listener(self)
+
+    def close(self):
+        """Stop tracking changes."""
+        remove_change_listener(self)
+
+    def encode(self):
+        """Return the changes since the last call as a delta and clear them.
+        """
+        # Nodes detached this tick and never reattached are dropped.  The
+        # tracker's state is only changed once the delta has been pickled,
+        # so a value which fails to pickle can be replaced and sent by a
+        # later call
+        forgotten = [node for node in self._detached
+                     if node in self._ids
+                     and (node._node_parent is None
+                          or node._node_parent not in self._ids)]
+        forgotten_nodes = set()
+        for node in forgotten:
+            forgotten_nodes.update(self._tracked_subtree(node))
+
+        ops = self._ops + [(_FORGET, self._ids[node]) for node in forgotten]
+        sets = [(node_id, name, value)
+                for (node_id, name), value in self._sets.items()
+                if node_id in self._nodes
+                and self._nodes[node_id] not in forgotten_nodes]
+
+        # The structure is pickled separately from the values, so the
+        # applier can create every new node before values referencing them
+        # are unpickled
+        structure = pickle.dumps(ops, protocol=4)
+        values = BytesIO()
+        _NodeIdPickler(
+            values, self._ids, (forgotten_nodes, self._forgotten)
+        ).dump((self._create_states, sets))
+
+        delta = b"".join((_FRAME.pack(len(structure)), structure,
+                          values.getvalue()))
+
+        for node in forgotten_nodes:
+            del self._nodes[self._ids.pop(node)]
+            self._forgotten.add(node)
+        self._detached.clear()
+        self._ops = []
+        self._create_states = []
+        self._sets = {}
+
+        self.ticks += 1
+        self.total_bytes += len(delta)
+        self.last_bytes = len(delta)
+        return delta
+
+    def node_attached(self, parent, node):
+        if parent not in self._ids:
+            return
+
+        if node in self._ids:
+            self._ops.append((_MOVE, self._ids[node], self._ids[parent]))
+            self._detached.discard(node)
+        else:
+            self._create(parent, node)
+
+    def node_detached(self, parent, node):
+        if node in self._ids:
+            self._ops.append((_DETACH, self._ids[node]))
+            self._detached.add(node)
+
+    def attribute_set(self, node, name, old_value, value):
+        try:
+            self._sets[(self._ids[node], name)] = value
+        except KeyError:
+            pass
+
+    def _create(self, parent, node):
+        """Give ids to a newly attached subtree and record its creation."""
+        first_id = self._next_id
+        types = []
+        parents = []
+
+        stack = [(node, -1)]
+        while stack:
+            current, parent_index = stack.pop()
+            index = len(types)
+            node_id = first_id + index
+            self._ids[current] = node_id
+            self._nodes[node_id] = current
+            self._forgotten.discard(current)
+
+            types.append(type(current))
+            parents.append(parent_index)
+            self._create_states.append((node_id, _get_state(current)))
+
+            stack.extend((child, index)
+                         for child in current._node_children.get(Node, ()))
+
+        self._next_id += len(types)
+        self._ops.append((_CREATE, self._ids[parent], first_id, types,
+                          parents))
+
+    def _tracked_subtree(self, node):
+        """Return the node and its descendents which have ids."""
+        nodes = []
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            nodes.append(current)
+            stack.extend(child
+                         for child in current._node_children.get(Node, ())
+                         if child in self._ids)
+        return nodes
+
+
+class DeltaApplier:
+    """Replays deltas from a ChangeTracker onto a replica tree.
+
+    Each subtree created in a delta is linked and indexed in a single pass,
+    then attached to the replica as a whole.
+    """
+    def __init__(self, root):
+        self.root = root
+        self._nodes = {0: root}
+        self._ids = {root: 0}
+
+        # Statistics on the applied deltas
+        self.applies = 0
+        self.total_apply_time = 0
+        self.last_apply_time = 0
+
+    def node(self, node_id):
+        """Return the replica node with the given network id."""
+        return self._nodes[node_id]
+
+    def apply(self, delta):
+        """Apply a delta encoded by ChangeTracker.encode."""
+        start = default_timer()
+
+        delta = memoryview(delta)
+        length, = _FRAME.unpack_from(delta, 0)
+        ops = pickle.loads(delta[_FRAME.size:_FRAME.size + length])
+
+        # Create the nodes first so that values can refer to them
+        subtrees = {}
+        for op in ops:
+            if op[0] == _CREATE:
+                _, _, first_id, types, parents = op
+                subtree = [_new_node(cls) for cls in types]
+                for node_id, node in enumerate(subtree, first_id):
+                    self._nodes[node_id] = node
+                    self._ids[node] = node_id
+                subtrees[first_id] = subtree
+
+        create_states, sets = _NodeIdUnpickler(
+            BytesIO(delta[_FRAME.size + length:]), self._nodes
+        ).load()
+        for node_id, state in create_states:
+            _set_state(self._nodes[node_id], state)
+
+        for op in ops:
+            code = op[0]
+            if code == _CREATE:
+                _, parent_id, first_id, types, parents = op
+                self._attach_subtree(
+                    self._nodes[parent_id], subtrees[first_id], parents
+                )
+            elif code == _MOVE:
+                self._nodes[op[2]].attach(self._nodes[op[1]])
+            elif code == _DETACH:
+                node = self._nodes[op[1]]
+                node._node_parent._detach(node)
+
+        for node_id, name, value in sets:
+            setattr(self._nodes[node_id], name, value)
+
+        for op in ops:
+            if op[0] == _FORGET:
+                self._forget(self._nodes[op[1]])
+
+        self.last_apply_time = default_timer() - start
+        self.applies += 1
+        self.total_apply_time += self.last_apply_time
+
+    def _attach_subtree(self, parent, subtree, parents):
+        """Link a created subtree, index it and attach it to the parent."""
+        for node, parent_index in zip(subtree, parents):
+            if parent_index < 0:
+                continue
+            parent_node = subtree[parent_index]
+            node._node_parent = parent_node
+            children = parent_node._node_children
+            for key in type(node).__mro__:
+                children[key].add(node)
+
+        # Children are always listed after their parents
+        _reindex(reversed(subtree))
+        parent.attach(subtree[0])
+
+    def _forget(self, node):
+        """Destroy a detached replica node and drop its ids."""
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            node_id = self._ids.pop(current, None)
+            if node_id is not None:
+                del self._nodes[node_id]
+            stack.extend(current._node_children.get(Node, ()))
+        node.destroy()
+
+
+def write_frame(file, data):
+    """Write a length prefixed frame to a binary file, such as a pipe or
+    socket.makefile("wb")."""
+    file.write(_FRAME.pack(len(data)))
+    file.write(data)
+    file.flush()
+
+
+def read_frame(file):
+    """Read a frame written by write_frame."""
+    length, = _FRAME.unpack(_read_exactly(file, _FRAME.size))
+    return _read_exactly(file, length)
+
+
+def _read_exactly(file, size):
+    data = file.read(size)
+    if len(data) != size:
+        raise EOFError("Connection closed mid-frame")
+    return data
+
+
+# Network id standing in for a reference to a node that has been forgotten
+_FORGOTTEN_ID = -1
+
+
+class _NodeIdPickler(pickle.Pickler):
+    """Pickler which stores nodes by their network id, and nodes in any of
+    the forgotten collections as _FORGOTTEN_ID."""
+    def __init__(self, file, ids, forgotten=()):
+        super().__init__(file, protocol=4)
+        self._ids = ids
+        self._forgotten = forgotten
+
+    def persistent_id(self, obj):
+        if not isinstance(obj, Node):
+            return None
+        if any(obj in nodes for nodes in self._forgotten):
+            return _FORGOTTEN_ID
+        try:
+            return self._ids[obj]
+        except KeyError:
+            raise ValueError(
+                "{} is referenced but is not in the tracked tree".format(obj)
+            ) from None
+
+
+class _NodeIdUnpickler(pickle.Unpickler):
+    """Unpickler which resolves node ids from _NodeIdPickler."""
+    def __init__(self, file, nodes):
+        super().__init__(file)
+        self._nodes = nodes
+
+    def persistent_load(self, pid):
+        if pid == _FORGOTTEN_ID:
+            return None
+        return self._nodes[pid]
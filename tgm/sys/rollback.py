@@ -0,0 +1,119 @@
+"""Cheap snapshots of a node tree for rollback simulation.
+
+Rather than copying the tree, a Rollback journals how to undo each change
+made to it.  Every version shares the unchanged parts of the tree, so taking
+a snapshot costs nothing and restoring one costs only as much as the
+changes made since.
+
+>>> rollback = Rollback(world)
+>>> version = rollback.snapshot()
+>>> simulate(world, predicted_inputs)
+>>> rollback.restore(version)
+>>> simulate(world, confirmed_inputs)
+"""
+import numpy as np
+from tgm.sys import add_change_listener, remove_change_listener
+from tgm.sys.tracked import MISSING
+
+
+class Rollback:
+    """Records changes to a tree so it can be returned to earlier versions.
+
+    Structure changes anywhere in the tree are recorded, but only attribute
+    writes to Tracked nodes are, so the state which needs rolling back must
+    live in tracked attributes.  Writes made through a columnar Batch aren't
+    seen, nor can the storage of a destroyed ColumnarComponent be restored.
+    In-place operators on array columns change the storage before the write
+    is reported, so assign new values to them instead.
+    """
+    def __init__(self, root):
+        self.root = root
+
+        # Undo entries, each a function and its arguments
+        self._journal = []
+
+        # Maps versions to the length of the journal when they were taken
+        self._versions = {}
+        self._next_version = 0
+
+        # Journal entries before this have been released
+        self._base = 0
+
+        self._restoring = False
+        add_change_listener(self)
+
+    def close(self):
+        """Stop recording changes."""
+        remove_change_listener(self)
+
+    def snapshot(self):
+        """Return a version which the tree can later be restored to."""
+        version = self._next_version
+        self._next_version += 1
+        self._versions[version] = self._base + len(self._journal)
+        return version
+
+    def restore(self, version):
+        """Undo every change made since the version was taken.
+
+        Versions taken after the restored version are no longer valid.
+        """
+        position = self._versions[version] - self._base
+
+        self._restoring = True
+        try:
+            while len(self._journal) > position:
+                undo, *args = self._journal.pop()
+                undo(*args)
+        finally:
+            self._restoring = False
+
+        for later in [other for other in self._versions if other > version]:
+            del self._versions[later]
+
+    def release(self, version):
+        """Forget the versions before the given one, freeing their journal.
+
+        This keeps memory bounded to the rollback window.
+        """
+        position = self._versions[version] - self._base
+        del self._journal[:position]
+        self._base += position
+
+        for earlier in [other for other in self._versions if other < version]:
+            del self._versions[earlier]
+
+    def node_attached(self, parent, node):
+        if not self._restoring and self._in_tree(parent):
+            self._journal.append((parent._detach, node))
+
+    def node_detached(self, parent, node):
+        if not self._restoring and self._in_tree(parent):
+            self._journal.append((parent.attach, node))
+
+    def attribute_set(self, node, name, old_value, value):
+        if not self._restoring and self._in_tree(node):
+            # Array views, such as a column read from a ColumnarComponent,
+            # share their storage with the new value so are copied.  Other
+            # values are kept as they are, so references to nodes and other
+            # objects are restored to the same object
+            if (isinstance(old_value, np.ndarray)
+                    and old_value.base is not None):
+                old_value = np.array(old_value)
+            self._journal.append((_set_attribute, node, name, old_value))
+
+    def _in_tree(self, node):
+        """Check if a node is the root or one of its descendents."""
+        while node is not None:
+            if node is self.root:
+                return True
+            node = node._node_parent
+        return False
+
+
+def _set_attribute(node, name, value):
+    """Restore an attribute's value, deleting it if it wasn't set."""
+    if value is MISSING:
+        delattr(node, name)
+    else:
+        setattr(node, name, value)
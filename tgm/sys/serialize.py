@@ -0,0 +1,281 @@
+"""Compact binary snapshots of node trees.
+
+A snapshot holds the structure of a tree, the type and attributes of each
+node and the layout of every node's index, so that loading it can rebuild
+the tree in bulk rather than constructing and attaching each node.
+
+>>> data = dumps(level)
+>>> world.attach(loads(data))
+<mygame.level.Level at 318f9f0>
+"""
+from array import array
+import gc
+from inspect import getmro
+from io import BytesIO
+import pickle
+import struct
+import sys
+from tgm.sys import Node
+from tgm.sys.node import _new_node
+
+_MAGIC = b"TGMS"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHI")
+_SECTION = struct.Struct("<I")
+
+
+def dumps(node):
+    """Return a snapshot of the node and all of its descendents.
+
+    Attributes may reference nodes inside the tree, but a reference to a
+    node outside of it raises a ValueError.
+    """
+    nodes = _preorder(node)
+    ids = {id(each): i for i, each in enumerate(nodes)}
+
+    types = []
+    type_ids = {}
+    type_column = array("i")
+    parent_column = array("i")
+
+    keys = []
+    key_ids = {}
+    index_offsets = array("i", [0])
+    index_keys = array("i")
+    member_offsets = array("i", [0])
+    members = array("i")
+
+    states = []
+
+    for i, each in enumerate(nodes):
+        cls = type(each)
+        try:
+            type_column.append(type_ids[cls])
+        except KeyError:
+            type_ids[cls] = len(types)
+            type_column.append(len(types))
+            types.append(cls)
+
+        parent_column.append(
+            -1 if i == 0 else ids[id(each._node_parent)]
+        )
+
+        for key, node_set in each._node_index.items():
+            # Empty sets are only left behind by lookups
+            if not node_set:
+                continue
+            try:
+                index_keys.append(key_ids[key])
+            except KeyError:
+                key_ids[key] = len(keys)
+                index_keys.append(len(keys))
+                keys.append(key)
+            members.extend(ids[id(member)] for member in node_set)
+            member_offsets.append(len(members))
+        index_offsets.append(len(index_keys))
+
+        states.append(_get_state(each))
+
+    output = BytesIO()
+    output.write(_HEADER.pack(_MAGIC, _VERSION, len(nodes)))
+    _write_section(output, pickle.dumps((types, keys), protocol=4))
+    for column in (type_column, parent_column, index_offsets, index_keys,
+                   member_offsets, members):
+        _write_section(output, _array_bytes(column))
+
+    attribute_output = BytesIO()
+    _NodePickler(attribute_output, ids).dump(states)
+    _write_section(output, attribute_output.getvalue())
+
+    return output.getvalue()
+
+
+def loads(data):
+    """Rebuild a tree from a snapshot made by dumps.
+
+    The root of the tree is returned detached, ready to be attached to a
+    parent.  Accepts any bytes-like object, including a memory map.
+    """
+    # Building many objects at once triggers a lot of needless garbage
+    # collection, so it's paused until the tree is complete
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        root, finish = loads_deferred(data)
+        finish()
+        return root
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def loads_deferred(data):
+    """Rebuild a tree from a snapshot, leaving custom state to be restored
+    later.
+
+    Returns the root and a function which restores the state of nodes whose
+    class defines __setstate__.  Those may touch shared storage, such as a
+    ColumnarComponent's columns, so this lets the rest of the tree be built
+    on a background thread and finished on the main thread.
+
+    Unlike loads, garbage collection isn't paused while the tree is built,
+    as that would affect every other thread too.
+    """
+    data = memoryview(data)
+    magic, version, node_count = _HEADER.unpack_from(data, 0)
+    if magic != _MAGIC:
+        raise ValueError("Data is not a node tree snapshot")
+    if version != _VERSION:
+        raise ValueError(
+            "Unsupported snapshot version {}".format(version)
+        )
+
+    offset = _HEADER.size
+    sections = []
+    for _ in range(8):
+        length, = _SECTION.unpack_from(data, offset)
+        offset += _SECTION.size
+        sections.append(data[offset:offset + length])
+        offset += length
+
+    types, keys = pickle.loads(sections[0])
+    (type_column, parent_column, index_offsets, index_keys,
+     member_offsets, members) = (_bytes_array(section)
+                                 for section in sections[1:7])
+
+    return _build(types, keys, type_column, parent_column, index_offsets,
+                  index_keys, member_offsets, members, sections[7])
+
+
+def _build(types, keys, type_column, parent_column, index_offsets,
+           index_keys, member_offsets, members, attributes):
+    """Create the nodes of a snapshot and restore their state."""
+    nodes = [_new_node(types[type_id]) for type_id in type_column]
+
+    # Link each node to its parent, registering it in the parent's children
+    # under every class it inherits from
+    mros = [getmro(cls) for cls in types]
+    for node, type_id, parent_id in zip(nodes, type_column, parent_column):
+        if parent_id < 0:
+            continue
+        parent = nodes[parent_id]
+        node._node_parent = parent
+        children = parent._node_children
+        for key in mros[type_id]:
+            children[key].add(node)
+
+    # Fill each node's index from the stored layout
+    for i, node in enumerate(nodes):
+        index = node._node_index
+        for entry in range(index_offsets[i], index_offsets[i + 1]):
+            index[keys[index_keys[entry]]] = {
+                nodes[member] for member in
+                members[member_offsets[entry]:member_offsets[entry + 1]]
+            }
+
+    states = _NodeUnpickler(BytesIO(attributes), nodes).load()
+    setstates = [getattr(cls, "__setstate__", None) for cls in types]
+    deferred = []
+    for node, type_id, state in zip(nodes, type_column, states):
+        setstate = setstates[type_id]
+        if setstate is None:
+            node.__dict__.update(state)
+        else:
+            deferred.append((setstate, node, state))
+
+    def finish():
+        for setstate, node, state in deferred:
+            setstate(node, state)
+        del deferred[:]
+
+    return nodes[0], finish
+
+
+def dump(node, file):
+    """Write a snapshot of the node to a binary file."""
+    file.write(dumps(node))
+
+
+def load(file):
+    """Rebuild a tree from a snapshot in a binary file."""
+    return loads(file.read())
+
+
+class _NodePickler(pickle.Pickler):
+    """Pickler which stores nodes in the tree by their position."""
+    def __init__(self, file, ids):
+        super().__init__(file, protocol=4)
+        self._ids = ids
+
+    def persistent_id(self, obj):
+        if not isinstance(obj, Node):
+            return None
+        try:
+            return self._ids[id(obj)]
+        except KeyError:
+            raise ValueError(
+                "{} is referenced but is not part of the tree".format(obj)
+            ) from None
+
+
+class _NodeUnpickler(pickle.Unpickler):
+    """Unpickler which resolves node references from _NodePickler."""
+    def __init__(self, file, nodes):
+        super().__init__(file)
+        self._nodes = nodes
+
+    def persistent_load(self, pid):
+        return self._nodes[pid]
+
+
+def _preorder(node):
+    """List the node and its descendents, each after its parent."""
+    nodes = []
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        nodes.append(current)
+        stack.extend(current._node_children.get(Node, ()))
+    return nodes
+
+
+def _get_state(node):
+    """Get the attributes of a node which aren't part of the tree."""
+    try:
+        state = node.__getstate__()
+    except AttributeError:
+        state = vars(node)
+
+    return {key: value for key, value in state.items()
+            if not key.startswith("_node_")}
+
+
+def _set_state(node, state):
+    """Restore attributes got from _get_state."""
+    setstate = getattr(type(node), "__setstate__", None)
+    if setstate is None:
+        node.__dict__.update(state)
+    else:
+        setstate(node, state)
+
+
+def _write_section(output, data):
+    output.write(_SECTION.pack(len(data)))
+    output.write(data)
+
+
+def _array_bytes(column):
+    """Get the bytes of an array, stored little endian."""
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def _bytes_array(data):
+    """Read an array of ints stored by _array_bytes."""
+    column = array("i")
+    column.frombytes(data)
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column
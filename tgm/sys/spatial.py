@@ -0,0 +1,213 @@
+from collections import defaultdict
+from math import floor
+from numbers import Real
+from weakref import WeakSet
+from tgm.sys import Node, Component
+from tgm.sys.node import add_change_listener, _change_listeners
+
+
+class SpatialHash(Component):
+    """An index of node positions used to speed up region queries.
+
+    Attach a SpatialHash to a World or Layer and queries searching it with a
+    region, such as Enemy.within(0, 0, 640, 480), will take their candidates
+    from the index instead of testing every descendent.
+
+    Nodes are positioned by their x and y attributes, and those without
+    numbers for both aren't indexed.  Nodes are added when they're attached
+    below the index's parent and removed when they're detached or destroyed.
+    Moves are seen through the writes reported by Tracked nodes, so update
+    has to be called when any other node moves.
+
+    >>> index = world.attach(SpatialHash(cell_size=64))
+    >>> enemy = world.attach(Enemy(x=10, y=20))
+    >>> enemy.x += 5  # Enemy is Tracked
+    >>> list(world.find(Enemy.near(player.x, player.y, 100)))
+    [<mygame.enemy.Enemy at 318f9f0>]
+    """
+    def __init__(self, cell_size=64):
+        super().__init__()
+        self.cell_size = cell_size
+
+        # Maps cell coordinates to the nodes positioned in that cell
+        self._cells = defaultdict(set)
+
+        # Maps each indexed node to its position and cell coordinates
+        self._positions = {}
+
+        _watch(self)
+
+    def __setstate__(self, state):
+        """Restore the index, such as when it's loaded or unpickled, and
+        start keeping it up to date."""
+        self.__dict__.update(state)
+        _watch(self)
+
+    def update(self, node):
+        """Add the node to the index, or record that it has moved.
+
+        The node is only moved between cells when its cell has changed.
+        """
+        self._move(node, node.x, node.y)
+
+    def _move(self, node, x, y):
+        """Record the node as being at the given position."""
+        cell = self._cell(x, y)
+
+        try:
+            old_cell = self._positions[node][2]
+        except KeyError:
+            old_cell = None
+
+        if old_cell != cell:
+            if old_cell is not None:
+                self._remove_from_cell(old_cell, node)
+            self._cells[cell].add(node)
+
+        self._positions[node] = (x, y, cell)
+
+    def remove(self, node):
+        """Remove the node from the index."""
+        cell = self._positions.pop(node)[2]
+        self._remove_from_cell(cell, node)
+
+    def query(self, region):
+        """Return the indexed nodes whose position lies in the region.
+
+        Positions are those recorded by the last update of each node.
+        """
+        x1, y1, x2, y2 = region.bounds
+        cx1, cy1 = self._cell(x1, y1)
+        cx2, cy2 = self._cell(x2, y2)
+
+        # If the region covers more cells than are occupied, it's quicker to
+        # check each occupied cell than to look up each covered cell
+        covered_count = (cx2 - cx1 + 1) * (cy2 - cy1 + 1)
+        if covered_count > len(self._cells):
+            cells = (nodes
+                     for (cx, cy), nodes in self._cells.items()
+                     if cx1 <= cx <= cx2 and cy1 <= cy <= cy2)
+        else:
+            cells = (self._cells[(cx, cy)]
+                     for cx in range(cx1, cx2 + 1)
+                     for cy in range(cy1, cy2 + 1)
+                     if (cx, cy) in self._cells)
+
+        for nodes in cells:
+            for node in nodes:
+                x, y, _ = self._positions[node]
+                if region.contains(x, y):
+                    yield node
+
+    def __contains__(self, node):
+        return node in self._positions
+
+    def __len__(self):
+        return len(self._positions)
+
+    def _refresh(self, node):
+        """Update the node if it has a position, otherwise remove it."""
+        self._place(node, getattr(node, "x", None), getattr(node, "y", None))
+
+    def _place(self, node, x, y):
+        """Move the node to the position if it's made of numbers, otherwise
+        remove it."""
+        if isinstance(x, Real) and isinstance(y, Real):
+            self._move(node, x, y)
+        elif node in self._positions:
+            self.remove(node)
+
+    def _rebuild(self):
+        """Index every positioned descendent of the parent from scratch."""
+        self._cells.clear()
+        self._positions.clear()
+        parent = self._node_parent
+        if parent is not None:
+            for node in parent.find(Node):
+                self._refresh(node)
+
+    def _cell(self, x, y):
+        """Find the coordinates of the cell containing a position."""
+        return (floor(x / self.cell_size), floor(y / self.cell_size))
+
+    def _remove_from_cell(self, cell, node):
+        """Remove the node from a cell, dropping the cell if it's empty."""
+        nodes = self._cells[cell]
+        nodes.remove(node)
+        if not nodes:
+            del self._cells[cell]
+
+
+class _IndexMaintainer:
+    """Change listener which keeps every SpatialHash in step with the nodes
+    attached and detached below its parent."""
+    def node_attached(self, parent, node):
+        if not _indexes:
+            return
+
+        if isinstance(node, SpatialHash):
+            node._rebuild()
+            return
+
+        indexes = list(_indexes_from(parent))
+        if indexes:
+            for descendent in _subtree(node):
+                for index in indexes:
+                    index._refresh(descendent)
+
+    def node_detached(self, parent, node):
+        if not _indexes:
+            return
+
+        if isinstance(node, SpatialHash):
+            node._cells.clear()
+            node._positions.clear()
+            return
+
+        indexes = [index for index in _indexes_from(parent) if index]
+        if indexes:
+            for descendent in _subtree(node):
+                for index in indexes:
+                    if descendent in index:
+                        index.remove(descendent)
+
+    def attribute_set(self, node, name, old_value, value):
+        # Called before the value is written, so it's passed on
+        if name == "x":
+            x, y = value, getattr(node, "y", None)
+        elif name == "y":
+            x, y = getattr(node, "x", None), value
+        else:
+            return
+
+        if _indexes and node._node_parent is not None:
+            for index in _indexes_from(node._node_parent):
+                index._place(node, x, y)
+
+
+def _indexes_from(node):
+    """Yield the indexes attached to the node and each of its ancestors."""
+    while node is not None:
+        for index in node._node_children.get(SpatialHash, ()):
+            yield index
+        node = node._node_parent
+
+
+def _subtree(node):
+    """Yield the node and all its descendents."""
+    yield node
+    for descendent in node.find(Node):
+        yield descendent
+
+
+# Every SpatialHash in the process, which the listener keeping them up to
+# date skips its work without
+_indexes = WeakSet()
+_maintainer = _IndexMaintainer()
+
+
+def _watch(index):
+    """Keep the index up to date with the scene graph."""
+    _indexes.add(index)
+    if _maintainer not in _change_listeners:
+        add_change_listener(_maintainer)
@@ -0,0 +1,97 @@
+"""Accounting for the memory used by the scene graph's indexes."""
+from collections import Counter
+import json
+from sys import getsizeof
+from tgm.sys import Node
+
+
+class TreeStats:
+    """Counts and estimated sizes of the nodes and indexes in a subtree.
+
+    Classes and keys are named "module.QualifiedName".  Sizes are estimated
+    with sys.getsizeof, counting the _node_index and _node_children dicts and
+    their sets but not the nodes themselves.
+
+    >>> stats = world.stats()
+    >>> stats.nodes_by_class.most_common(1)
+    [('mygame.enemy.Enemy', 5000)]
+    >>> stats.to_json()
+    '{"nodes": 20000, ...}'
+    """
+    def __init__(self, root):
+        self.nodes = 0
+        self.nodes_by_class = Counter()
+
+        # Total members of every node's index set for each key
+        self.index_entries = Counter()
+        self.children_entries = Counter()
+
+        # Sets left empty by lookups on the defaultdicts
+        self.empty_index_sets = 0
+        self.empty_children_sets = 0
+
+        self.index_bytes = 0
+        self.children_bytes = 0
+
+        names = {}
+
+        def name(key):
+            try:
+                return names[key]
+            except KeyError:
+                names[key] = _name(key)
+                return names[key]
+
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            self.nodes += 1
+            self.nodes_by_class[name(type(node))] += 1
+
+            index = node._node_index
+            self.index_bytes += getsizeof(index)
+            for key, node_set in index.items():
+                self.index_bytes += getsizeof(node_set)
+                if node_set:
+                    self.index_entries[name(key)] += len(node_set)
+                else:
+                    self.empty_index_sets += 1
+
+            children = node._node_children
+            self.children_bytes += getsizeof(children)
+            for key, node_set in children.items():
+                self.children_bytes += getsizeof(node_set)
+                if node_set:
+                    self.children_entries[name(key)] += len(node_set)
+                else:
+                    self.empty_children_sets += 1
+
+            stack.extend(children.get(Node, ()))
+
+    @property
+    def total_bytes(self):
+        return self.index_bytes + self.children_bytes
+
+    def to_dict(self):
+        """Return the stats as a dict of plain types."""
+        return {
+            "nodes": self.nodes,
+            "nodes_by_class": dict(self.nodes_by_class.most_common()),
+            "index_entries": dict(self.index_entries.most_common()),
+            "children_entries": dict(self.children_entries.most_common()),
+            "empty_index_sets": self.empty_index_sets,
+            "empty_children_sets": self.empty_children_sets,
+            "index_bytes": self.index_bytes,
+            "children_bytes": self.children_bytes,
+            "total_bytes": self.total_bytes,
+        }
+
+    def to_json(self, **kwargs):
+        """Return the stats as JSON, passing any arguments to json.dumps."""
+        return json.dumps(self.to_dict(), **kwargs)
+
+
+def _name(key):
+    if isinstance(key, type):
+        return "{}.{}".format(key.__module__, key.__qualname__)
+    return repr(key)
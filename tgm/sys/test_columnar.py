@@ -0,0 +1,143 @@
+from unittest import TestCase
+import gc
+import numpy as np
+from tgm.sys import Node
+from tgm.sys.columnar import Column, ColumnStore, ColumnarComponent
+
+
+class Body(ColumnarComponent):
+    position = Column("f8", 2)
+    velocity = Column("f8", 2)
+    health = Column("f4", default=100)
+
+
+class FastBody(Body):
+    pass
+
+
+class Armour(Body):
+    rating = Column("i4")
+
+
+class TestColumnStore(TestCase):
+    def test_allocate_release(self):
+        store = ColumnStore([Body.position, Body.health], capacity=2)
+
+        nodes = [Node() for _ in range(4)]
+        rows = [store.allocate(node) for node in nodes[:3]]
+        self.assertEqual(len(set(rows)), 3)
+        self.assertEqual(store.capacity, 4)
+        self.assertIs(store.node(rows[2]), nodes[2])
+        self.assertEqual(store.columns["health"][rows[2]], 100)
+
+        store.columns["health"][rows[0]] = 5
+        store.release(rows[0])
+        self.assertFalse(store.alive[rows[0]])
+
+        self.assertEqual(store.ids[rows[0]], -1)
+
+        # reused rows are reset to the column default and given a new id
+        self.assertEqual(store.allocate(nodes[3]), rows[0])
+        self.assertEqual(store.columns["health"][rows[0]], 100)
+        self.assertEqual(store.ids[rows[0]], 3)
+
+        with self.assertRaises(ValueError):
+            store.add_column(Body.health)
+
+    def test_weak_references(self):
+        store = ColumnStore([Body.health])
+        node = Node()
+        row = store.allocate(node)
+
+        # rows of instances collected without being destroyed are freed
+        del node
+        gc.collect()
+        self.assertIsNone(store.node(row))
+        self.assertFalse(store.alive[row])
+
+        # a released row reused by another instance is left alone
+        node = Node()
+        row = store.allocate(node)
+        store.release(row)
+        other = Node()
+        self.assertEqual(store.allocate(other), row)
+        del node
+        gc.collect()
+        self.assertIs(store.node(row), other)
+
+
+class TestColumnarComponent(TestCase):
+    def test_fields(self):
+        body = Body(position=(1, 2))
+        self.assertEqual(list(body.position), [1, 2])
+        self.assertEqual(body.health, 100)
+
+        body.position += (1, 1)
+        body.health = 50
+        row = body._column_row
+        self.assertEqual(list(Body._column_store.columns["position"][row]),
+                         [2, 3])
+        self.assertEqual(Body._column_store.columns["health"][row], 50)
+
+    def test_storage_sharing(self):
+        self.assertIs(FastBody._column_store, Body._column_store)
+        self.assertIs(Armour._column_store, Body._column_store)
+        self.assertIn("rating", Body._column_store.columns)
+
+        class Unrelated(ColumnarComponent):
+            mass = Column()
+
+        self.assertIsNot(Unrelated._column_store, Body._column_store)
+
+    def test_destroy(self):
+        body = Node().attach(Body())
+        row = body._column_row
+        body.destroy()
+        self.assertIsNone(body._column_row)
+        self.assertFalse(Body._column_store.alive[row])
+
+        with self.assertRaises(ValueError):
+            body.position
+        with self.assertRaises(ValueError):
+            body.health = 5
+
+    def test_batch(self):
+        world = Node()
+        bodies = [world.attach(Node()).attach(Body(velocity=(i, 0)))
+                  for i in range(10)]
+        armour = world.attach(Armour(rating=3))
+
+        batch = Body.batch_in(world)
+        self.assertEqual(len(batch), 11)
+        self.assertEqual(set(batch.nodes), set(bodies) | {armour})
+        self.assertEqual(list(Armour.batch([armour]).rating), [3])
+
+        batch.position = batch.position + batch.velocity * 2
+        for body in bodies:
+            self.assertEqual(body.position[0], body.velocity[0] * 2)
+
+        # writes to the copies read from a batch fail rather than being lost
+        with self.assertRaises(ValueError):
+            batch.position[0] = (5, 5)
+        with self.assertRaises(ValueError):
+            batch.position += batch.velocity
+
+        destroyed = Body()
+        destroyed.destroy()
+        with self.assertRaises(ValueError):
+            Body.batch([destroyed])
+
+        class Unrelated(ColumnarComponent):
+            mass = Column()
+
+        with self.assertRaises(ValueError):
+            Body.batch([Unrelated()])
+
+        with self.assertRaises(AttributeError):
+            batch.mass
+
+    def test_batch_all(self):
+        body = Body()
+        batch = Body.batch_all()
+        self.assertIn(body._column_row, batch.rows)
+        self.assertTrue(np.all(Body._column_store.alive[batch.rows]))
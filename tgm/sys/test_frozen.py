@@ -0,0 +1,70 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from tgm.sys import Node, Entity, Component
+from tgm.sys.frozen import FrozenIndex
+
+
+class Layer(Entity):
+    pass
+
+
+class Enemy(Entity):
+    def __init__(self, health):
+        super().__init__()
+        self.health = health
+
+
+class Visible(Component):
+    pass
+
+
+class TestFrozenIndex(TestCase):
+    def setUp(self):
+        self.world = Node()
+        self.layers = [self.world.attach(Layer()) for _ in range(4)]
+        self.enemies = []
+        for i, layer in enumerate(self.layers):
+            for health in range(5):
+                enemy = layer.attach(Enemy(health))
+                if health % 2:
+                    enemy.attach(Visible())
+                self.enemies.append(enemy)
+        self.frozen = FrozenIndex(self.world)
+
+    def assertSameResults(self, query, **kwargs):
+        expected = set(self.world.find(query, **kwargs))
+        self.assertEqual(set(self.frozen.find(query, **kwargs)), expected)
+        self.assertEqual(set(self.frozen.parallel_find(query, **kwargs)),
+                         expected)
+
+    def test_find(self):
+        self.assertSameResults(Enemy)
+        self.assertSameResults(Visible)
+        self.assertSameResults(Enemy[lambda enemy: enemy.health > 2])
+        self.assertSameResults(Enemy[Visible])
+        self.assertSameResults(Layer >> Enemy[Visible])
+        self.assertSameResults(Enemy, trim=Layer)
+        self.assertSameResults(Visible, trim=Enemy[lambda e: e.health == 1])
+
+    def test_find_on_node(self):
+        layer = self.layers[0]
+        self.assertEqual(set(self.frozen.find(Enemy, node=layer)),
+                         set(layer.find(Enemy)))
+
+    def test_snapshot(self):
+        enemy = self.enemies[0]
+        enemy.destroy()
+        extra = self.layers[1].attach(Enemy(10))
+
+        results = set(self.frozen.find(Enemy))
+        self.assertIn(enemy, results)
+        self.assertNotIn(extra, results)
+        self.assertIs(self.frozen.parent(enemy), self.layers[0])
+        self.assertEqual(len(self.frozen), 1 + 4 + 20 + 8)
+
+    def test_executor(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = self.frozen.parallel_find(Enemy[Visible],
+                                                executor=executor)
+        self.assertEqual(len(results), 8)
+        self.assertEqual(set(results), set(self.world.find(Enemy[Visible])))
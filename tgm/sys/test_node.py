@@ -1,13 +1,27 @@
 from unittest import TestCase
+import pickle
 from tgm.sys.node import (
     _get_instantiation_calls, _on_instantiation, _find_fast, _find_with_fast,
     _find_fast_trim, _find_with_fast_trim
 )
-from tgm.sys import Node, Query, add_instantiation_call
+from tgm.sys import (
+    Node, Query, Event, add_instantiation_call, on, node_tree_summary,
+    node_hash, tree_diff
+)
 from inspect import getmro
 from unittest.mock import patch, Mock, ANY
 
 
+class Greet(Event):
+    pass
+
+
+class Greeter(Node):
+    @on(Greet)
+    def greet(self, name):
+        return "hello " + name
+
+
 class TestNode(TestCase):
     def test_init(self):
         # check that all the base classes have been added as keys
@@ -271,6 +285,23 @@ class TestNode(TestCase):
         self.assertEqual(world._node_index[Key], set())
 
 
+    def test_pickle(self):
+        world = Node()
+        greeter = world.attach(Node()).attach(Greeter())
+        greeter.attach(Node())
+
+        # unpickling shouldn't repeat instantiation calls
+        with patch("tgm.sys.node.Node.__new__") as mock:
+            world_copy = pickle.loads(pickle.dumps(world))
+            self.assertFalse(mock.called)
+
+        greeter_copy = world_copy.get_with(Greeter).get(Greeter)
+        self.assertIs(greeter_copy.parent().parent(), world_copy)
+        self.assertEqual(len(list(world_copy.find(Node))), 4)
+        self.assertEqual(len(list(greeter_copy.children(Greet))), 1)
+        self.assertEqual(greeter_copy.get(Greet)("bob"), "hello bob")
+
+
 class TestFindFast(TestCase):
     class Enemy(Node):
         pass
@@ -376,6 +407,78 @@ class TestFindFast(TestCase):
         )
 
 
+class Layer(Node):
+    pass
+
+
+class Enemy(Node):
+    pass
+
+
+class TestTreeHash(TestCase):
+    def make_level(self, enemies):
+        level = Node()
+        for count in enemies:
+            layer = level.attach(Layer())
+            for _ in range(count):
+                layer.attach(Enemy())
+        return level
+
+    def test_node_hash(self):
+        level = self.make_level([1, 2])
+        self.assertEqual(node_hash(level), node_hash(self.make_level([2, 1])))
+        self.assertNotEqual(node_hash(level),
+                            node_hash(self.make_level([2, 2])))
+
+        # changes clear the cached hashes up to the root
+        layer = next(layer for layer in level.children(Layer)
+                     if len(list(layer.children(Enemy))) == 1)
+        layer_hash = node_hash(layer)
+        enemy = layer.attach(Enemy())
+        self.assertIsNone(level._node_hash)
+        self.assertEqual(node_hash(level), node_hash(self.make_level([2, 2])))
+        self.assertNotEqual(node_hash(layer), layer_hash)
+
+        enemy.destroy()
+        self.assertEqual(node_hash(layer), layer_hash)
+        self.assertEqual(node_hash(level), node_hash(self.make_level([1, 2])))
+
+        self.assertEqual(node_hash(pickle.loads(pickle.dumps(level))),
+                         node_hash(level))
+
+    def test_node_tree_summary(self):
+        level = self.make_level([2, 2, 1])
+        name = "{} in " + __name__
+        self.assertEqual(node_tree_summary(level), "\n".join([
+            "Node in tgm.sys.node",
+            "    [2] " + name.format("Layer"),
+            "        [2] " + name.format("Enemy"),
+            "    [1] " + name.format("Layer"),
+            "        [1] " + name.format("Enemy"),
+        ]))
+
+    def test_tree_diff(self):
+        old = self.make_level([1, 2, 3])
+        new = self.make_level([1, 2, 3])
+        self.assertEqual(tree_diff(old, new), [])
+
+        new_layer = next(layer for layer in new.children(Layer)
+                         if len(list(layer.children(Enemy))) == 2)
+        new_layer.attach(Enemy())
+        extra = new.attach(Enemy())
+
+        old_layer = next(layer for layer in old.children(Layer)
+                         if len(list(layer.children(Enemy))) == 2)
+        differences = tree_diff(old, new)
+        self.assertEqual(len(differences), 2)
+        # any of the identical enemies can be the one reported as added
+        self.assertIn(("added", old_layer, ANY), differences)
+        self.assertIn(("added", old, extra), differences)
+
+        self.assertEqual(tree_diff(new, old)[0][0], "removed")
+        self.assertEqual(tree_diff(old, Layer()), [("replaced", old, ANY)])
+
+
 class TestOnInstantiationCalls(TestCase):
     def test_add_instantiation_call(self):
         key = object()
@@ -0,0 +1,156 @@
+from unittest import TestCase
+import socket
+from tgm.sys import Node, Entity, Tracked
+from tgm.sys.replication import (
+    ChangeTracker, DeltaApplier, write_frame, read_frame
+)
+
+
+class Unit(Tracked, Entity):
+    tracked_attributes = ("x", "target")
+
+    def __init__(self, x=0):
+        super().__init__()
+        self.x = x
+        self.target = None
+        self.local_only = 0
+
+
+class Marker(Node):
+    pass
+
+
+def _describe(node):
+    """Describe a tree's structure, tracked values and index sizes."""
+    children = sorted(_describe(child) for child in node.children(Node))
+    index = sorted((repr(key), len(members))
+                   for key, members in node._node_index.items() if members)
+    return (type(node).__name__, getattr(node, "x", None),
+            tuple(index), tuple(children))
+
+
+class TestReplication(TestCase):
+    def setUp(self):
+        self.server = Node()
+        self.units = []
+        for i in range(3):
+            layer = self.server.attach(Node())
+            self.units.append(layer.attach(Unit(i)))
+        self.tracker = ChangeTracker(self.server)
+
+        self.client = Node()
+        self.applier = DeltaApplier(self.client)
+
+        self.server_socket, self.client_socket = socket.socketpair()
+        self.server_file = self.server_socket.makefile("wb")
+        self.client_file = self.client_socket.makefile("rb")
+
+    def tearDown(self):
+        self.tracker.close()
+        for closable in (self.server_file, self.client_file,
+                         self.server_socket, self.client_socket):
+            closable.close()
+
+    def tick(self):
+        write_frame(self.server_file, self.tracker.encode())
+        self.applier.apply(read_frame(self.client_file))
+        self.assertEqual(_describe(self.client), _describe(self.server))
+
+    def test_initial_state(self):
+        self.tick()
+        self.assertEqual(self.tracker.ticks, 1)
+        self.assertEqual(self.applier.applies, 1)
+
+    def test_changes(self):
+        self.tick()
+        idle_bytes = len(self.tracker.encode())
+
+        # attributes
+        self.units[0].x = 10
+        self.units[0].x = 20
+        self.units[1].target = self.units[2]
+        self.tick()
+        self.assertGreater(self.tracker.last_bytes, idle_bytes)
+
+        replica_target = self.applier.node(self.tracker._ids[self.units[2]])
+        replica_unit = self.applier.node(self.tracker._ids[self.units[1]])
+        self.assertIs(replica_unit.target, replica_target)
+
+        # attaching new subtrees
+        unit = self.units[0].parent().attach(Unit(5))
+        unit.attach(Marker())
+        unit.attach(Unit(6))
+        self.tick()
+        self.assertEqual(len(list(self.client.find(Unit))), 5)
+
+        # moving and destroying
+        self.units[1].parent().attach(self.units[0])
+        self.units[2].destroy()
+        self.tick()
+
+        # detaching then reattaching within a tick
+        layer = self.units[1].parent()
+        layer.destroy()
+        self.server.attach(layer)
+        self.tick()
+
+    def test_destroyed_reference(self):
+        self.tick()
+
+        # references to nodes destroyed in the same tick are sent as None
+        self.units[0].target = self.units[2]
+        self.units[1].target = self.units[2].parent()
+        self.units[2].parent().destroy()
+        unit = Unit(7)
+        unit.other = self.units[2]
+        self.server.attach(unit)
+        self.tick()
+
+        replica = self.applier.node(self.tracker._ids[self.units[0]])
+        self.assertIsNone(replica.target)
+        replica = self.applier.node(self.tracker._ids[self.units[1]])
+        self.assertIsNone(replica.target)
+        replica = self.applier.node(self.tracker._ids[unit])
+        self.assertIsNone(replica.other)
+
+    def test_forgotten_reference(self):
+        self.tick()
+        target = self.units[2]
+        target.destroy()
+        self.tick()
+
+        # nodes which left the tree in an earlier tick are sent as None too
+        unit = Unit(8)
+        unit.target = target
+        self.server.attach(unit)
+        self.units[0].target = target
+        self.tick()
+        replica = self.applier.node(self.tracker._ids[unit])
+        self.assertIsNone(replica.target)
+
+        # unless they've been attached again
+        self.server.attach(target)
+        self.units[0].target = target
+        self.tick()
+        replica = self.applier.node(self.tracker._ids[self.units[0]])
+        self.assertIs(replica.target,
+                      self.applier.node(self.tracker._ids[target]))
+
+    def test_encode_error(self):
+        self.tick()
+        self.units[1].destroy()
+        self.server.attach(Unit(9))
+        self.units[0].target = lambda: None
+        with self.assertRaises(Exception):
+            self.tracker.encode()
+
+        # the tick's changes are kept, so replacing the value recovers
+        self.units[0].target = None
+        self.tick()
+        self.assertEqual(len(list(self.client.find(Unit))), 3)
+
+    def test_untracked_attributes(self):
+        self.tick()
+        self.units[0].local_only = 5
+        self.tracker.encode()
+        self.assertEqual(self.tracker._sets, {})
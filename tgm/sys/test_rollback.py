@@ -0,0 +1,104 @@
+from unittest import TestCase
+import numpy as np
+from tgm.sys import Node, Entity, Tracked
+from tgm.sys.columnar import Column, ColumnarComponent
+from tgm.sys.rollback import Rollback
+
+
+class Unit(Tracked, Entity):
+    def __init__(self, x=0):
+        super().__init__()
+        self.x = x
+
+
+class Body(Tracked, ColumnarComponent):
+    position = Column("f8", 2)
+
+
+def _describe(node):
+    children = sorted(_describe(child) for child in node.children(Node))
+    index = sorted((repr(key), len(members))
+                   for key, members in node._node_index.items() if members)
+    return (type(node).__name__, getattr(node, "x", None),
+            getattr(node, "hp", None), tuple(index), tuple(children))
+
+
+class TestRollback(TestCase):
+    def setUp(self):
+        self.world = Node()
+        self.units = [self.world.attach(Node()).attach(Unit(i))
+                      for i in range(5)]
+        self.rollback = Rollback(self.world)
+
+    def tearDown(self):
+        self.rollback.close()
+
+    def test_restore(self):
+        before = _describe(self.world)
+        version = self.rollback.snapshot()
+
+        self.units[0].x = 10
+        self.units[1].hp = 3
+        self.units[2].destroy()
+        self.units[3].parent().attach(self.units[4])
+        self.world.attach(Unit(7)).attach(Unit(8))
+        self.assertNotEqual(_describe(self.world), before)
+
+        self.rollback.restore(version)
+        self.assertEqual(_describe(self.world), before)
+        self.assertFalse(hasattr(self.units[1], "hp"))
+
+    def test_versions(self):
+        first = self.rollback.snapshot()
+        self.units[0].x = 1
+        second = self.rollback.snapshot()
+        self.units[0].x = 2
+        third = self.rollback.snapshot()
+
+        self.rollback.restore(second)
+        self.assertEqual(self.units[0].x, 1)
+        with self.assertRaises(KeyError):
+            self.rollback.restore(third)
+
+        self.rollback.release(second)
+        self.assertEqual(self.rollback._journal, [])
+        with self.assertRaises(KeyError):
+            self.rollback.restore(first)
+
+        self.units[0].x = 5
+        self.rollback.restore(second)
+        self.assertEqual(self.units[0].x, 1)
+
+    def test_outside_tree(self):
+        self.rollback.snapshot()
+        Unit().x = 5
+        Node().attach(Node())
+        self.assertEqual(self.rollback._journal, [])
+
+    def test_columns(self):
+        body = self.units[0].attach(Body(position=(1, 2)))
+        version = self.rollback.snapshot()
+        body.position = body.position + (1, 1)
+        body.position = (9, 9)
+        self.rollback.restore(version)
+        self.assertEqual(list(body.position), [1, 2])
+
+    def test_references(self):
+        unit = self.units[0]
+        target = self.units[1]
+        path = [(0, 0)]
+        weights = np.zeros(3)
+        unit.target = target
+        unit.path = path
+        unit.weights = weights
+
+        version = self.rollback.snapshot()
+        unit.target = self.units[2]
+        unit.path = [(1, 1)]
+        unit.weights = np.ones(3)
+        self.rollback.restore(version)
+
+        # the original objects are restored rather than copies of them
+        self.assertIs(unit.target, target)
+        self.assertIs(unit.path, path)
+        self.assertIs(unit.weights, weights)
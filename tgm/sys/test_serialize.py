@@ -0,0 +1,101 @@
+from unittest import TestCase
+from io import BytesIO
+from tgm.sys import Node, Entity, Component, Event, on, emit
+from tgm.sys.columnar import ColumnarComponent, Column
+from tgm.sys.serialize import dumps, loads, dump, load
+
+
+class Shout(Event):
+    pass
+
+
+class Player(Entity):
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+        self.heard = []
+
+    @on(Shout)
+    def shout(self, message):
+        self.heard.append(message)
+
+
+class Health(ColumnarComponent):
+    value = Column("f4", default=10)
+
+
+class Marker(Component):
+    pass
+
+
+def _index_layout(node):
+    """Describe a node's subtree and index independently of set ordering."""
+    index = sorted(
+        (repr(key), node in members, len(members))
+        for key, members in node._node_index.items() if members
+    )
+    children = sorted(_index_layout(child) for child in node.children(Node))
+    return (type(node).__name__, getattr(node, "name", None),
+            tuple(index), tuple(children))
+
+
+class TestSerialize(TestCase):
+    def setUp(self):
+        self.world = Node()
+        self.players = []
+        for i in range(5):
+            layer = self.world.attach(Entity())
+            player = layer.attach(Player("player{}".format(i)))
+            player.attach(Health(value=i))
+            player.attach(Marker())
+            self.players.append(player)
+        self.players[0].friend = self.players[1]
+
+    def test_round_trip(self):
+        copy = loads(dumps(self.world))
+        self.assertIsNone(copy.parent())
+        self.assertEqual(_index_layout(copy), _index_layout(self.world))
+
+        players = sorted(copy.find(Player), key=lambda player: player.name)
+        self.assertEqual([player.name for player in players],
+                         [player.name for player in self.players])
+
+        # references between nodes are kept within the copy
+        self.assertIs(players[0].friend, players[1])
+
+    def test_events(self):
+        player = next(loads(dumps(self.world)).find(Player))
+        emit(player, Shout, "hello")
+        self.assertEqual(player.heard, ["hello"])
+
+    def test_columnar(self):
+        copy = loads(dumps(self.world))
+        values = sorted(health.value for health in copy.find(Health))
+        self.assertEqual(values, [0, 1, 2, 3, 4])
+
+        original_rows = {health._column_row
+                         for health in self.world.find(Health)}
+        copy_rows = {health._column_row for health in copy.find(Health)}
+        self.assertFalse(original_rows & copy_rows)
+
+    def test_attach_restored(self):
+        world = Node()
+        world.attach(loads(dumps(self.players[2])))
+        self.assertEqual(len(list(world.find(Health))), 1)
+        self.assertEqual(len(list(world.find_with(Marker))), 1)
+
+    def test_outside_reference(self):
+        self.players[0].friend = Node()
+        with self.assertRaises(ValueError):
+            dumps(self.world)
+
+    def test_file(self):
+        file = BytesIO()
+        dump(self.world, file)
+        file.seek(0)
+        self.assertEqual(_index_layout(load(file)),
+                         _index_layout(self.world))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            loads(b"NOPE" + bytes(10))
@@ -0,0 +1,142 @@
+from unittest import TestCase
+from unittest.mock import patch
+from tgm.sys import Node, Query, SpatialHash, Tracked, remove_change_listener
+from tgm.sys import spatial
+from tgm.sys.serialize import dumps, loads
+
+
+class Enemy(Tracked):
+    tracked_attributes = ("x", "y")
+
+    def __init__(self, x, y):
+        super().__init__()
+        self.x = x
+        self.y = y
+
+
+class TestSpatialHash(TestCase):
+    def setUp(self):
+        self.world = Node()
+        self.index = self.world.attach(SpatialHash(cell_size=10))
+        self.layer = self.world.attach(Node())
+        self.enemies = [self.layer.attach(Enemy(x * 5, 0)) for x in range(20)]
+
+    def test_update(self):
+        enemy = self.enemies[0]
+        self.assertIn(enemy, self.index)
+        self.assertEqual(len(self.index), 20)
+
+        enemy.x = 1000
+        self.index.update(enemy)
+        self.assertIn(enemy, self.index._cells[(100, 0)])
+        self.assertNotIn(enemy, self.index._cells[(0, 0)])
+
+        self.index.remove(enemy)
+        self.assertNotIn(enemy, self.index)
+        self.assertNotIn((100, 0), self.index._cells)
+
+    def test_within(self):
+        results = set(self.world.find(Enemy.within(10, -1, 24, 1)))
+        self.assertEqual(results, set(self.enemies[2:5]))
+
+        # the index should be used rather than searching the tree
+        with patch("tgm.sys.query.Query._optimal_key") as mock:
+            list(self.world.find(Enemy.within(10, -1, 24, 1)))
+            self.assertFalse(mock.called)
+
+    def test_near(self):
+        results = set(self.world.find(Enemy.near(50, 3, 5)))
+        self.assertEqual(results, set(self.enemies[10:11]))
+
+    def test_composition(self):
+        for enemy in self.enemies[:10]:
+            enemy.angry = True
+
+        query = Enemy["angry"].within(0, -1, 100, 1)
+        self.assertEqual(set(self.world.find(query)), set(self.enemies[:10]))
+
+        # two regions are intersected
+        query = Query(Enemy).within(0, -1, 30, 1).near(30, 0, 5)
+        self.assertEqual(set(self.world.find(query)), set(self.enemies[5:7]))
+
+        # trimmed subtrees are excluded
+        query = Enemy.within(0, -1, 100, 1).trim(
+            lambda node: node is self.layer
+        )
+        self.assertEqual(list(self.world.find(query)), [])
+
+    def test_detached(self):
+        self.enemies[0].destroy()
+        results = list(self.world.find(Enemy.within(0, -1, 0, 1)))
+        self.assertEqual(results, [])
+
+    def test_maintained(self):
+        # a tree with the same nodes but no index is searched directly
+        plain = Node()
+        plain.attach(self.layer)
+        query = Enemy.within(0, -1, 40, 1)
+        expected = set(plain.find(query))
+        self.world.attach(self.layer)
+        self.assertEqual(set(self.world.find(query)), expected)
+
+        for enemy in self.enemies[:5]:
+            enemy.x += 100
+        self.enemies[8].y = 50
+        self.enemies[6].destroy()
+        other = self.world.attach(Node())
+        other.attach(self.enemies[7])
+        self.layer.attach(Enemy(12, 0))
+
+        self.assertEqual(len(self.index), 20)
+        self.assertNotIn(self.enemies[6], self.index)
+        self.assertIn(self.enemies[0], self.index._cells[(10, 0)])
+        self.assertNotIn(self.enemies[0], self.index._cells[(0, 0)])
+
+        indexed = set(self.world.find(query))
+        self.index.destroy()
+        self.assertEqual(len(self.index), 0)
+        self.assertEqual(indexed, set(self.world.find(query)))
+        self.assertEqual(len(indexed), 3)
+
+    def test_untracked(self):
+        # moves of nodes which aren't Tracked need an update
+        node = self.layer.attach(Node())
+        node.x, node.y = 0, 0
+        self.assertNotIn(node, self.index)
+        self.index.update(node)
+        self.assertIn(node, self.index)
+
+    def test_not_numbers(self):
+        enemy = self.layer.attach(Enemy("left", 0))
+        self.assertNotIn(enemy, self.index)
+        enemy.x = 5
+        self.assertIn(enemy, self.index)
+        enemy.y = None
+        self.assertNotIn(enemy, self.index)
+
+    def test_loaded(self):
+        data = dumps(self.world)
+
+        # as in a new process, where no index has been created
+        remove_change_listener(spatial._maintainer)
+        world = loads(data)
+        index = next(world.find(SpatialHash))
+        self.assertEqual(len(index), 20)
+
+        enemy = world.attach(Enemy(1000, 0))
+        self.assertIn(enemy, index)
+        self.assertEqual(list(world.find(Enemy.near(1000, 0, 1))), [enemy])
+
+    def test_attach_index(self):
+        world = Node()
+        enemies = [world.attach(Enemy(x, 0)) for x in range(10)]
+        index = world.attach(SpatialHash(cell_size=4))
+        self.assertEqual(len(index), 10)
+        self.assertEqual(set(world.find(Enemy.near(0, 0, 2))),
+                         set(enemies[:3]))
+
+    def test_without_index(self):
+        world = Node()
+        enemies = [world.attach(Enemy(x, x)) for x in range(10)]
+        results = set(world.find(Enemy.near(0, 0, 3)))
+        self.assertEqual(results, set(enemies[:3]))
@@ -0,0 +1,48 @@
+import json
+from unittest import TestCase
+from tgm.sys import Node, Entity, Component
+
+
+class Enemy(Entity):
+    pass
+
+
+class Brain(Component):
+    pass
+
+
+class TestTreeStats(TestCase):
+    def setUp(self):
+        self.world = Node()
+        for _ in range(3):
+            self.world.attach(Enemy()).attach(Brain())
+
+    def test_counts(self):
+        stats = self.world.stats()
+        self.assertEqual(stats.nodes, 7)
+        self.assertEqual(stats.nodes_by_class[__name__ + ".Enemy"], 3)
+        self.assertEqual(stats.nodes_by_class["tgm.sys.node.Node"], 1)
+
+        # each brain indexes itself, and each enemy and the world index
+        # the three paths to them
+        self.assertEqual(stats.index_entries[__name__ + ".Brain"], 9)
+        self.assertEqual(stats.children_entries[__name__ + ".Enemy"], 3)
+        self.assertGreater(stats.total_bytes, 0)
+
+    def test_empty_sets(self):
+        self.assertEqual(self.world.stats().empty_index_sets, 0)
+
+        # lookups of missing keys leave empty sets behind
+        list(self.world.find(Node))
+        list(self.world.children(Brain))
+        stats = self.world.stats()
+        self.assertEqual(stats.empty_children_sets, 1)
+
+        enemy = next(self.world.children(Enemy))
+        enemy.get(Brain).destroy()
+        self.assertGreater(self.world.stats().empty_index_sets, 0)
+
+    def test_to_json(self):
+        data = json.loads(self.world.stats().to_json())
+        self.assertEqual(data["nodes"], 7)
+        self.assertEqual(data["index_entries"]["builtins.object"], 13)
@@ -0,0 +1,33 @@
+from tgm.sys import Node
+from tgm.sys.node import _change_listeners
+
+# Marks an attribute which hadn't been set before a change
+MISSING = object()
+
+
+class Tracked(Node):
+    """Mixin for nodes whose attribute writes are reported to change
+    listeners, such as for replicating them to another process.
+
+    Only the attributes named in tracked_attributes are reported, or every
+    attribute not starting with an underscore when it is None.
+
+    class Player(Tracked, Entity):
+        tracked_attributes = ("x", "y", "health")
+    """
+    tracked_attributes = None
+
+    def __setattr__(self, name, value):
+        if _change_listeners and _is_tracked(type(self), name):
+            old_value = getattr(self, name, MISSING)
+            for listener in _change_listeners:
+                listener.attribute_set(self, name, old_value, value)
+
+        super().__setattr__(name, value)
+
+
+def _is_tracked(cls, name):
+    """Check if writes to an attribute of the class should be reported."""
+    if cls.tracked_attributes is None:
+        return not name.startswith("_")
+    return name in cls.tracked_attributes